@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+How many DNS results a second can the dns renderer render?  This compares
+the old approach of reading the template from disk for every response with
+the template registry, which reads and parses each template only once.
+
+  $ python benchmarks/dns.py [results]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+from ripe.atlas.sagan import Result
+
+from ripe.atlas.tools.renderers import base
+from ripe.atlas.tools.renderers.dns import Renderer
+
+RESULT = {"af": 4, "prb_id": 1, "from": "1.2.3.4", "fw": 4700, "timestamp": 1440000000, "type": "dns", "msm_id": 1000003, "proto": "UDP", "src_addr": "2.3.4.5", "dst_addr": "8.8.8.8", "result": {"ANCOUNT": 1, "ARCOUNT": 0, "ID": 4660, "NSCOUNT": 0, "QDCOUNT": 1, "abuf": "EjSBgAABAAEAAAAABHJpcGUDbmV0AAABAAHADAABAAEAAAEsAATBAAaL", "rt": 12.5, "size": 42}}  # noqa
+
+
+class OldRenderer(Renderer):
+
+    @staticmethod
+    def render(template, **kwargs):
+        template = os.path.join(
+            os.path.dirname(base.__file__), "templates", template)
+        with open(template) as f:
+            return f.read().format(**kwargs)
+
+
+def main(count):
+
+    # Parsed up front, as we only want to time the rendering
+    results = [Result.get(dict(RESULT, prb_id=i)) for i in range(count)]
+
+    for name, renderer in (("old", OldRenderer()), ("registry", Renderer())):
+        start = time.time()
+        for result in results:
+            renderer.on_result(result)
+        elapsed = time.time() - start
+        print("{:<8} {:>10,.0f} results/s".format(name, count / elapsed))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+How many rendered lines a second can we write to a file?  This compares the
+old approach of a print() per line with writing through an OutputSink.
+
+  $ python benchmarks/output.py [lines]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import tempfile
+import time
+
+from ripe.atlas.sagan import Result
+
+from ripe.atlas.tools.helpers.sink import OutputSink
+from ripe.atlas.tools.renderers.raw import Renderer
+
+RESULT = {"af": 4, "prb_id": 1, "result": [{"rtt": 10.001}, {"rtt": 10.002}, {"rtt": 10.003}], "ttl": 20, "avg": 10.002, "size": 20, "from": "1.2.3.4", "proto": "ICMP", "timestamp": 1440000000, "dup": 0, "type": "ping", "sent": 3, "msm_id": 1000001, "fw": 4700, "max": 10.003, "step": 360, "src_addr": "2.3.4.5", "rcvd": 3, "msm_name": "Ping", "lts": 40, "dst_name": "my.name.ca", "min": 10.001, "dst_addr": "3.4.5.6"}  # noqa
+
+
+def with_print(lines, output):
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+        for line in lines:
+            print(line, end="")
+    finally:
+        sys.stdout = stdout
+
+
+def with_sink(lines, output):
+    with OutputSink(output) as sink:
+        for line in lines:
+            sink.write(line)
+
+
+def main(count):
+
+    renderer = Renderer()
+    lines = [
+        renderer.on_result(Result.get(dict(RESULT, prb_id=i)))
+        for i in range(count)
+    ]
+
+    descriptor, path = tempfile.mkstemp()
+    os.close(descriptor)
+
+    try:
+        # Line buffering makes every line a system call, as it is for
+        # `python -u`.  Otherwise Python buffers for us, but each print()
+        # still costs a few calls on the way down.
+        for buffering, label in ((1, "line-buffered"), (-1, "buffered")):
+            for name, function in (("print", with_print), ("sink", with_sink)):
+                with open(path, "w", buffering) as output:
+                    start = time.time()
+                    function(lines, output)
+                    elapsed = time.time() - start
+                print("{:<14} {:<6} {:>12,.0f} lines/s".format(
+                    label, name, count / elapsed))
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
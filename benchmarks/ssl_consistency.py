@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+How much does the ssl-consistency renderer hold on to while it reads
+results, and how many probes does it have to look up at the end?  This
+compares the old approach of keeping a probe object per sighting (and
+looking up every probe in the results) with keeping arrays of probe ids and
+looking up only the probes we print, for a few made-up distributions of
+certificates.
+
+  $ python benchmarks/ssl_consistency.py [results]
+"""
+
+from __future__ import print_function
+
+import collections
+import hashlib
+import random
+import sys
+import time
+import tracemalloc
+
+from ripe.atlas.tools.probes import ProbeRecord
+from ripe.atlas.tools.renderers.ssl_consistency import Renderer, THRESHOLD
+
+Certificate = collections.namedtuple("Certificate", ("checksum_sha256",))
+Result = collections.namedtuple(
+    "Result", ("probe_id", "probe", "certificates"))
+
+PROBES = 12000
+
+
+class OldRenderer(Renderer):
+
+    def bucketize_result_cert(self, result):
+        for certificate in result.certificates:
+            cert_id = certificate.checksum_sha256
+            if cert_id not in self.uniqcerts:
+                self.uniqcerts[cert_id] = {
+                    "cert": None,
+                    "cnt": 0,
+                    "probes": []
+                }
+            self.uniqcerts[cert_id]["cert"] = certificate
+            self.uniqcerts[cert_id]["cnt"] += 1
+            self.uniqcerts[cert_id]["probes"].append(result.probe)
+
+
+def get_fingerprint(index, depth, fingerprints={}):
+    key = (index, depth)
+    if key not in fingerprints:
+        fingerprints[key] = hashlib.sha256(
+            "{}-{}".format(index, depth).encode()).hexdigest().upper()
+    return fingerprints[key]
+
+
+def get_chain(index):
+    """
+    A leaf and an intermediate, fresh objects each time as they would be
+    when parsed out of each result.
+    """
+    return [Certificate(get_fingerprint(index, depth)) for depth in (0, 1)]
+
+
+def consistent(rng):
+    """Everyone sees the same chain, bar the odd interception."""
+    if rng.random() < 0.01:
+        return rng.randint(1, 50)
+    return 0
+
+
+def split(rng):
+    """A CDN handing out one of a handful of chains."""
+    return rng.randint(0, 4)
+
+
+def long_tail(rng):
+    """A few popular chains and many that only a probe or two see."""
+    return min(int(rng.paretovariate(1.2)), 2000)
+
+
+def get_results(distribution, count):
+    rng = random.Random(0)
+    probes = [
+        ProbeRecord(id=i, country_code="NL", asn_v4=3333, asn_v6=4444)
+        for i in range(1, PROBES + 1)
+    ]
+    for i in range(count):
+        probe = probes[i % PROBES]
+        yield Result(probe.id, probe, get_chain(distribution(rng)))
+
+
+def get_lookups(renderer, old):
+    """
+    How many probes would have to be looked up to render the report.
+    """
+    if old:
+        return len(set(
+            probe.id
+            for cert in renderer.uniqcerts.values()
+            for probe in cert["probes"]
+        ))
+    most_seen = renderer.get_nprobes_ofpopular_cert()
+    return len(set(
+        pk
+        for cert in renderer.uniqcerts.values()
+        if cert["cnt"] < most_seen * THRESHOLD / 100
+        for pk in cert["probes"]
+    ))
+
+
+def measure(renderer_class, distribution, count):
+
+    renderer = renderer_class()
+
+    tracemalloc.start()
+    start = time.time()
+    for result in get_results(distribution, count):
+        renderer.accumulate(result)
+    elapsed = time.time() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, size, get_lookups(renderer, renderer_class is OldRenderer)
+
+
+def main(count):
+    for distribution in (consistent, split, long_tail):
+        for name, renderer_class in (("old", OldRenderer), ("new", Renderer)):
+            elapsed, size, lookups = measure(
+                renderer_class, distribution, count)
+            print("{:<10} {:<4} {:>10,.0f} results/s {:>8,.1f} MiB "
+                  "{:>6,} probe lookups".format(
+                      distribution.__name__, name, count / elapsed,
+                      size / 1024.0 / 1024, lookups))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -1,7 +1,17 @@
-from .base import RangeKeyAggregator, ValueKeyAggregator, aggregate
+from .base import (
+    BucketSummary,
+    RangeKeyAggregator,
+    SortedSummary,
+    ValueKeyAggregator,
+    aggregate,
+    summarise,
+)
 
 __all__ = [
     "aggregate",
+    "summarise",
+    "BucketSummary",
     "RangeKeyAggregator",
+    "SortedSummary",
     "ValueKeyAggregator",
 ]
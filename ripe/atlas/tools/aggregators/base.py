@@ -7,6 +7,13 @@ class ValueKeyAggregator(object):
         self.aggregation_keys = key.split('.')
         self.key_prefix = prefix or self.aggregation_keys[-1].upper()
 
+    @property
+    def requires_probes(self):
+        """
+        Whether the results need their probes attached to be aggregated.
+        """
+        return self.aggregation_keys[0] == "probe"
+
     def get_key_value(self, entity):
         """
         Returns the value of the key/attribute the aggregation will use to
@@ -31,6 +38,68 @@ class ValueKeyAggregator(object):
             buckets[bucket] = [entity]
 
 
+class BucketSummary(object):
+    """
+    What we keep of a bucket when we can't afford to keep everything in it:
+    how many results went in, statistics on their median RTTs (for those
+    that have one), and the first `size` of the results themselves.
+    """
+
+    SIZE = 10
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.count = 0
+        self.sample = []
+        self.rtt_count = 0
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtt_total = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        r = "{0} result{1}".format(self.count, "" if self.count == 1 else "s")
+        if self.rtt_count:
+            r += ", median RTT min/avg/max: {0}/{1}/{2} ms".format(
+                round(self.rtt_min, 3),
+                round(self.rtt_average, 3),
+                round(self.rtt_max, 3)
+            )
+        return r
+
+    @property
+    def rtt_average(self):
+        if not self.rtt_count:
+            return None
+        return self.rtt_total / self.rtt_count
+
+    @property
+    def omitted(self):
+        """
+        The number of results that didn't make it into the sample.
+        """
+        return self.count - len(self.sample)
+
+    def add(self, entity):
+
+        self.count += 1
+        if len(self.sample) < self.size:
+            self.sample.append(entity)
+
+        rtt = getattr(entity, "rtt_median", None)
+        if rtt is None:
+            return
+
+        self.rtt_count += 1
+        self.rtt_total += rtt
+        if self.rtt_min is None or rtt < self.rtt_min:
+            self.rtt_min = rtt
+        if self.rtt_max is None or rtt > self.rtt_max:
+            self.rtt_max = rtt
+
+
 class RangeKeyAggregator(ValueKeyAggregator):
     """
     Aggregator based on where the position of the value of the key/attribute is
@@ -91,3 +160,60 @@ def aggregate(entities, aggregators):
             entities[k] = aggregate(entities[k], aggregators[:])
 
     return entities
+
+
+def summarise(entities, aggregators, size=BucketSummary.SIZE):
+    """
+    Like aggregate(), except that each bucket at the bottom is a
+    BucketSummary rather than a list of everything in it, so memory use
+    depends on the number of buckets rather than the number of entities.
+    """
+
+    buckets = {}
+    for entity in entities:
+        _insert_summary(buckets, aggregators, entity, size)
+
+    return buckets
+
+
+class SortedSummary(object):
+    """
+    summarise() for entities that arrive grouped by the first aggregator's
+    bucket, such as results sorted by country, or windowed by time.  Each of
+    the top level buckets is yielded by items() as soon as an entity from
+    the next one turns up, so only one is held at a time and it can be
+    rendered straight away.  If the entities aren't grouped after all, a
+    bucket will simply show up more than once.
+    """
+
+    def __init__(self, entities, aggregators, size=BucketSummary.SIZE):
+        self.entities = entities
+        self.aggregators = aggregators
+        self.size = size
+
+    def items(self):
+
+        key = None
+        buckets = {}
+
+        for entity in self.entities:
+            bucket = self.aggregators[0].get_bucket(entity)
+            if buckets and bucket != key:
+                yield key, buckets[key]
+                buckets = {}
+            key = bucket
+            _insert_summary(buckets, self.aggregators, entity, self.size)
+
+        if buckets:
+            yield key, buckets[key]
+
+
+def _insert_summary(buckets, aggregators, entity, size):
+
+    for aggregator in aggregators[:-1]:
+        buckets = buckets.setdefault(aggregator.get_bucket(entity), {})
+
+    bucket = aggregators[-1].get_bucket(entity)
+    if bucket not in buckets:
+        buckets[bucket] = BucketSummary(size)
+    buckets[bucket].add(entity)
@@ -3,86 +3,737 @@ try:
 except ImportError:
     import pickle
 
-import datetime
-import dbm
+try:
+    import anydbm as dbm
+except ImportError:  # Python 3
+    import dbm
+
+import collections
+import contextlib
 import functools
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+import time
+
+from .exceptions import RipeAtlasToolsException
+
+
+def get_db_path(filename):
+    """
+    Where we keep our databases: the ripe-atlas-tools config directory if we
+    can find it, /tmp otherwise.
+    """
+    if "HOME" in os.environ:
+        return os.path.join(
+            os.environ["HOME"], ".config", "ripe-atlas-tools", filename)
+    return os.path.join("/", "tmp", filename)
+
+
+def synchronised(method):
+    """
+    Serialise calls to `method` on the lock at `self._lock`.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class BaseEngine(object):
+    """
+    The interface a storage engine has to implement to be used by LocalCache.
+    Engines only ever deal with serialised values: LocalCache does the
+    pickling and works out the namespace & expiry time before handing them
+    over.  `expires_at` is a unix timestamp, or None for "never".
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def get(self, key):
+        """
+        Return an `(expires_at, value)` tuple for `key`, or None if the key
+        isn't there.  Engines needn't care whether the value is stale.
+        """
+        raise NotImplementedError()
+
+    def set(self, key, namespace, expires_at, value):
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+    def get_many(self, keys):
+        """
+        Return a dictionary of `key: (expires_at, value)` for those of `keys`
+        that are there.  Engines that can do better than one lookup per key
+        should override this.
+        """
+        r = {}
+        for key in keys:
+            entry = self.get(key)
+            if entry is not None:
+                r[key] = entry
+        return r
+
+    def set_many(self, entries):
+        """
+        Store an iterable of `(key, namespace, expires_at, value)` tuples.
+        """
+        for entry in entries:
+            self.set(*entry)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+    def keys(self):
+        raise NotImplementedError()
+
+    def expire(self, now):
+        """
+        Remove every entry that expired before `now`, returning the number of
+        entries removed.
+        """
+        raise NotImplementedError()
+
+    def clear(self, namespace=None):
+        """
+        Remove every entry, or only those in `namespace`, returning the number
+        of entries removed.
+        """
+        raise NotImplementedError()
+
+    def get_stats(self, now):
+        """
+        Return a list of `(namespace, entries, expired, bytes)` tuples, one for
+        every namespace in the cache.
+        """
+        raise NotImplementedError()
+
+    def vacuum(self):
+        """
+        Give unused space in the file back to the file system, if the engine
+        supports that sort of thing.
+        """
+        pass
+
+    @contextlib.contextmanager
+    def lock(self):
+        """
+        Hold the engine's write lock for the duration of a read-modify-write,
+        so that no other process can sneak a write in between.  Engines that
+        can't be shared between processes needn't do anything here.
+        """
+        yield
+
+    def close(self):
+        pass
+
+
+class SqliteEngine(BaseEngine):
+    """
+    The default engine.  Everything lives in a single table with indexed
+    `namespace` and `expires_at` columns so that expiring or dropping a lot of
+    entries is a single DELETE rather than a walk over every key.
+
+    This engine is safe to share between any number of processes: the
+    database runs in WAL mode so readers never block on writers, batches are
+    written in transactions that take the write lock up front, and a process
+    that finds the database locked waits up to TIMEOUT seconds for its turn
+    rather than failing.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " key TEXT PRIMARY KEY,"
+        " namespace TEXT NOT NULL,"
+        " expires_at REAL,"
+        " value BLOB NOT NULL"
+        ")",
+        "CREATE INDEX IF NOT EXISTS cache_namespace ON cache (namespace)",
+        "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)",
+    )
+
+    # SQLite won't take more than 999 parameters in a single statement
+    CHUNK_SIZE = 500
+
+    # Seconds to wait for another process to release the write lock
+    TIMEOUT = 30
+
+    def __init__(self, path):
+        BaseEngine.__init__(self, path)
+        try:
+            self._db = self._connect()
+        except sqlite3.OperationalError:
+            raise  # Locked, or otherwise unavailable, but not ours to delete
+        except sqlite3.DatabaseError:
+            # Most likely a cache.db left behind by the old dbm-based cache.
+            # It's only a cache, so we throw it away and start again.
+            os.unlink(self.path)
+            self._db = self._connect()
+
+    def _connect(self):
+        # LocalCache serialises access, so we can share this across threads
+        db = sqlite3.connect(
+            self.path,
+            timeout=self.TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            db.execute(statement)
+        return db
+
+    def get(self, key):
+        row = self._db.execute(
+            "SELECT expires_at, value FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], bytes(row[1])
+
+    def set(self, key, namespace, expires_at, value):
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, namespace, expires_at, value) "
+            "VALUES (?, ?, ?, ?)",
+            (key, namespace, expires_at, sqlite3.Binary(value))
+        )
+
+    def delete(self, key):
+        self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def get_many(self, keys):
+        r = {}
+        keys = list(keys)
+        with self._transaction():
+            for i in range(0, len(keys), self.CHUNK_SIZE):
+                chunk = keys[i:i + self.CHUNK_SIZE]
+                rows = self._db.execute(
+                    "SELECT key, expires_at, value FROM cache "
+                    "WHERE key IN ({})".format(", ".join("?" * len(chunk))),
+                    chunk
+                )
+                for key, expires_at, value in rows:
+                    r[key] = (expires_at, bytes(value))
+        return r
+
+    def set_many(self, entries):
+        with self._transaction("IMMEDIATE"):
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cache "
+                "(key, namespace, expires_at, value) VALUES (?, ?, ?, ?)",
+                [(key, namespace, expires_at, sqlite3.Binary(value))
+                 for key, namespace, expires_at, value in entries]
+            )
+
+    def delete_many(self, keys):
+        with self._transaction("IMMEDIATE"):
+            self._db.executemany(
+                "DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+
+    def keys(self):
+        return [row[0] for row in self._db.execute("SELECT key FROM cache")]
+
+    def expire(self, now):
+        return self._db.execute(
+            "DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+
+    def clear(self, namespace=None):
+        if namespace is None:
+            return self._db.execute("DELETE FROM cache").rowcount
+        return self._db.execute(
+            "DELETE FROM cache WHERE namespace = ?", (namespace,)).rowcount
+
+    def get_stats(self, now):
+        return list(self._db.execute(
+            "SELECT namespace, COUNT(*), "
+            " SUM(CASE WHEN expires_at <= ? THEN 1 ELSE 0 END), "
+            " SUM(LENGTH(key) + LENGTH(value)) "
+            "FROM cache GROUP BY namespace ORDER BY namespace",
+            (now,)
+        ))
+
+    def vacuum(self):
+        self._db.execute("VACUUM")
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def lock(self):
+        return self._transaction("IMMEDIATE")
+
+    def close(self):
+        self._db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self, mode="DEFERRED"):
+        """
+        An IMMEDIATE transaction takes the write lock as it starts, which is
+        what you want when you're going to write: a DEFERRED one that tries to
+        upgrade its lock half way through can fail rather than wait.
+        """
+        self._db.execute("BEGIN {}".format(mode))
+        try:
+            yield
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+class DbmEngine(BaseEngine):
+    """
+    The original engine, making use of the built-in dbm support.  There are no
+    indexes here, so expiring entries means looking at every one of them, and
+    the file is held open for the life of the process so it mustn't be shared
+    between concurrent processes.
+    """
+
+    def __init__(self, path):
+        BaseEngine.__init__(self, path)
+        self._db = dbm.open(self.path, "c")
+
+    def get(self, key):
+        if key not in self._db:
+            return None
+        _, expires_at, value = self._load(key, self._db[key])
+        return expires_at, value
+
+    def set(self, key, namespace, expires_at, value):
+        self._db[key] = pickle.dumps((namespace, expires_at, value))
+
+    def delete(self, key):
+        if key in self._db:
+            del self._db[key]
+
+    def keys(self):
+        r = []
+        for key in self._db.keys():
+            try:
+                key = key.decode("utf-8")
+            except (AttributeError, UnicodeDecodeError):
+                pass
+            r.append(key)
+        return r
+
+    def expire(self, now):
+        r = 0
+        for key in self.keys():
+            expires_at = self.get(key)[0]
+            if expires_at is not None and expires_at <= now:
+                self.delete(key)
+                r += 1
+        return r
+
+    def clear(self, namespace=None):
+        r = 0
+        for key in self.keys():
+            if namespace is None or \
+                    self._load(key, self._db[key])[0] == namespace:
+                self.delete(key)
+                r += 1
+        return r
+
+    def get_stats(self, now):
+        stats = {}
+        for key in self._db.keys():
+            raw = self._db[key]
+            namespace, expires_at, _ = self._load(key, raw)
+            entry = stats.setdefault(namespace, [namespace, 0, 0, 0])
+            entry[1] += 1
+            if expires_at is not None and expires_at <= now:
+                entry[2] += 1
+            entry[3] += len(key) + len(raw)
+        return [tuple(stats[namespace]) for namespace in sorted(stats)]
+
+    @staticmethod
+    def _load(key, raw):
+        """
+        Unpickle an entry into a `(namespace, expires_at, value)` tuple.
+        Entries written before there were engines are `(expires, value)`
+        tuples, with `expires` being a local datetime, or None, and the value
+        not pickled on its own.
+        """
+        entry = pickle.loads(raw)
+        if len(entry) == 3:
+            return entry
+        expires, value = entry
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "ignore")
+        if expires is not None:
+            expires = time.mktime(expires.timetuple())
+        return (
+            LocalCache.get_namespace(key),
+            expires,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        )
+
+    def vacuum(self):
+        # Only the GNU flavour of dbm knows how to do this
+        if hasattr(self._db, "reorganize"):
+            self._db.reorganize()
+
+    def close(self):
+        self._db.close()
+
+
+class MemoryCache(object):
+    """
+    A bounded, least-recently-used store of already-unpickled values that sits
+    in front of the storage engine, so that keys we look up over and over in a
+    single run only have to come off the disk once.  Note that values are
+    handed out by reference, so don't modify what you get back.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """
+        Return the `(expires_at, value)` tuple for `key`, or None if we don't
+        have it or it's gone stale.
+        """
+        entry = self._data.pop(key, None)
+        if entry is None or LocalCache._is_stale(entry[0]):
+            self.misses += 1
+            return None
+        self._data[key] = entry  # Move it to the most-recently-used end
+        self.hits += 1
+        return entry
+
+    def set(self, key, expires_at, value):
+        if not self.size:
+            return
+        self._data.pop(key, None)
+        self._data[key] = (expires_at, value)
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def expire(self, now):
+        for key, (expires_at, _) in list(self._data.items()):
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+
+    def clear(self):
+        self._data.clear()
 
 
 class LocalCache(object):
     """
-    Simple caching engine, making use of the built-in dbm support.  This will
-    create a file called cache.db in ripe-atlas-tools config directory and dump
-    stuff in there for use later.
+    Simple caching engine.  This will create a file called cache.db in
+    ripe-atlas-tools config directory and dump stuff in there for use later.
+    How that file is laid out is up to the storage engine, selectable with the
+    `cache.engine` configuration option.
+
+    Keys are expected to be of the form `<namespace>:<identifier>`, so
+    `probe:123` is stored in the `probe` namespace.
+
+    Everything read or written also goes through an in-memory LRU tier of
+    `cache.memory-size` entries.  Writes go straight through to the engine.
+
+    Nothing is opened, or even created, until the cache is first used, so
+    importing this module costs no disk access.
+
+    The cache may be shared between threads: every access to the engine and
+    the memory tier is serialised on a lock.
     """
 
-    def __init__(self):
-        self._now = datetime.datetime.now()
-        self._db = dbm.open(self._get_or_create_db_path(), "c")
+    ENGINES = {
+        "sqlite": SqliteEngine,
+        "dbm": DbmEngine,
+    }
+
+    def __init__(self, engine=None, path=None, memory_size=None):
+        self._engine_name = engine
+        self._path = path
+        self._memory_size = memory_size
+        self._engine = None
+        self._memory = None
+        self._lock = threading.RLock()
+
+    @property
+    @synchronised
+    def engine(self):
+        """
+        The storage engine, opened on first access.
+        """
+
+        if self._engine is not None:
+            return self._engine
+
+        # Imported here, as reading the configuration means reading a file
+        from .settings import conf
+
+        name = self._engine_name or conf["cache"]["engine"]
+        if name not in self.ENGINES:
+            raise RipeAtlasToolsException(
+                'Invalid cache engine: "{}". Choose one of: {}'.format(
+                    name, ", ".join(sorted(self.ENGINES))
+                )
+            )
+        self._engine = self.ENGINES[name](
+            self._path or self._get_or_create_db_path())
+
+        return self._engine
+
+    @property
+    @synchronised
+    def memory(self):
+        if self._memory is None:
+            size = self._memory_size
+            if size is None:
+                from .settings import conf
+                size = conf["cache"]["memory-size"]
+            self._memory = MemoryCache(size)
+        return self._memory
+
+    @property
+    def is_open(self):
+        return self._engine is not None
 
     def __contains__(self, key):
-        return key in self._db
+        return self._get_entry(key) is not None
 
     def __getitem__(self, key):
         return self.get(key)
 
-    def __setitem__(self, key, value, expires=None):
-        self._db[key] = pickle.dumps((expires, value))
+    def __setitem__(self, key, value):
+        self.set(key, value)
 
+    @synchronised
     def __delitem__(self, key):
-        if key not in self._db:
-            raise KeyError
-        del self._db[key]
+        if self.engine.get(key) is None:
+            raise KeyError(key)
+        self.memory.delete(key)
+        self.engine.delete(key)
 
+    @synchronised
     def keys(self):
-        return self._db.keys()
+        return self.engine.keys()
 
     def items(self):
         for key in self.keys():
-            yield key, self._db[key]
+            yield key, self.get(key)
 
     def get(self, key, default=None):
-        if key in self._db:
-            expires, value = pickle.loads(self._db[key])
-            if not expires or expires > self._now:
-                return value
+        entry = self._get_entry(key)
+        if entry is None:
+            return default
+        return entry[1]
+
+    @synchronised
+    def get_many(self, keys):
+        """
+        Look up a lot of keys at once, returning a dictionary of only those
+        keys that were found and haven't yet expired.
+        """
+
+        r = {}
+
+        missing = []
+        for key in keys:
+            entry = self.memory.get(key)
+            if entry is None:
+                missing.append(key)
+            else:
+                r[key] = entry[1]
+
+        if not missing:
+            return r
+
+        stale = []
+        for key, (expires_at, value) in self.engine.get_many(missing).items():
+            if self._is_stale(expires_at):
+                stale.append(key)
             else:
-                del(self._db[key])
-        return default
+                r[key] = pickle.loads(value)
+                self.memory.set(key, expires_at, r[key])
+        if stale:
+            self.engine.delete_many(stale)
+
+        return r
 
     def set(self, key, value, expires=None):
-        return self.__setitem__(
-            key, value, self._now + datetime.timedelta(seconds=expires))
+        """
+        Store `value` under `key` for `expires` seconds, or forever if
+        `expires` isn't set.
+        """
+        self.set_many({key: value}, expires)
+
+    @synchronised
+    def set_many(self, mapping, expires=None):
+        """
+        Store every `key: value` pair in `mapping` for `expires` seconds in one
+        go.
+        """
+
+        expires_at = None
+        if expires is not None:
+            expires_at = time.time() + expires
+
+        for key, value in mapping.items():
+            self.memory.set(key, expires_at, value)
+
+        self.engine.set_many([
+            (
+                key,
+                self.get_namespace(key),
+                expires_at,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            ) for key, value in mapping.items()
+        ])
+
+    @synchronised
+    def update(self, key, function, expires=None):
+        """
+        Atomically replace the value at `key` with `function(value)`, where
+        `value` is None if `key` isn't there.  Use this rather than a .get()
+        followed by a .set() when other processes may be updating the same key
+        at the same time, since otherwise one of the updates would be lost.
+        """
+
+        expires_at = None
+        if expires is not None:
+            expires_at = time.time() + expires
 
-    def clear(self, key=None):
+        with self.engine.lock():
+            entry = self.engine.get(key)
+            value = None
+            if entry is not None and not self._is_stale(entry[0]):
+                value = pickle.loads(entry[1])
+            value = function(value)
+            self.engine.set(
+                key,
+                self.get_namespace(key),
+                expires_at,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            )
+
+        self.memory.set(key, expires_at, value)
+
+        return value
+
+    @synchronised
+    def clear(self, key=None, namespace=None):
         """
-        Removes a specific key from the cache manually, or will wipe the entire
-        cache if you don't specify `key`.  Note that this shouldn't be necessary
-        unless you've cached something with an inappropriately long expire time.
+        Removes a specific key from the cache manually, every key in a
+        namespace, or will wipe the entire cache if you don't specify either.
+        Note that this shouldn't be necessary unless you've cached something
+        with an inappropriately long expire time.  Returns the number of
+        entries removed from a namespace or the entire cache.
         """
         if key:
-            if key in self._db:
-                del(self._db[key])
+            self.memory.delete(key)
+            self.engine.delete(key)
         else:
-            for key in self.keys():
-                del(self._db[key])
+            self.memory.clear()
+            return self.engine.clear(namespace)
 
+    @synchronised
     def expire(self):
         """
-        Clears out should-be-expired values from the cache.  Note that this
-        happens automatically whenever you call `.get()` so you should never
-        really need to run this.
+        Clears out should-be-expired values from the cache, returning the
+        number of entries removed.  Note that stale values are never returned
+        by `.get()` so you should never really need to run this unless you're
+        trying to keep the file small.
         """
-        for key in self.keys():
-            self.get(key)
+        now = time.time()
+        self.memory.expire(now)
+        return self.engine.expire(now)
+
+    @synchronised
+    def vacuum(self):
+        """
+        Compact the cache file.
+        """
+        self.engine.vacuum()
+
+    @synchronised
+    def get_namespace_stats(self):
+        """
+        Returns a list of `(namespace, entries, expired, bytes)` tuples
+        describing what's on disk.
+        """
+        return self.engine.get_stats(time.time())
+
+    @property
+    def path(self):
+        return self.engine.path
+
+    @synchronised
+    def close(self):
+        if self._memory is not None:
+            self._memory.clear()
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+    @synchronised
+    def get_stats(self):
+        """
+        Diagnostics for the in-memory tier.
+        """
+        return {
+            "hits": self.memory.hits,
+            "misses": self.memory.misses,
+            "size": len(self.memory),
+            "max-size": self.memory.size,
+        }
+
+    @synchronised
+    def _get_entry(self, key):
+        """
+        Return an `(expires_at, value)` tuple for `key` from memory, or failing
+        that, from the engine.  Stale entries are removed on sight.
+        """
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+
+        entry = self.engine.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if self._is_stale(expires_at):
+            self.engine.delete(key)
+            return None
+
+        value = pickle.loads(value)
+        self.memory.set(key, expires_at, value)
+
+        return expires_at, value
+
+    @staticmethod
+    def get_namespace(key):
+        try:
+            return key.split(":", 1)[0] if ":" in key else ""
+        except TypeError:  # Binary keys
+            return ""
+
+    @staticmethod
+    def _is_stale(expires_at):
+        return expires_at is not None and expires_at <= time.time()
 
     @staticmethod
     def _get_or_create_db_path():
 
-        db_path = os.path.join("/", "tmp", "cache.db")
-        if "HOME" in os.environ:
-            db_path = os.path.join(
-                os.environ["HOME"], ".config", "ripe-atlas-tools", "cache.db")
+        db_path = get_db_path("cache.db")
 
         try:
             os.makedirs(os.path.dirname(db_path))
@@ -96,32 +747,83 @@ cache = LocalCache()
 
 class Memoiser(object):
     """
-    Enabling class for the @memoised decorator
+    Enabling class for the @memoised decorator.  Results are cached under a
+    digest of the function's name & arguments, so keys are compact and don't
+    change with keyword argument order or Python version.  The arguments
+    have to be representable as JSON for that: if they aren't, the function
+    is called without the cache rather than with a key that won't be the
+    same next time.
+
+    For methods, the key includes the class and the instance, so unless
+    the instance is representable as JSON, its results aren't cached.  Pass
+    `key`, a function taking the same arguments as the one being memoised,
+    to say what the result does depend on.
     """
 
-    def __init__(self, function, cache_time):
+    MISSING = object()
+
+    def __init__(self, function, cache_time, negative_cache_time=None,
+                 key=None):
         self._function = function
         self._cache_time = cache_time
+        self._negative_cache_time = negative_cache_time
+        self._key = key
+        self._name = "{}.{}".format(function.__module__, function.__name__)
 
     def __call__(self, *args, **kwargs):
+        return self._call(self._name, args, kwargs)
 
-        key = pickle.dumps([args, kwargs])
-        value = cache[key]
+    def __get__(self, obj, objtype):
+        """Support instance methods."""
+        if obj is None:
+            return self
+        return functools.partial(self._call_method, obj)
 
-        if value:
+    def _call_method(self, obj, *args, **kwargs):
+        name = "{}.{}.{}".format(
+            self._function.__module__,
+            type(obj).__name__,
+            self._function.__name__
+        )
+        return self._call(name, (obj,) + args, kwargs)
+
+    def _call(self, name, args, kwargs):
+
+        try:
+            key = self.get_key(args, kwargs, name=name)
+        except (TypeError, ValueError):
+            # Nothing we could find again next time, so we don't cache it
+            return self._function(*args, **kwargs)
+
+        value = cache.get(key, self.MISSING)
+
+        if value is not self.MISSING:
             return value
 
         value = self._function(*args, **kwargs)
-        cache.set(key, value, self._cache_time)
+
+        if value:
+            cache.set(key, value, self._cache_time)
+        elif self._negative_cache_time is not None:
+            cache.set(key, value, self._negative_cache_time)
 
         return value
 
-    def __get__(self, obj, objtype):
-        """Support instance methods."""
-        return functools.partial(self.__call__, obj)
+    def get_key(self, args, kwargs, name=None):
+        """
+        Raises a TypeError if the arguments can't be represented as JSON.
+        """
+        payload = [args, kwargs]
+        if self._key is not None:
+            payload = self._key(*args, **kwargs)
+        payload = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return "memoised:{}:{}".format(
+            name or self._name,
+            hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        )
 
 
-def memoised(cache_time):
+def memoised(cache_time, negative_cache_time=None, key=None):
     """
     Decorate a method or function with this to cache the result of said method
     for n seconds:
@@ -130,7 +832,22 @@ def memoised(cache_time):
     my_function(some_arguments):
         ...
         return whatever
+
+    Empty results (anything falsy) aren't cached unless you ask for it with
+    `negative_cache_time`, which should typically be a lot shorter:
+
+    @memoised(60 * 60, negative_cache_time=60)
+
+    As instances usually can't be represented as JSON, methods are usually
+    only cached if you say what to key them on instead, with `key`:
+
+    @memoised(60 * 60, key=lambda self, pk: pk)
     """
     def _wrap(function):
-        return Memoiser(function, cache_time=cache_time)
+        return Memoiser(
+            function,
+            cache_time=cache_time,
+            negative_cache_time=negative_cache_time,
+            key=key
+        )
     return _wrap
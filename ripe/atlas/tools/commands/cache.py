@@ -0,0 +1,116 @@
+from __future__ import print_function, absolute_import
+
+import os
+
+from ..cache import cache
+from ..exceptions import RipeAtlasToolsException
+from ..helpers.colours import colourise
+from .base import Command as BaseCommand
+
+
+class Command(BaseCommand):
+
+    NAME = "cache"
+
+    DESCRIPTION = (
+        "Inspect and maintain the local cache of probe & IP details.\n\n"
+        "Examples:\n"
+        "  ripe-atlas cache stats\n"
+        "  ripe-atlas cache drop IPDetails\n"
+    )
+
+    ACTIONS = ("stats", "expire", "vacuum", "drop")
+
+    LINE_FORMAT = u"{:<24} {:>10} {:>10} {:>12}"
+
+    def add_arguments(self):
+        self.parser.add_argument(
+            "action",
+            choices=self.ACTIONS,
+            help="stats:  Show the number of entries & bytes per namespace\n"
+                 "expire: Remove all expired entries\n"
+                 "vacuum: Compact the cache file\n"
+                 "drop:   Remove every entry in a namespace"
+        )
+        self.parser.add_argument(
+            "namespace",
+            nargs="?",
+            help="The namespace to drop, i.e. probe, IPDetails, "
+                 "IPDetailsPrefix, github"
+        )
+
+    def run(self):
+
+        if self.arguments.action == "drop" and not self.arguments.namespace:
+            raise RipeAtlasToolsException(
+                "You must specify the namespace you want to drop")
+
+        getattr(self, self.arguments.action)()
+
+    def stats(self):
+
+        header = self.LINE_FORMAT.format(
+            "Namespace", "Entries", "Expired", "Size")
+        hr = "=" * len(header)
+
+        print(colourise(header, "bold"))
+        print(colourise(hr, "bold"))
+
+        totals = [0, 0, 0]
+        for namespace, entries, expired, size in cache.get_namespace_stats():
+            print(self.LINE_FORMAT.format(
+                namespace or "(none)",
+                entries,
+                expired,
+                self._get_human_size(size)
+            ))
+            totals[0] += entries
+            totals[1] += expired
+            totals[2] += size
+
+        print(colourise(hr, "bold"))
+        print(self.LINE_FORMAT.format(
+            "Total", totals[0], totals[1], self._get_human_size(totals[2])))
+
+        print("\n{}: {}\n".format(
+            cache.path, self._get_human_size(self._get_file_size(cache.path))))
+
+    def expire(self):
+        self.ok("Removed {} expired entries".format(cache.expire()))
+
+    def vacuum(self):
+        before = self._get_file_size(cache.path)
+        cache.vacuum()
+        self.ok("Cache compacted from {} to {}".format(
+            self._get_human_size(before),
+            self._get_human_size(self._get_file_size(cache.path))
+        ))
+
+    def drop(self):
+        self.ok('Removed {} entries from "{}"'.format(
+            cache.clear(namespace=self.arguments.namespace),
+            self.arguments.namespace
+        ))
+
+    @staticmethod
+    def _get_file_size(path):
+        """
+        The engine may spread the cache over a few files (SQLite's WAL for
+        example), so we count everything that starts with the cache's name.
+        """
+        directory, name = os.path.split(path)
+        r = 0
+        for filename in os.listdir(directory):
+            if filename.startswith(name):
+                r += os.path.getsize(os.path.join(directory, filename))
+        return r
+
+    @staticmethod
+    def _get_human_size(size):
+        if size < 1024:
+            return "{} B".format(size)
+        for unit in ("KiB", "MiB", "GiB"):
+            size /= 1024.0
+            if size < 1024:
+                break
+        return "{:.1f} {}".format(size, unit)
@@ -10,6 +10,7 @@ from ripe.atlas.tools.aggregators import ValueKeyAggregator, aggregate
 from .base import Command as BaseCommand, TabularFieldsMixin
 from ..exceptions import RipeAtlasToolsException
 from ..helpers.colours import colourise
+from ..probes.store import store
 
 
 class Command(TabularFieldsMixin, BaseCommand):
@@ -151,8 +152,33 @@ class Command(TabularFieldsMixin, BaseCommand):
             )
         )
 
+        offline = self.parser.add_argument_group("Offline")
+        offline.add_argument(
+            "--import-archive",
+            type=str,
+            metavar="FILE",
+            help="Import a probe archive dump (JSON, optionally gzip, bz2, or "
+                 "xz compressed) into the local probe store.  Importing a "
+                 "newer dump only updates the probes that have changed."
+        )
+        offline.add_argument(
+            "--offline",
+            action="store_true",
+            help="Answer the query from the local probe store rather than "
+                 "the API."
+        )
+
     def run(self):
 
+        if self.arguments.import_archive:
+            added, updated, unchanged = store.import_file(
+                self.arguments.import_archive)
+            self.ok(
+                "Imported {} new and {} updated probes ({} unchanged) into "
+                "{}".format(added, updated, unchanged, store.path)
+            )
+            return
+
         if not self.arguments.field:
             self.arguments.field = (
                 "id", "asn_v4", "asn_v6", "country", "status")
@@ -169,7 +195,15 @@ class Command(TabularFieldsMixin, BaseCommand):
             ))
 
         self.set_aggregators()
-        probes = ProbeRequest(return_objects=True, **filters)
+        if self.arguments.offline:
+            if not store.exists:
+                raise RipeAtlasToolsException(
+                    "The local probe store is empty.  You can populate it "
+                    "with --import-archive."
+                )
+            probes = store.filter(**filters)
+        else:
+            probes = ProbeRequest(return_objects=True, **filters)
         truncated_probes = itertools.islice(
             probes, self.arguments.limit)
 
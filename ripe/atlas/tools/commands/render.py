@@ -1,17 +1,19 @@
 from __future__ import print_function
 
-import sys
-
+import functools
 import itertools
-
-try:
-    import ujson as json
-except ImportError:
-    import json
+import sys
 
 from ripe.atlas.sagan import Result
 
-from ..aggregators import RangeKeyAggregator, ValueKeyAggregator, aggregate
+from ..aggregators import (
+    BucketSummary, RangeKeyAggregator, SortedSummary, ValueKeyAggregator,
+    aggregate, summarise)
+from ..exceptions import RipeAtlasToolsException
+from ..helpers.compression import Compression
+from ..helpers.formats import Format
+from ..helpers.json_array import JSONArrayDecoder
+from ..helpers.mapped_file import MappedFile
 from ..helpers.rendering import SaganSet, Rendering
 from ..helpers.validators import ArgumentType
 from ..renderers import Renderer
@@ -39,6 +41,9 @@ class Command(BaseCommand):
         "prefix_v6": ["probe.prefix_v6", ValueKeyAggregator],
     }
 
+    # How much of a JSON array to read at a time
+    CHUNK_SIZE = 64 * 1024
+
     def __init__(self, *args, **kwargs):
         BaseCommand.__init__(self, *args, **kwargs)
         self.file = None
@@ -64,7 +69,9 @@ class Command(BaseCommand):
             type=ArgumentType.path,
             default="-",
             help='The source of the data to be rendered.  If nothing is '
-                 'specified, we assume "-" or, standard in (the default).'
+                 'specified, we assume "-" or, standard in (the default).  '
+                 'Files compressed with gzip, bz2, xz, or zstd are '
+                 'decompressed on the fly.'
         )
         self.parser.add_argument(
             "--aggregate-by",
@@ -74,7 +81,43 @@ class Command(BaseCommand):
             help="Tell the rendering engine to aggregate the results by the "
                  "selected option.  Note that if you opt for aggregation, no "
                  "output will be generated until all results are received, and "
-                 "if large data sets may explode your system."
+                 "if large data sets may explode your system (unless you "
+                 "--summarise them)."
+        )
+        self.parser.add_argument(
+            "--jobs",
+            type=ArgumentType.integer_range(minimum=1),
+            default=1,
+            help="The number of processes to parse the results with.  Parsing "
+                 "is usually the bottleneck when rendering large files, so "
+                 "setting this to the number of cores you have can help a "
+                 "lot.  The output order is unaffected."
+        )
+        self.parser.add_argument(
+            "--summarise",
+            type=ArgumentType.integer_range(minimum=0),
+            metavar="N",
+            help="Summarise each aggregation bucket rather than keeping every "
+                 "result in it: a count, some statistics on the median RTTs, "
+                 "and only the first N results to show.  Memory use then "
+                 "depends on the number of buckets rather than the number of "
+                 "results."
+        )
+        self.parser.add_argument(
+            "--presorted",
+            action="store_true",
+            help="The results are already grouped by the first --aggregate-by "
+                 "option (sorted by it, say, or in windows of time), so each "
+                 "bucket can be summarised and written as soon as the next "
+                 "one starts.  Implies --summarise."
+        )
+        self.parser.add_argument(
+            "--format",
+            choices=Format.get_available(),
+            help="Rather than rendering the results, write them out as rows "
+                 "of fields, with a fixed set of columns for each type of "
+                 "measurement.  This can't be combined with --renderer or "
+                 "--aggregate-by."
         )
 
     def run(self):
@@ -83,17 +126,66 @@ class Command(BaseCommand):
 
         sample, source = self._get_sample_result_and_source(using_regular_file)
 
-        results = SaganSet(iterable=source, probes=self.arguments.probes)
+        kind = Result.get(sample).type
+
+        try:
+            if self.arguments.format:
+                self._write_format(kind, source)
+            else:
+                self._render(kind, source)
+        finally:
+            if using_regular_file:
+                self.file.close()
+
+    def _render(self, kind, source):
+
+        renderer = Renderer.get_renderer(self.arguments.renderer, kind)()
+
+        aggregators = []
         if self.arguments.aggregate_by:
-            results = aggregate(results, self.get_aggregators())
+            aggregators = self.get_aggregators()
+        elif self.arguments.summarise is not None or \
+                self.arguments.presorted:
+            raise RipeAtlasToolsException(
+                "--summarise and --presorted only apply to --aggregate-by")
 
-        renderer = Renderer.get_renderer(
-            self.arguments.renderer, Result.get(sample).type)()
+        results = SaganSet(
+            iterable=source,
+            probes=self.arguments.probes,
+            jobs=self.arguments.jobs,
+            attach_probes=renderer.REQUIRES_PROBES or any(
+                a.requires_probes for a in aggregators),
+            accumulate=renderer.accumulate
+        )
+        if aggregators:
+            results = self._aggregate(results, aggregators)
 
         Rendering(renderer=renderer, payload=results).render()
 
-        if using_regular_file:
-            self.file.close()
+    def _write_format(self, kind, source):
+
+        if self.arguments.renderer or self.arguments.aggregate_by:
+            raise RipeAtlasToolsException(
+                "--format can't be combined with --renderer or --aggregate-by")
+
+        Format.get(self.arguments.format)(kind).render(SaganSet(
+            iterable=source,
+            probes=self.arguments.probes,
+            jobs=self.arguments.jobs,
+            attach_probes=False
+        ))
+
+    def _aggregate(self, results, aggregators):
+
+        size = self.arguments.summarise
+        if size is None and self.arguments.presorted:
+            size = BucketSummary.SIZE
+
+        if self.arguments.presorted:
+            return SortedSummary(results, aggregators, size)
+        if size is not None:
+            return summarise(results, aggregators, size)
+        return aggregate(results, aggregators)
 
     def get_aggregators(self):
         """
@@ -121,25 +213,50 @@ class Command(BaseCommand):
         """
         We need to get the first result from the source in order to detect the
         type.  Additionally, if the source is actually one great big JSON list,
-        then we need to parse it so we iterate over the results since there's no
-        newline characters.
+        then we need to decode it as we go since there's no newline characters
+        to iterate over.
+
+        Regular files with a result on each line are memory-mapped, and
+        indexed so that we can find each line again without rescanning.
+        Compressed files are decompressed on a separate thread as we go.
         """
 
+        compressed = False
+
         self.file = sys.stdin
         if using_regular_file:
-            self.file = open(self.arguments.from_file)
+            compressed = bool(Compression.detect(self.arguments.from_file))
+            if compressed:
+                self.file = Compression.open_text(self.arguments.from_file)
+            else:
+                self.file = open(self.arguments.from_file)
 
-        # Pop the first line off the source stack.  This may very well be a Very
-        # Large String and cause a memory explosion, but we like to let our
-        # users shoot themselves in the foot.
-        sample = self.file.next()
+        # Peek at the first character to see what we're dealing with.  Reading
+        # a whole line here could mean reading a Very Large String.
+        head = self.file.read(1)
+        while head.isspace():
+            head = self.file.read(1)
 
-        # Re-attach the line back onto the iterable so we don't lose anything
-        source = itertools.chain([sample], self.file)
+        if head == "[":
+            chunks = itertools.chain(
+                [head],
+                iter(functools.partial(self.file.read, self.CHUNK_SIZE), "")
+            )
+            source = iter(JSONArrayDecoder(chunks))
+            sample = next(source, None)  # An actual result
+            source = itertools.chain([sample], source)
+        elif using_regular_file and not compressed:
+            self.file.close()
+            self.file = MappedFile(self.arguments.from_file)
+            sample = self.file.get_line(0) if len(self.file) else None
+            source = self.file
+        else:
+            sample = head + next(self.file, "")
+            source = itertools.chain([sample], self.file)
 
-        # In the case of the Very Large String, we parse out the JSON here
-        if sample.startswith("["):
-            source = json.loads("".join(source))
-            sample = source[0]  # Reassign sample to an actual result
+        if not sample:
+            if using_regular_file:
+                self.file.close()
+            raise RipeAtlasToolsException("There's nothing here to render")
 
         return sample, source
@@ -3,8 +3,10 @@ from __future__ import print_function
 from ripe.atlas.cousteau import (
     AtlasLatestRequest, AtlasResultsRequest, Measurement, APIResponseError)
 
-from ..aggregators import RangeKeyAggregator, ValueKeyAggregator, aggregate
+from ..aggregators import (
+    RangeKeyAggregator, ValueKeyAggregator, aggregate, summarise)
 from ..exceptions import RipeAtlasToolsException
+from ..helpers.formats import Format
 from ..helpers.rendering import SaganSet, Rendering
 from ..helpers.validators import ArgumentType
 from ..renderers import Renderer
@@ -72,6 +74,24 @@ class Command(BaseCommand):
             type=ArgumentType.datetime,
             help="The stop time of the report."
         )
+        self.parser.add_argument(
+            "--summarise",
+            type=ArgumentType.integer_range(minimum=0),
+            metavar="N",
+            help="Summarise each aggregation bucket rather than keeping every "
+                 "result in it: a count, some statistics on the median RTTs, "
+                 "and only the first N results to show.  Memory use then "
+                 "depends on the number of buckets rather than the number of "
+                 "results."
+        )
+        self.parser.add_argument(
+            "--format",
+            choices=Format.get_available(),
+            help="Rather than rendering the results, write them out as rows "
+                 "of fields, with a fixed set of columns for each type of "
+                 "measurement.  This can't be combined with --renderer or "
+                 "--aggregate-by."
+        )
 
     def _get_request(self):
 
@@ -94,18 +114,41 @@ class Command(BaseCommand):
         except APIResponseError:
             raise RipeAtlasToolsException("That measurement does not exist")
 
-        renderer = Renderer.get_renderer(
-            self.arguments.renderer, measurement.type.lower())()
+        kind = measurement.type.lower()
 
-        results = self._get_request().get()[1]
+        if self.arguments.format:
+            if self.arguments.renderer or self.arguments.aggregate_by:
+                raise RipeAtlasToolsException(
+                    "--format can't be combined with --renderer or "
+                    "--aggregate-by")
+            format_ = Format.get(self.arguments.format)(kind)
+            format_.render(SaganSet(
+                iterable=self._get_results(),
+                probes=self.arguments.probes,
+                attach_probes=False
+            ))
+            return
 
-        if not results:
-            raise RipeAtlasToolsException(
-                "There aren't any results available for that measurement")
+        renderer = Renderer.get_renderer(self.arguments.renderer, kind)()
 
-        results = SaganSet(iterable=results, probes=self.arguments.probes)
+        results = self._get_results()
+
+        aggregators = []
         if self.arguments.aggregate_by:
-            results = aggregate(results, self.get_aggregators())
+            aggregators = self.get_aggregators()
+        elif self.arguments.summarise is not None:
+            raise RipeAtlasToolsException(
+                "--summarise only applies to --aggregate-by")
+
+        results = SaganSet(
+            iterable=results,
+            probes=self.arguments.probes,
+            attach_probes=renderer.REQUIRES_PROBES or any(
+                a.requires_probes for a in aggregators),
+            accumulate=renderer.accumulate
+        )
+        if aggregators:
+            results = self._aggregate(results, aggregators)
 
         Rendering(
             renderer=renderer,
@@ -113,6 +156,22 @@ class Command(BaseCommand):
             payload=results
         ).render()
 
+    def _get_results(self):
+
+        results = self._get_request().get()[1]
+
+        if not results:
+            raise RipeAtlasToolsException(
+                "There aren't any results available for that measurement")
+
+        return results
+
+    def _aggregate(self, results, aggregators):
+        if self.arguments.summarise is not None:
+            return summarise(
+                results, aggregators, self.arguments.summarise)
+        return aggregate(results, aggregators)
+
     def get_aggregators(self):
         """Return aggregators list based on user input"""
         aggregation_keys = []
@@ -3,6 +3,7 @@ from __future__ import print_function, absolute_import
 from ripe.atlas.cousteau import Measurement, APIResponseError
 
 from ..exceptions import RipeAtlasToolsException
+from ..helpers.formats import Format
 from ..renderers import Renderer
 from ..streaming import Stream, CaptureLimitExceeded
 from .base import Command as BaseCommand
@@ -34,9 +35,20 @@ class Command(BaseCommand):
             help="The renderer you want to use. If this isn't defined, an "
                  "appropriate renderer will be selected."
         )
+        self.parser.add_argument(
+            "--format",
+            choices=Format.get_available(),
+            help="Rather than rendering the results, write them out as rows "
+                 "of fields, with a fixed set of columns for each type of "
+                 "measurement.  This can't be combined with --renderer."
+        )
 
     def run(self):
 
+        if self.arguments.format and self.arguments.renderer:
+            raise RipeAtlasToolsException(
+                "--format can't be combined with --renderer")
+
         try:
             measurement = Measurement(id=self.arguments.measurement_id)
         except APIResponseError:
@@ -46,7 +58,8 @@ class Command(BaseCommand):
             Stream(capture_limit=self.arguments.limit).stream(
                 self.arguments.renderer,
                 measurement.type.lower(),
-                self.arguments.measurement_id
+                self.arguments.measurement_id,
+                format_name=self.arguments.format
             )
         except (KeyboardInterrupt, CaptureLimitExceeded):
             self.ok("Disconnecting from the stream")
@@ -0,0 +1,157 @@
+import bz2
+import gzip
+import io
+import threading
+
+from six.moves import queue
+
+try:
+    import lzma
+except ImportError:  # Python 2
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from ..exceptions import RipeAtlasToolsException
+
+
+class Compression(object):
+    """
+    Sniffs the compression format of a file from its first few bytes, so that
+    we can read compressed files without relying on their extension.
+    """
+
+    MAGIC = (
+        (b"\x1f\x8b", "gzip"),
+        (b"BZh", "bz2"),
+        (b"\xfd7zXZ\x00", "xz"),
+        (b"\x28\xb5\x2f\xfd", "zstd"),
+    )
+
+    @classmethod
+    def detect(cls, path):
+        """
+        Returns the name of the compression format used for the file at
+        `path`, or None if it doesn't look compressed.
+        """
+        with open(path, "rb") as f:
+            head = f.read(8)
+        for magic, name in cls.MAGIC:
+            if head.startswith(magic):
+                return name
+        return None
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open `path` for reading in binary mode, decompressing on the fly if
+        need be.
+        """
+
+        kind = cls.detect(path)
+
+        if kind == "gzip":
+            return gzip.open(path, "rb")
+        if kind == "bz2":
+            return bz2.BZ2File(path, "rb")
+        if kind == "xz":
+            if lzma is None:
+                raise RipeAtlasToolsException(
+                    "Reading xz-compressed files requires Python 3")
+            return lzma.open(path, "rb")
+        if kind == "zstd":
+            if zstandard is None:
+                raise RipeAtlasToolsException(
+                    "Reading zstd-compressed files requires the zstandard "
+                    "package.  You can install it with: "
+                    "pip install ripe.atlas.tools[zstd]"
+                )
+            return zstandard.ZstdDecompressor().stream_reader(
+                open(path, "rb"), closefd=True)
+
+        return open(path, "rb")
+
+    @classmethod
+    def open_text(cls, path):
+        """
+        Open a compressed file for reading as text, with the decompression
+        done on a separate thread.
+        """
+        return io.TextIOWrapper(
+            io.BufferedReader(ThreadedReader(cls.open(path))),
+            encoding="utf-8"
+        )
+
+
+class ThreadedReader(io.RawIOBase):
+    """
+    Reads from a binary file object on a background thread, keeping up to
+    DEPTH chunks of CHUNK_SIZE bytes ready for whoever's reading from us.
+    The decompressors release the GIL while they work, so wrapping one of
+    them in this means decompression can happen alongside whatever we're
+    doing with what's already been decompressed.
+    """
+
+    CHUNK_SIZE = 256 * 1024
+    DEPTH = 8
+
+    def __init__(self, source):
+        io.RawIOBase.__init__(self)
+        self._source = source
+        self._queue = queue.Queue(self.DEPTH)
+        self._chunk = b""
+        self._offset = 0
+        self._finished = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._fill)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+
+        while self._offset >= len(self._chunk):
+            if self._finished:
+                return 0
+            chunk = self._queue.get()
+            if isinstance(chunk, BaseException):
+                self._finished = True
+                raise chunk
+            if not chunk:
+                self._finished = True
+                return 0
+            self._chunk, self._offset = chunk, 0
+
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        self._stopped.set()
+        # Make room in the queue, in case the thread is waiting on it
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._source.close()
+        io.RawIOBase.close(self)
+
+    def _fill(self):
+        try:
+            while not self._stopped.is_set():
+                chunk = self._source.read(self.CHUNK_SIZE)
+                self._queue.put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:
+            self._queue.put(e)
@@ -0,0 +1,451 @@
+import calendar
+import csv
+import json
+import sys
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from ..exceptions import RipeAtlasToolsException
+from .sink import OutputSink
+
+
+class Schema(object):
+    """
+    How to flatten one kind of result into rows of a fixed set of columns, so
+    that results can be loaded straight into a spreadsheet, a database, or a
+    dataframe.  Each result becomes one row per packet, hop, response, or
+    whatever else it has several of; a result without any of them still gets
+    a row, so it isn't lost.
+
+    COLUMNS are `(name, type)` pairs, with the types being one of "int",
+    "float", "str", or "timestamp" (seconds since the epoch).
+    """
+
+    KINDS = ()
+
+    COMMON = (
+        ("msm_id", "int"),
+        ("prb_id", "int"),
+        ("timestamp", "timestamp"),
+        ("from", "str"),
+    )
+
+    COLUMNS = ()
+
+    @classmethod
+    def get(cls, kind):
+        for schema in cls.__subclasses__():
+            if kind in schema.KINDS:
+                return schema()
+        raise RipeAtlasToolsException(
+            'Measurements of type "{}" have no structured output '
+            'format'.format(kind))
+
+    @property
+    def columns(self):
+        return self.COMMON + self.COLUMNS
+
+    @property
+    def names(self):
+        return [name for name, _ in self.columns]
+
+    def accepts(self, result):
+        return result.type in self.KINDS
+
+    def get_rows(self, result):
+        common = (
+            result.measurement_id,
+            result.probe_id,
+            result.created_timestamp,
+            result.origin,
+        )
+        rows = list(self._get_rows(result))
+        if not rows:
+            rows = [(None,) * len(self.COLUMNS)]
+        for row in rows:
+            yield common + tuple(row)
+
+    def _get_rows(self, result):
+        raise NotImplementedError()
+
+    @staticmethod
+    def _get_timestamp(value):
+        if value is None:
+            return None
+        return calendar.timegm(value.utctimetuple())
+
+
+class PingSchema(Schema):
+
+    KINDS = ("ping",)
+
+    COLUMNS = (
+        ("af", "int"),
+        ("dst_addr", "str"),
+        ("dst_name", "str"),
+        ("sent", "int"),
+        ("rcvd", "int"),
+        ("packet", "int"),
+        ("rtt", "float"),
+        ("ttl", "int"),
+    )
+
+    def _get_rows(self, result):
+        for i, packet in enumerate(result.packets):
+            yield (
+                result.af,
+                result.destination_address,
+                result.destination_name,
+                result.packets_sent,
+                result.packets_received,
+                i,
+                packet.rtt,
+                packet.ttl,
+            )
+
+
+class TracerouteSchema(Schema):
+
+    KINDS = ("traceroute",)
+
+    COLUMNS = (
+        ("af", "int"),
+        ("dst_addr", "str"),
+        ("dst_name", "str"),
+        ("hop", "int"),
+        ("packet", "int"),
+        ("origin", "str"),
+        ("rtt", "float"),
+        ("ttl", "int"),
+    )
+
+    def _get_rows(self, result):
+        for hop in result.hops:
+            for i, packet in enumerate(hop.packets):
+                yield (
+                    result.af,
+                    result.destination_address,
+                    result.destination_name,
+                    hop.index,
+                    i,
+                    packet.origin,
+                    packet.rtt,
+                    packet.ttl,
+                )
+
+
+class DnsSchema(Schema):
+
+    KINDS = ("dns",)
+
+    COLUMNS = (
+        ("af", "int"),
+        ("dst_addr", "str"),
+        ("response", "int"),
+        ("protocol", "str"),
+        ("rcode", "str"),
+        ("answers", "int"),
+        ("response_time", "float"),
+        ("response_size", "int"),
+    )
+
+    def _get_rows(self, result):
+        for i, response in enumerate(result.responses):
+            rcode = answers = None
+            if response.abuf and response.abuf.header:
+                rcode = response.abuf.header.return_code
+                answers = response.abuf.header.ancount
+            yield (
+                response.af,
+                response.destination_address,
+                i,
+                response.protocol,
+                rcode,
+                answers,
+                response.response_time,
+                response.response_size,
+            )
+
+
+class SslSchema(Schema):
+
+    # Sagan calls these "ssl", while the API calls them "sslcert"
+    KINDS = ("sslcert", "ssl")
+
+    COLUMNS = (
+        ("af", "int"),
+        ("dst_addr", "str"),
+        ("dst_name", "str"),
+        ("port", "int"),
+        ("certificate", "int"),
+        ("subject_cn", "str"),
+        ("issuer_cn", "str"),
+        ("valid_from", "timestamp"),
+        ("valid_until", "timestamp"),
+        ("checksum_sha256", "str"),
+    )
+
+    def _get_rows(self, result):
+        for i, certificate in enumerate(result.certificates):
+            yield (
+                result.af,
+                result.destination_address,
+                result.destination_name,
+                result.port,
+                i,
+                certificate.subject_cn,
+                certificate.issuer_cn,
+                self._get_timestamp(certificate.valid_from),
+                self._get_timestamp(certificate.valid_until),
+                certificate.checksum_sha256,
+            )
+
+
+class HttpSchema(Schema):
+
+    KINDS = ("http",)
+
+    COLUMNS = (
+        ("uri", "str"),
+        ("method", "str"),
+        ("response", "int"),
+        ("af", "int"),
+        ("dst_addr", "str"),
+        ("code", "int"),
+        ("response_time", "float"),
+        ("head_size", "int"),
+        ("body_size", "int"),
+    )
+
+    def _get_rows(self, result):
+        for i, response in enumerate(result.responses):
+            yield (
+                result.uri,
+                result.method,
+                i,
+                response.af,
+                response.destination_address,
+                response.code,
+                response.response_time,
+                response.head_size,
+                response.body_size,
+            )
+
+
+class NtpSchema(Schema):
+
+    KINDS = ("ntp",)
+
+    COLUMNS = (
+        ("af", "int"),
+        ("dst_addr", "str"),
+        ("dst_name", "str"),
+        ("stratum", "int"),
+        ("packet", "int"),
+        ("rtt", "float"),
+        ("offset", "float"),
+    )
+
+    def _get_rows(self, result):
+        for i, packet in enumerate(result.packets):
+            yield (
+                result.af,
+                result.destination_address,
+                result.destination_name,
+                result.stratum,
+                i,
+                packet.rtt,
+                packet.offset,
+            )
+
+
+class Format(object):
+    """
+    Writes results out as rows of their type's Schema, rather than rendering
+    them for people to read.  Results of any other type are skipped.
+    """
+
+    NAME = None
+
+    def __init__(self, kind, stream=None):
+        self.schema = Schema.get(kind)
+        self.stream = stream or sys.stdout
+
+    @classmethod
+    def get_available(cls):
+        return [format_.NAME for format_ in cls._get_formats()]
+
+    @classmethod
+    def get(cls, name):
+        for format_ in cls._get_formats():
+            if format_.NAME == name:
+                return format_
+        raise RipeAtlasToolsException(
+            'There is no output format called "{}"'.format(name))
+
+    @classmethod
+    def _get_formats(cls):
+        for format_ in cls.__subclasses__():
+            yield format_
+            for subclass in format_._get_formats():
+                yield subclass
+
+    def render(self, results):
+        """
+        Write all of `results` and finish off the output.
+        """
+        for result in results:
+            self.write(result)
+        self.close()
+
+    def write(self, result):
+        if self.schema.accepts(result):
+            for row in self.schema.get_rows(result):
+                self.write_row(row)
+
+    def write_row(self, row):
+        raise NotImplementedError()
+
+    def flush(self):
+        """
+        Write out everything we've been given so far.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Write out everything, and whatever the format needs at the end.  The
+        stream itself is left open.
+        """
+        self.flush()
+
+
+class CsvFormat(Format):
+
+    NAME = "csv"
+
+    def __init__(self, kind, stream=None):
+        Format.__init__(self, kind, stream=stream)
+        self.sink = OutputSink(self.stream, immediate=False)
+        self.writer = csv.writer(self.sink, lineterminator="\n")
+        self.writer.writerow(self.schema.names)
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+
+    def flush(self):
+        self.sink.flush()
+
+
+class NdjsonFormat(Format):
+
+    NAME = "ndjson"
+
+    def __init__(self, kind, stream=None):
+        Format.__init__(self, kind, stream=stream)
+        self.sink = OutputSink(self.stream, immediate=False)
+        self.names = self.schema.names
+
+    def write_row(self, row):
+        self.sink.write(json.dumps(
+            dict(zip(self.names, row)), separators=(",", ":")) + "\n")
+
+    def flush(self):
+        self.sink.flush()
+
+
+class ArrowFormat(Format):
+    """
+    Apache Arrow's IPC streaming format, written BATCH_SIZE rows at a time.
+    """
+
+    NAME = "arrow"
+
+    BATCH_SIZE = 64 * 1024
+
+    TYPES = {
+        "int": "int64",
+        "float": "float64",
+        "str": "string",
+    }
+
+    def __init__(self, kind, stream=None):
+
+        if pyarrow is None:
+            raise RipeAtlasToolsException(
+                "Writing {} requires the pyarrow package.  You can install "
+                "it with: pip install ripe.atlas.tools[arrow]".format(
+                    self.NAME))
+
+        Format.__init__(self, kind, stream=stream)
+
+        # The binary stream underneath stdout, if that's what we've got
+        self.stream = getattr(self.stream, "buffer", self.stream)
+        if OutputSink._is_tty(self.stream):
+            raise RipeAtlasToolsException(
+                "The {} format is binary, so it won't be written to a "
+                "terminal.  Redirect the output to a file instead.".format(
+                    self.NAME))
+
+        self.arrow_schema = pyarrow.schema([
+            (name, self._get_type(kind_))
+            for name, kind_ in self.schema.columns
+        ])
+        self.writer = self._get_writer()
+        self.rows = []
+
+    def write_row(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.BATCH_SIZE:
+            self._write_batch()
+
+    def flush(self):
+        self._write_batch()
+        self.stream.flush()
+
+    def close(self):
+        self._write_batch()
+        self.writer.close()
+        self.stream.flush()
+
+    def _get_writer(self):
+        return pyarrow.ipc.new_stream(self.stream, self.arrow_schema)
+
+    def _get_type(self, kind):
+        if kind == "timestamp":
+            return pyarrow.timestamp("s", tz="UTC")
+        return pyarrow.type_for_alias(self.TYPES[kind])
+
+    def _write_batch(self):
+        if not self.rows:
+            return
+        columns = zip(*self.rows)
+        self.writer.write_batch(pyarrow.record_batch(
+            [
+                pyarrow.array(column, type=field.type)
+                for column, field in zip(columns, self.arrow_schema)
+            ],
+            schema=self.arrow_schema
+        ))
+        self.rows = []
+
+
+class ParquetFormat(ArrowFormat):
+    """
+    Parquet, with each batch written as a row group.
+    """
+
+    NAME = "parquet"
+
+    def _get_writer(self):
+        return pyarrow.parquet.ParquetWriter(self.stream, self.arrow_schema)
+
+    def flush(self):
+        # A Parquet file can't be read until it's finished anyway, so there's
+        # no point in writing lots of little row groups while streaming.
+        self.stream.flush()
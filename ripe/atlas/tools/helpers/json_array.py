@@ -0,0 +1,115 @@
+import json
+
+from ..exceptions import RipeAtlasToolsException
+
+
+class JSONArrayDecoder(object):
+    """
+    Decodes a JSON array, one element at a time, from an iterable of text
+    chunks, so that a huge array (like a results download from the API)
+    can be worked through without ever holding all of it in memory.  Only
+    the element being decoded, plus a chunk or so, is kept around.
+    """
+
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._exhausted = False
+
+    def __iter__(self):
+
+        self._expect("[")
+
+        if self._peek() == "]":
+            return
+
+        while True:
+
+            yield self._decode()
+
+            separator = self._peek()
+            if separator == "]":
+                return
+            self._expect(",")
+
+    def _decode(self):
+        """
+        Decode the element starting at our position.  If it runs off the end
+        of the buffer we read some more and try again, reading at least as
+        much as we've already got so that a very large element doesn't cost
+        us a decode attempt per chunk.
+        """
+
+        self._peek()
+
+        while True:
+
+            try:
+                element, end = self._decoder.raw_decode(
+                    self._buffer, self._position)
+            except ValueError:
+                element, end = None, None
+
+            # A number at the very end of the buffer may only be part of one,
+            # so something has to follow the element before we trust it.
+            if end is not None and (end < len(self._buffer) or
+                                    self._exhausted):
+                self._position = end
+                return element
+
+            if not self._read(len(self._buffer) - self._position):
+                if end is not None:
+                    self._position = end
+                    return element
+                raise RipeAtlasToolsException(
+                    "The JSON array is malformed or truncated")
+
+    def _expect(self, character):
+        if self._peek() != character:
+            raise RipeAtlasToolsException(
+                'Expected "{}" in the JSON array'.format(character))
+        self._position += 1
+
+    def _peek(self):
+        """
+        Skip over whitespace, returning the next character or None at the end
+        of the input.
+        """
+        while True:
+            while self._position < len(self._buffer):
+                character = self._buffer[self._position]
+                if character not in self.WHITESPACE:
+                    return character
+                self._position += 1
+            if not self._read():
+                return None
+
+    def _read(self, minimum=0):
+        """
+        Append at least `minimum` characters (or at least one chunk) to the
+        buffer, dropping whatever we've already decoded.  Returns False if
+        there's nothing left to read.
+        """
+
+        chunks = [self._buffer[self._position:]]
+        self._position = 0
+
+        read = 0
+        while not self._exhausted:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._exhausted = True
+                break
+            chunks.append(chunk)
+            read += len(chunk)
+            if chunk and read >= minimum:
+                break
+
+        self._buffer = "".join(chunks)
+
+        return read > 0
@@ -0,0 +1,165 @@
+import array
+import mmap
+import os
+import struct
+
+try:
+    array.array("Q")
+    TYPECODE = "Q"
+except ValueError:  # Python 2
+    TYPECODE = "L"
+
+
+class MappedFile(object):
+    """
+    A read-only, memory-mapped file of newline-delimited results, along with
+    an index of where each (non-blank) line starts.  The index is saved next
+    to the file as <file>.idx, so rendering the same file again, say with a
+    different renderer or aggregation, needn't scan it again.  If we can't
+    write there, we just keep the index in memory.
+
+    Since the operating system does the reading, worker processes can map
+    the same file and work on byte ranges of it without any of it having to
+    be copied across to them.
+    """
+
+    INDEX_SUFFIX = ".idx"
+
+    # Magic, offset size in bytes, file size, file modification time (ns)
+    HEADER = struct.Struct("<8sBQQ")
+    MAGIC = b"RAT-IDX1"
+
+    WHITESPACE = b" \t\r\n"
+
+    def __init__(self, path):
+
+        self.path = path
+        self.index_path = path + self.INDEX_SUFFIX
+
+        self._file = open(path, "rb")
+        self._stat = os.fstat(self._file.fileno())
+
+        # Empty files can't be mapped
+        self._map = b""
+        if self._stat.st_size:
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._offsets = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_line(i)
+
+    @property
+    def offsets(self):
+        """
+        Where each line starts, with the size of the file tacked on the end
+        so that line `i` is always between `offsets[i]` and `offsets[i + 1]`.
+        """
+        if self._offsets is None:
+            self._offsets = self._read_index()
+            if self._offsets is None:
+                self._offsets = self._build_index()
+                self._write_index()
+        return self._offsets
+
+    def get_line(self, i):
+        return self.read_lines(self.offsets[i], self.offsets[i + 1])[0]
+
+    def read_lines(self, start, stop):
+        """
+        The non-blank lines between bytes `start` and `stop`, decoded.
+        """
+        return [
+            line.decode("utf-8")
+            for line in self._map[start:stop].split(b"\n")
+            if line.strip(self.WHITESPACE)
+        ]
+
+    def get_ranges(self, lines):
+        """
+        Split the file into `(start, stop)` byte ranges of `lines` lines each.
+        """
+        offsets = self.offsets
+        for i in range(0, len(self), lines):
+            yield offsets[i], offsets[min(i + lines, len(self))]
+
+    def close(self):
+        if self._stat.st_size:
+            self._map.close()
+        self._file.close()
+
+    def _get_header(self):
+        return self.HEADER.pack(
+            self.MAGIC,
+            array.array(TYPECODE).itemsize,
+            self._stat.st_size,
+            int(self._stat.st_mtime * 1e9)
+        )
+
+    def _build_index(self):
+
+        offsets = array.array(TYPECODE)
+
+        size = self._stat.st_size
+        position = 0
+        while position < size:
+            end = self._map.find(b"\n", position)
+            if end == -1:
+                end = size
+            if self._map[position:end].strip(self.WHITESPACE):
+                offsets.append(position)
+            position = end + 1
+
+        offsets.append(size)
+
+        return offsets
+
+    def _read_index(self):
+        """
+        Load the index from disk, so long as it was built for the file as it
+        is now.
+        """
+
+        try:
+            with open(self.index_path, "rb") as f:
+                if f.read(self.HEADER.size) != self._get_header():
+                    return None
+                data = f.read()
+        except (IOError, OSError):
+            return None
+
+        offsets = array.array(TYPECODE)
+        try:
+            offsets.frombytes(data)
+        except AttributeError:  # Python 2
+            offsets.fromstring(data)
+        except ValueError:
+            return None
+
+        if not offsets or offsets[-1] != self._stat.st_size:
+            return None
+
+        return offsets
+
+    def _write_index(self):
+        """
+        Save the index atomically, so that a concurrent render never sees half
+        of one.  It's only an optimisation, so failing is fine.
+        """
+
+        temporary = "{}.{}".format(self.index_path, os.getpid())
+        try:
+            with open(temporary, "wb") as f:
+                f.write(self._get_header())
+                self._offsets.tofile(f)
+            os.rename(temporary, self.index_path)
+        except (IOError, OSError):
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
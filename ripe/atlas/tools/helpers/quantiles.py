@@ -0,0 +1,95 @@
+import bisect
+import math
+
+
+def get_percentile(values, p):
+    """
+    The `p` (0 to 1) quantile of the already-sorted `values`, interpolating
+    between the closest two when it falls between them, as most tools do.
+    """
+
+    if not values:
+        return None
+
+    position = p * (len(values) - 1)
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(values) - 1)
+    fraction = position - lower
+
+    # Weighted like this, the median of an even number of values comes out
+    # exactly as (a + b) / 2 does
+    return values[lower] * (1 - fraction) + values[upper] * fraction
+
+
+class P2Quantile(object):
+    """
+    An estimate of the `p` (0 to 1) quantile of a stream of numbers, in
+    constant memory, using the P-squared algorithm of Jain & Chlamtac (1985).
+    Five markers track the minimum, the maximum, the quantile itself, and the
+    quantiles halfway between it and either end; as numbers arrive, the
+    markers are nudged along a parabola through their neighbours.  It's exact
+    for up to five numbers, and usually within a percent or so after that.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2.0, p, (1 + p) / 2.0, 1]
+
+    @property
+    def value(self):
+        if self.count <= 5:
+            return get_percentile(self._heights, self.p)
+        return self._heights[2]
+
+    def add(self, x):
+
+        self.count += 1
+
+        heights = self._heights
+        if self.count <= 5:
+            bisect.insort(heights, x)
+            return
+
+        positions = self._positions
+
+        # Find the cell x falls in, stretching the ends to fit it if need be
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(heights, x) - 1
+
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the middle markers towards where they should be
+        for i in (1, 2, 3):
+            d = self._desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._get_parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._get_linear(i, d)
+                heights[i] = height
+                positions[i] += d
+
+    def _get_parabolic(self, i, d):
+        q, n = self._heights, self._positions
+        return q[i] + float(d) / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _get_linear(self, i, d):
+        q, n = self._heights, self._positions
+        return q[i] + float(d) * (q[i + d] - q[i]) / (n[i + d] - n[i])
@@ -1,8 +1,149 @@
 from __future__ import print_function
 
+import collections
+import multiprocessing
+import re
+import sys
+import threading
+
+import six
+from six.moves import queue
+
 from ripe.atlas.sagan import Result, ResultParseError
 
 from ..probes import Probe
+from ..settings import conf
+from .mapped_file import MappedFile
+from .sink import OutputSink
+
+
+# Finds the probe id in a line of JSON without having to parse all of it
+PROBE_ID_REGEX = re.compile(r'"prb_id"\s*:\s*(\d+)')
+
+
+def _is_wanted(line, probes):
+    """
+    A cheap look at an unparsed result to see whether it could have come
+    from one of `probes`.  If we can't tell, we let Sagan figure it out.
+    """
+
+    if isinstance(line, dict):
+        probe_id = line.get("prb_id")
+        return probe_id is None or probe_id in probes
+
+    probe_ids = PROBE_ID_REGEX.findall(line)
+    return not probe_ids or any(int(pk) in probes for pk in probe_ids)
+
+
+def _parse_results(lines, probes=()):
+    """
+    Turn lines of JSON (or already-parsed dictionaries) into Sagan results,
+    dropping those that don't parse or that came from probes we don't want.
+    SaganSet's worker processes run this too, so it has to live out here where
+    pickle can find it.
+    """
+
+    r = []
+
+    for line in lines:
+        if probes and not _is_wanted(line, probes):
+            continue
+        try:
+            sagan = Result.get(
+                line,
+                on_error=Result.ACTION_IGNORE,
+                on_warning=Result.ACTION_IGNORE
+            )
+            if not probes or sagan.probe_id in probes:
+                r.append(sagan)
+        except ResultParseError:
+            pass  # Probably garbage in the file
+
+    return r
+
+
+# The files each worker process has mapped, by path
+_mapped_files = {}
+
+
+def _parse_mapped_results(path, start, stop, probes=()):
+    """
+    Like _parse_results(), but for the lines between bytes `start` and `stop`
+    of a MappedFile, so that only the offsets have to be sent to the worker.
+    """
+    if path not in _mapped_files:
+        _mapped_files[path] = MappedFile(path)
+    return _parse_results(
+        _mapped_files[path].read_lines(start, stop), probes)
+
+
+class ProbeLookup(object):
+    """
+    A batch of results waiting on a ProbePrefetcher to attach their probes.
+    """
+
+    def __init__(self, sagans):
+        self.sagans = sagans
+        self._done = threading.Event()
+        self._exc_info = None
+
+    @property
+    def is_done(self):
+        return self._done.is_set()
+
+    def finish(self, exc_info=None):
+        self._exc_info = exc_info
+        self._done.set()
+
+    def get(self):
+        """
+        Wait for the probes to be attached, and return the results.  Anything
+        that went wrong in the lookup is raised here.
+        """
+        self._done.wait()
+        if self._exc_info is not None:
+            six.reraise(*self._exc_info)
+        return self.sagans
+
+
+class ProbePrefetcher(threading.Thread):
+    """
+    Attaches probes to batches of results on a background thread, one batch
+    at a time and in the order they were submitted, so that looking up the
+    probes for one batch can overlap with parsing & rendering another.
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+    def submit(self, sagans):
+        lookup = ProbeLookup(sagans)
+        self._queue.put(lookup)
+        return lookup
+
+    def stop(self):
+        """
+        Finish up.  Batches that haven't been looked up yet are abandoned.
+        """
+        self._stopped.set()
+        self._queue.put(None)
+
+    def run(self):
+        while True:
+            lookup = self._queue.get()
+            if lookup is None:
+                return
+            if self._stopped.is_set():
+                lookup.finish()
+                continue
+            try:
+                SaganSet._attach_probes(lookup.sagans)
+                lookup.finish()
+            except Exception:
+                lookup.finish(sys.exc_info())
 
 
 class SaganSet(object):
@@ -10,15 +151,155 @@ class SaganSet(object):
     We need something that doesn't take up a lot of memory while it's being
     constructed, but that will also spread out into a handy string when we need
     it to.
+
+    Results are parsed in batches, and the probes for each batch are looked up
+    on a background thread while earlier batches are being rendered.  Up to
+    `prefetch_depth` batches are looked up ahead of the one being rendered.
+    Batches start out small so that the first results show up quickly, and
+    double in size whenever we find ourselves waiting on the lookups, as
+    that's when fewer, larger lookups pay off.
+
+    Parsing is CPU-bound, so with `jobs` > 1 it's farmed out to that many
+    worker processes, in chunks of CHUNK_SIZE lines.  Results still come out
+    in the order they went in.  If the iterable is a MappedFile, the workers
+    read their chunks straight from the file.
+
+    Set `attach_probes` to False when nothing will look at `result.probe`,
+    and no probes will be looked up at all.
+
+    If you pass `accumulate`, it's called with each result on its way out,
+    which is how a renderer's accumulate() gets to see every result exactly
+    once, however they're aggregated afterwards.
     """
 
-    def __init__(self, iterable=None, probes=()):
-        self._probes = probes
+    MIN_BATCH_SIZE = 100
+    MAX_BATCH_SIZE = 1000
+
+    CHUNK_SIZE = 200
+
+    # How many chunks each worker process may have queued up, so that we
+    # don't read the whole input ahead of the renderer.
+    CHUNKS_PER_JOB = 4
+
+    def __init__(self, iterable=None, probes=(), prefetch_depth=None,
+                 jobs=1, attach_probes=True, accumulate=None):
+        self._probes = frozenset(probes or ())
+        self._accumulate = accumulate
         self._iterable = iterable
+        self._jobs = jobs
+        self._attach = attach_probes
+        self._prefetch_depth = prefetch_depth
+        if prefetch_depth is None:
+            self._prefetch_depth = conf["rendering"]["prefetch-depth"]
 
     def __iter__(self):
 
-        sagans = []
+        if self._accumulate is None:
+            for sagan in self._get_results():
+                yield sagan
+            return
+
+        for sagan in self._get_results():
+            self._accumulate(sagan)
+            yield sagan
+
+    def _get_results(self):
+
+        pool = None
+        if self._jobs > 1:
+            pool = self._get_pool()
+
+        if not self._attach:
+            try:
+                for sagan in self._get_sagans(pool):
+                    yield sagan
+            finally:
+                if pool is not None:
+                    pool.terminate()
+            return
+
+        prefetcher = ProbePrefetcher()
+        prefetcher.start()
+
+        pending = collections.deque()
+        batch_size = self.MIN_BATCH_SIZE
+
+        try:
+
+            sagans = []
+            for sagan in self._get_sagans(pool):
+
+                sagans.append(sagan)
+                if len(sagans) < batch_size:
+                    continue
+
+                pending.append(prefetcher.submit(sagans))
+                sagans = []
+
+                if len(pending) > self._prefetch_depth:
+                    lookup = pending.popleft()
+                    if not lookup.is_done:
+                        batch_size = min(batch_size * 2, self.MAX_BATCH_SIZE)
+                    for sagan in lookup.get():
+                        yield sagan
+
+            if sagans:
+                pending.append(prefetcher.submit(sagans))
+
+            while pending:
+                for sagan in pending.popleft().get():
+                    yield sagan
+
+        finally:
+            prefetcher.stop()
+            if pool is not None:
+                pool.terminate()
+
+    def _get_pool(self):
+        """
+        Forking a process with threads running can leave the workers stuck
+        on a lock that one of those threads held, and by now there may well
+        be one: decompressing our input, say.  So where we can, the workers
+        are started by a forkserver, which forks them from a clean process
+        of its own.  On Python 2 they're forked from this one, which is
+        why the pool is at least started before the prefetcher.
+        """
+        try:
+            context = multiprocessing.get_context("forkserver")
+        except (AttributeError, ValueError):  # Python 2, or Windows
+            return multiprocessing.Pool(self._jobs)
+        return context.Pool(self._jobs)
+
+    def __next__(self):
+        return iter(self).next()
+
+    def next(self):
+        return self.__next__()
+
+    def _get_sagans(self, pool=None):
+
+        if pool is None:
+            for sagan in self._parse(self._get_lines()):
+                yield sagan
+            return
+
+        pending = collections.deque()
+        for function, args in self._get_tasks():
+            pending.append(pool.apply_async(function, args))
+            if len(pending) >= self._jobs * self.CHUNKS_PER_JOB:
+                for sagan in pending.popleft().get():
+                    yield sagan
+
+        while pending:
+            for sagan in pending.popleft().get():
+                yield sagan
+
+    def _parse(self, lines):
+        for line in lines:
+            for sagan in _parse_results((line,), self._probes):
+                yield sagan
+
+    def _get_lines(self):
 
         for line in self._iterable:
 
@@ -30,64 +311,93 @@ class SaganSet(object):
             if not line:
                 break
 
-            try:
-                sagan = Result.get(
-                    line,
-                    on_error=Result.ACTION_IGNORE,
-                    on_warning=Result.ACTION_IGNORE
-                )
-                if not self._probes or sagan.probe_id in self._probes:
-                    sagans.append(sagan)
-                if len(sagans) > 100:
-                    for sagan in self._attach_probes(sagans):
-                        yield sagan
-                    sagans = []
-            except ResultParseError:
-                pass  # Probably garbage in the file
+            yield line
 
-        for sagan in self._attach_probes(sagans):
-            yield sagan
+    def _get_tasks(self):
+        """
+        Yield `(function, args)` tuples for the worker processes, each of
+        which parses a chunk of the input.
+        """
 
-    def __next__(self):
-        return iter(self).next()
+        if isinstance(self._iterable, MappedFile):
+            for start, stop in self._iterable.get_ranges(self.CHUNK_SIZE):
+                yield _parse_mapped_results, (
+                    self._iterable.path, start, stop, self._probes)
+            return
 
-    def next(self):
-        return self.__next__()
+        chunk = []
+        for line in self._get_lines():
+            chunk.append(line)
+            if len(chunk) >= self.CHUNK_SIZE:
+                yield _parse_results, (chunk, self._probes)
+                chunk = []
+        if chunk:
+            yield _parse_results, (chunk, self._probes)
 
     @staticmethod
     def _attach_probes(sagans):
         probes = dict(
-            [(p.id, p) for p in Probe.get_many(s.probe_id for s in sagans)]
+            [(p.id, p) for p in Probe.get_many(
+                set(s.probe_id for s in sagans))]
         )
         for sagan in sagans:
             sagan.probe = probes[sagan.probe_id]
-            yield sagan
 
 
 class Rendering(object):
+    """
+    Renders a payload of results, or an aggregation of them, to `sink`: an
+    OutputSink over standard out unless you say otherwise.
 
-    def __init__(self, renderer=None, header="", footer="", payload=()):
+    Results are handed to the renderer's prepare() BATCH_SIZE at a time
+    before they're rendered.
+    """
+
+    BATCH_SIZE = 100
+
+    def __init__(self, renderer=None, header="", footer="", payload=(),
+                 sink=None):
 
         self.renderer = renderer
         self.header = header + "\n" if header else ""
         self.footer = footer + "\n" if footer else ""
         self.payload = payload
+        self.sink = sink or OutputSink()
 
     def render(self):
-        print(self.header, end="")
+
+        # The renderer's hooks print for themselves, so we flush before each
+        # of them to keep everything in order.
+        self.sink.write(self.header)
+        self.sink.flush()
         self.renderer.header()
         self._smart_render(self.payload)
+        self.sink.flush()
+        self.renderer.finalise()
         self.renderer.additional(self.payload)
         self.renderer.footer()
-        print(self.footer, end="")
+        self.sink.write(self.footer)
+        self.sink.flush()
 
     def _get_rendered_results(self, data):
+        for batch in self._get_batches(data):
+            self.renderer.prepare(batch)
+            for sagan in batch:
+                yield self.renderer.on_result(sagan)
+
+    def _get_batches(self, data):
+        batch = []
         for sagan in data:
-            yield self.renderer.on_result(sagan)
+            batch.append(sagan)
+            if len(batch) >= self.BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
     def _smart_render(self, data, indent=""):
         """
-        Traverses the aggregation data and prints everything nicely indented.
+        Traverses the aggregation data and writes everything nicely indented.
         """
 
         if not data:
@@ -96,10 +406,21 @@ class Rendering(object):
         if isinstance(data, (list, SaganSet)):
 
             for line in self._get_rendered_results(data):
-                print(indent + line, end="")
+                self.sink.write(indent + line)
+
+        elif hasattr(data, "sample"):  # A BucketSummary
+
+            self.sink.write("{}{}\n".format(indent, data))
+            self._smart_render(data.sample, indent=indent)
+            if data.omitted:
+                self.sink.write("{}... and {} more\n".format(
+                    indent, data.omitted))
 
-        elif isinstance(data, dict):
+        elif hasattr(data, "items"):  # A dict of buckets, or SortedSummary
 
             for k, v in data.items():
-                print("{}{}".format(indent, k))
+                self.sink.write("{}{}\n".format(indent, k))
                 self._smart_render(v, indent=indent + " ")
+                if not isinstance(data, dict):
+                    # A SortedSummary's buckets may be a while apart
+                    self.sink.flush()
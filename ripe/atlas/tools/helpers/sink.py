@@ -0,0 +1,59 @@
+import sys
+
+
+class OutputSink(object):
+    """
+    Somewhere to write rendered output.  Writing to a pipe or a file one line
+    at a time costs a call all the way down to the operating system per
+    line, which soon adds up, so unless there's a person watching (on a
+    terminal), or we've been told to flush every write (while streaming), we
+    collect the output and write it out BUFFER_SIZE characters at a time.
+    """
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, stream=None, immediate=None):
+
+        self.stream = stream or sys.stdout
+
+        self.immediate = immediate
+        if immediate is None:
+            self.immediate = self._is_tty(self.stream)
+
+        self._buffer = []
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def write(self, text):
+
+        if not text:
+            return
+
+        self._buffer.append(text)
+        self._size += len(text)
+
+        if self.immediate or self._size >= self.BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Write out whatever we have.  Do this before anyone else writes to the
+        stream, or the output will be out of order.
+        """
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer = []
+            self._size = 0
+        self.stream.flush()
+
+    @staticmethod
+    def _is_tty(stream):
+        try:
+            return stream.isatty()
+        except (AttributeError, ValueError):  # No isatty(), or closed
+            return False
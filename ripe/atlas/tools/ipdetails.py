@@ -1,5 +1,10 @@
+import sys
+import threading
+
 import requests
 import IPy
+import six
+from six.moves import queue
 
 from .cache import cache
 
@@ -9,8 +14,12 @@ class IP(object):
     RIPESTAT_URL = "https://stat.ripe.net/data/prefix-overview/data.json?resource={ip}"
     CACHE_EXPIRATION_TIME = 60 * 60 * 24 * 7
 
-    def __init__(self, address):
+    PREFIX_KEY = "IPDetailsPrefix:{}"
+    PREFIX_LENGTHS_KEY = "IPDetailsPrefixLengths:{}"
+
+    def __init__(self, address, session=None):
         self.cached_prefix_found = False
+        self.session = session
         self.ip_object = IPy.IP(address)
 
         self.address = self.ip_object.strFullsize()
@@ -54,22 +63,31 @@ class IP(object):
         return (self.ip_object.iptype() not in self.not_querable_types)
 
     def get_from_cached_prefix(self):
-        """Search cache for existing cached Prefix"""
-        details = None
+        """
+        Search cache for the longest cached prefix containing this address.
+        Rather than walking every cached prefix, we keep track of the prefix
+        lengths we've cached for each address family, so we only have to look
+        up this address's network at each of those lengths, all in one go.
+        """
 
-        for cache_entry in cache.keys():
-            if not cache_entry.startswith("IPDetailsPrefix:"):
-                continue
+        lengths = cache.get(
+            self.PREFIX_LENGTHS_KEY.format(self.ip_object.version()), ())
 
-            prefix_details = cache.get(cache_entry)
-            prefix = IPy.IP(prefix_details["Prefix"])
+        candidates = {}
+        for length in lengths:
+            network = self.ip_object.make_net(length)
+            candidates[self._get_prefix_key(network)] = length
 
-            if self.ip_object in prefix:
-                details = prefix_details
-                self.cached_prefix_found = True
-                break
+        if not candidates:
+            return None
 
-        return details
+        found = cache.get_many(list(candidates))
+        if not found:
+            return None
+
+        self.cached_prefix_found = True
+
+        return found[max(found, key=candidates.get)]
 
     def query_stat(self):
         """Query RIPE Stat to get address details."""
@@ -77,7 +95,7 @@ class IP(object):
         details = {}
 
         try:
-            response = requests.get(URL)
+            response = (self.session or requests).get(URL)
             if not response.ok:
                 return details
             res = response.json()
@@ -103,13 +121,133 @@ class IP(object):
     def update_cache(self, details):
         """Update cache for the address and prefix if needed."""
         if not self.cached_prefix_found:
-            key = "IPDetailsPrefix:{}".format(details["Prefix"])
-            cache.set(key, details, self.CACHE_EXPIRATION_TIME)
+            self.update_prefix_cache(details)
 
         key = "IPDetails:{}".format(self.address)
         cache.set(key, details, self.CACHE_EXPIRATION_TIME)
 
+    def update_prefix_cache(self, details):
+        """
+        Cache the details for the whole prefix and make sure its length is one
+        that get_from_cached_prefix() will look for.
+        """
+
+        try:
+            prefix = IPy.IP(details["Prefix"], make_net=True)
+        except ValueError:
+            return
+
+        cache.set(
+            self._get_prefix_key(prefix), details, self.CACHE_EXPIRATION_TIME)
+
+        # Other processes may be adding prefix lengths at the same time
+        cache.update(
+            self.PREFIX_LENGTHS_KEY.format(prefix.version()),
+            lambda lengths: sorted(set(lengths or ()) | {prefix.prefixlen()})
+        )
+
+    @classmethod
+    def _get_prefix_key(cls, prefix):
+        return cls.PREFIX_KEY.format(prefix.strCompressed(1))
+
     def __str__(self):
         return "IP {}, ASN {}, Holder {}".format(
             self.address, self.asn, self.holder
         )
+
+
+class Lookup(object):
+    """
+    An address that a Resolver is looking up, or has looked up.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.ip = None
+        self._done = threading.Event()
+        self._exc_info = None
+
+    def finish(self, ip=None, exc_info=None):
+        self.ip = ip
+        self._exc_info = exc_info
+        self._done.set()
+
+    def get(self):
+        """
+        Wait for the lookup to finish, and return the IP.  Anything that went
+        wrong in the lookup is raised here.
+        """
+        self._done.wait()
+        if self._exc_info is not None:
+            six.reraise(*self._exc_info)
+        return self.ip
+
+
+class Resolver(object):
+    """
+    Looks up the details of lots of addresses at once, on up to `workers`
+    threads sharing a single HTTP session, so that cache misses don't have
+    to wait on RIPEstat one at a time.  Each address is only ever looked up
+    once: asking for one that's already on its way just waits for it.
+
+    submit() every address you're about to need, then get() them one by one
+    as you need them.
+    """
+
+    WORKERS = 8
+
+    def __init__(self, workers=WORKERS):
+        self.session = requests.Session()
+        self._workers = workers
+        self._threads = []
+        self._lookups = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+    def submit(self, addresses):
+        """
+        Start looking up any of `addresses` we haven't already.
+        """
+        with self._lock:
+            for address in addresses:
+                if address in self._lookups:
+                    continue
+                lookup = Lookup(address)
+                self._lookups[address] = lookup
+                self._queue.put(lookup)
+                if len(self._threads) < self._workers:
+                    self._start_worker()
+
+    def get(self, address):
+        """
+        The IP for `address`, waiting for it to be looked up if need be.
+        """
+        self.submit((address,))
+        return self._lookups[address].get()
+
+    def stop(self):
+        """
+        Let the workers go once they've looked up everything submitted so
+        far.
+        """
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            self._threads = []
+        self.session.close()
+
+    def _start_worker(self):
+        thread = threading.Thread(target=self._work)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            lookup = self._queue.get()
+            if lookup is None:
+                return
+            try:
+                lookup.finish(ip=IP(lookup.address, session=self.session))
+            except Exception:
+                lookup.finish(exc_info=sys.exc_info())
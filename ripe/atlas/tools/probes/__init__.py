@@ -1,9 +1,139 @@
+import collections
+import math
+import struct
+
 from ..cache import cache
 
 from ripe.atlas.cousteau import ProbeRequest
 from ripe.atlas.cousteau import Probe as CProbe
 
 
+def _unpack_probe_record(data):
+    return ProbeRecord.unpack(data)
+
+
+class ProbeRecord(object):
+    """
+    A slim stand-in for a Cousteau Probe, holding only the fields the renderers
+    and aggregators actually use.  It pickles down to a few dozen bytes, so
+    it's what we keep in the cache rather than the whole API response.
+
+    Anything else the API says about a probe, like its `description` or its
+    `address_v4`, isn't kept, so it's not there for user renderers either.
+    """
+
+    __slots__ = (
+        "id",
+        "country_code",
+        "asn_v4",
+        "asn_v6",
+        "prefix_v4",
+        "prefix_v6",
+        "status",
+        "geometry",
+        "is_public",
+        "is_anchor",
+    )
+
+    # id, asn_v4, asn_v6, flags, longitude, latitude
+    HEADER = struct.Struct("<IIIBdd")
+
+    STRINGS = ("country_code", "prefix_v4", "prefix_v6", "status")
+    NO_STRING = 0xff
+
+    FLAG_PUBLIC = 1
+    FLAG_ANCHOR = 2
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+    def __eq__(self, other):
+        return isinstance(other, ProbeRecord) and all(
+            getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "ProbeRecord({})".format(self.id)
+
+    def __reduce__(self):
+        return _unpack_probe_record, (self.pack(),)
+
+    @classmethod
+    def from_probe(cls, probe):
+        """
+        Take what we need from a Cousteau Probe.
+        """
+        return cls(**dict(
+            [(f, getattr(probe, f, None)) for f in cls.__slots__]))
+
+    def pack(self):
+
+        longitude = latitude = float("nan")
+        if self.geometry and self.geometry.get("coordinates"):
+            longitude, latitude = self.geometry["coordinates"][:2]
+
+        flags = 0
+        if self.is_public:
+            flags |= self.FLAG_PUBLIC
+        if self.is_anchor:
+            flags |= self.FLAG_ANCHOR
+
+        r = self.HEADER.pack(
+            self.id,
+            self.asn_v4 or 0,
+            self.asn_v6 or 0,
+            flags,
+            longitude,
+            latitude
+        )
+
+        for field in self.STRINGS:
+            value = getattr(self, field)
+            if value is None:
+                r += struct.pack("<B", self.NO_STRING)
+            else:
+                # Cut to fit, without leaving half a character at the end
+                value = value.encode("utf-8")[:self.NO_STRING - 1].decode(
+                    "utf-8", "ignore").encode("utf-8")
+                r += struct.pack("<B", len(value)) + value
+
+        return r
+
+    @classmethod
+    def unpack(cls, data):
+
+        pk, asn_v4, asn_v6, flags, longitude, latitude = \
+            cls.HEADER.unpack_from(data)
+
+        geometry = None
+        if not math.isnan(longitude):
+            geometry = {"type": "Point", "coordinates": [longitude, latitude]}
+
+        kwargs = {
+            "id": pk,
+            "asn_v4": asn_v4 or None,
+            "asn_v6": asn_v6 or None,
+            "is_public": bool(flags & cls.FLAG_PUBLIC),
+            "is_anchor": bool(flags & cls.FLAG_ANCHOR),
+            "geometry": geometry,
+        }
+
+        offset = cls.HEADER.size
+        for field in cls.STRINGS:
+            length = struct.unpack_from("<B", data, offset)[0]
+            offset += 1
+            if length == cls.NO_STRING:
+                kwargs[field] = None
+            else:
+                kwargs[field] = data[offset:offset + length].decode("utf-8")
+                offset += length
+
+        return cls(**kwargs)
+
+
 class Probe(object):
     """
     A crude representation of the data we get from the API via Cousteau
@@ -14,39 +144,59 @@ class Probe(object):
     @classmethod
     def get(cls, pk):
         """
-        Given a single id, attempt to fetch a probe object from the cache.  If
+        Given a single id, attempt to fetch a probe record from the cache.  If
         that fails, do an API call to get it.  Don't use this for multiple
         probes unless you know they're all in the cache, or you'll be in for a
         long wait.
         """
-        r = cache.get("probe:{}".format(pk))
+        key = "probe:{}".format(pk)
+        r = cache.get(key)
         if not r:
-            probe = CProbe(id=pk)
-            cache.set("probe:{}".format(probe.id), probe, cls.EXPIRE_TIME)
-            return probe
+            r = ProbeRecord.from_probe(CProbe(id=pk))
+            cache.set(key, r, cls.EXPIRE_TIME)
+        return r
 
     @classmethod
     def get_many(cls, ids):
         """
-        Given a list of ids, attempt to get probe objects out of the local
-        cache.  Probes that cannot be found will be fetched from the API and
-        cached for future use.
+        Given a list of ids, attempt to get probe records out of the local
+        cache, and failing that, out of the local probe store.  Probes that
+        cannot be found in either will be fetched from the API and cached for
+        future use.
         """
 
+        from .store import store
+
         r = []
 
+        # Each probe only needs to be looked up once, no matter how many
+        # results it's attached to.
+        ids = list(collections.OrderedDict.fromkeys(ids))
+
+        cached = cache.get_many(["probe:{}".format(pk) for pk in ids])
+
         fetch_ids = []
         for pk in ids:
-            probe = cache.get("probe:{}".format(pk))
+            probe = cached.get("probe:{}".format(pk))
             if probe:
                 r.append(probe)
             else:
                 fetch_ids.append(str(pk))
 
         if fetch_ids:
-            kwargs = {"id__in": fetch_ids}
-            for probe in [p for p in ProbeRequest(return_objects=True, **kwargs)]:
-                cache.set("probe:{}".format(probe.id), probe, cls.EXPIRE_TIME)
-                r.append(probe)
+            stored = store.get_many([int(pk) for pk in fetch_ids])
+            fetch_ids = [pk for pk in fetch_ids if int(pk) not in stored]
+            fetched = list(stored.values())
+            if fetch_ids:
+                kwargs = {"id__in": fetch_ids}
+                fetched += [
+                    ProbeRecord.from_probe(p)
+                    for p in ProbeRequest(return_objects=True, **kwargs)
+                ]
+            cache.set_many(
+                dict([("probe:{}".format(p.id), p) for p in fetched]),
+                cls.EXPIRE_TIME
+            )
+            r += fetched
 
         return r
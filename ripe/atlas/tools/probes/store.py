@@ -0,0 +1,411 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+
+from ripe.atlas.cousteau import Probe as CProbe
+
+from ..cache import get_db_path, synchronised
+from ..exceptions import RipeAtlasToolsException
+from ..helpers.compression import Compression
+
+
+class ProbeList(list):
+    """
+    What ProbeStore.filter() returns: a list that quacks enough like a
+    ProbeRequest for the probes command not to care where it came from.
+    """
+
+    @property
+    def total_count(self):
+        return len(self)
+
+
+class ProbeStore(object):
+    """
+    A local, indexed copy of the probe metadata, imported from the probe
+    archive dumps that RIPE publishes daily (or from anything shaped like an
+    API v2 probe listing).  Once it's populated, probe lookups and the usual
+    probe filters can be answered without going anywhere near the network.
+
+    Like the cache, the database is only opened when it's first needed, and
+    it's never created just to find out that it's empty.  It's safe to share
+    between threads.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS probes ("
+        " id INTEGER PRIMARY KEY,"
+        " asn_v4 INTEGER,"
+        " asn_v6 INTEGER,"
+        " country_code TEXT,"
+        " prefix_v4 TEXT,"
+        " prefix_v6 TEXT,"
+        " latitude REAL,"
+        " longitude REAL,"
+        " meta TEXT NOT NULL"
+        ")",
+        "CREATE INDEX IF NOT EXISTS probes_asn_v4 ON probes (asn_v4)",
+        "CREATE INDEX IF NOT EXISTS probes_asn_v6 ON probes (asn_v6)",
+        "CREATE INDEX IF NOT EXISTS probes_country_code "
+        "ON probes (country_code)",
+        "CREATE INDEX IF NOT EXISTS probes_prefix_v4 ON probes (prefix_v4)",
+        "CREATE INDEX IF NOT EXISTS probes_prefix_v6 ON probes (prefix_v6)",
+        "CREATE INDEX IF NOT EXISTS probes_location "
+        "ON probes (latitude, longitude)",
+    )
+
+    # SQLite won't take more than 999 parameters in a single statement
+    CHUNK_SIZE = 500
+
+    # Seconds to wait for another process to release the write lock
+    TIMEOUT = 30
+
+    EARTH_RADIUS = 6371.0  # km
+
+    # The filters of commands/probes.py that we know how to answer
+    FILTERS = (
+        "asn",
+        "asn_v4",
+        "asn_v6",
+        "prefix",
+        "prefix_v4",
+        "prefix_v6",
+        "country_code",
+        "latitude",
+        "longitude",
+        "radius",
+    )
+
+    def __init__(self, path=None):
+        self._path = path
+        self._db = None
+        self._lock = threading.RLock()
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = get_db_path("probes.db")
+        return self._path
+
+    @property
+    def exists(self):
+        return self._db is not None or os.path.exists(self.path)
+
+    @synchronised
+    def _get_db(self, create=False):
+        """
+        Returns a connection to the store, or None if there's no store yet and
+        `create` is False.
+        """
+
+        if self._db is not None:
+            return self._db
+
+        if not create and not os.path.exists(self.path):
+            return None
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._db = sqlite3.connect(
+            self.path,
+            timeout=self.TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._db.execute(statement)
+
+        return self._db
+
+    @synchronised
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @synchronised
+    def __len__(self):
+        db = self._get_db()
+        if db is None:
+            return 0
+        return db.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+
+    def import_file(self, path):
+        """
+        Load a probe archive dump, compressed or not, into the store.  Only
+        probes that are new or have changed are written, so importing
+        yesterday's dump over today's store is cheap.  Returns a tuple of
+        `(added, updated, unchanged)` counts.
+        """
+
+        try:
+            with Compression.open(path) as f:
+                data = json.loads(f.read().decode("utf-8"))
+        except (IOError, OSError, ValueError) as e:
+            raise RipeAtlasToolsException(
+                "Unable to read a probe archive from {}: {}".format(path, e))
+
+        if isinstance(data, dict):
+            data = data.get("objects", data.get("results"))
+        if not isinstance(data, list):
+            raise RipeAtlasToolsException(
+                "{} doesn't look like a probe archive".format(path))
+
+        return self.import_probes(data)
+
+    @synchronised
+    def import_probes(self, probes):
+        """
+        Store an iterable of probe dictionaries, in either the archive or the
+        API format.  See import_file().
+        """
+
+        rows = {}
+        for probe in probes:
+            meta = self._normalise(probe)
+            rows[meta["id"]] = meta
+
+        added = updated = 0
+
+        db = self._get_db(create=True)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+
+            existing = self._get_meta(db, list(rows))
+
+            changes = []
+            for pk, meta in rows.items():
+                serialised = json.dumps(meta, sort_keys=True)
+                if pk not in existing:
+                    added += 1
+                elif existing[pk] != serialised:
+                    updated += 1
+                else:
+                    continue
+                changes.append(self._get_row(meta, serialised))
+
+            db.executemany(
+                "INSERT OR REPLACE INTO probes (id, asn_v4, asn_v6, "
+                "country_code, prefix_v4, prefix_v6, latitude, longitude, "
+                "meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                changes
+            )
+
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+        return added, updated, len(rows) - added - updated
+
+    @synchronised
+    def get_many(self, ids):
+        """
+        Returns a dictionary of `id: ProbeRecord` for those of `ids` that we
+        know about.
+        """
+
+        from . import ProbeRecord
+
+        db = self._get_db()
+        if db is None:
+            return {}
+
+        return dict([
+            (pk, ProbeRecord.from_probe(self._get_probe(meta)))
+            for pk, meta in self._get_meta(db, list(ids)).items()
+        ])
+
+    @synchronised
+    def filter(self, **filters):
+        """
+        Answers the same filters the probes command would send to the API,
+        with Cousteau Probe objects, so the output can't tell the difference.
+        """
+
+        unsupported = set(filters) - set(self.FILTERS)
+        if unsupported:
+            raise RipeAtlasToolsException(
+                "The local probe store can't filter by {}".format(
+                    ", ".join(sorted(unsupported))))
+
+        clauses = []
+        params = []
+
+        if "asn" in filters:
+            clauses.append("(asn_v4 = ? OR asn_v6 = ?)")
+            params += [filters["asn"]] * 2
+        if "prefix" in filters:
+            clauses.append("(prefix_v4 = ? OR prefix_v6 = ?)")
+            params += [filters["prefix"]] * 2
+        for column in ("asn_v4", "asn_v6", "prefix_v4", "prefix_v6"):
+            if column in filters:
+                clauses.append("{} = ?".format(column))
+                params.append(filters[column])
+        if "country_code" in filters:
+            clauses.append("country_code = ?")
+            params.append(filters["country_code"].upper())
+        for column in ("latitude", "longitude"):
+            if column in filters:
+                clauses.append("{} = ?".format(column))
+                params.append(float(filters[column]))
+
+        centre = None
+        if "radius" in filters:
+            centre = self._parse_radius(filters["radius"])
+            clause, box = self._get_bounding_box(*centre)
+            clauses.append(clause)
+            params += box
+
+        r = ProbeList()
+
+        db = self._get_db()
+        if db is None:
+            return r
+
+        query = "SELECT meta FROM probes"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id"
+
+        for row in db.execute(query, params):
+            meta = json.loads(row[0])
+            if centre and not self._is_within(meta, *centre):
+                continue
+            r.append(self._get_probe(meta))
+
+        return r
+
+    def _get_meta(self, db, ids):
+        r = {}
+        for i in range(0, len(ids), self.CHUNK_SIZE):
+            chunk = ids[i:i + self.CHUNK_SIZE]
+            rows = db.execute(
+                "SELECT id, meta FROM probes WHERE id IN ({})".format(
+                    ", ".join("?" * len(chunk))),
+                chunk
+            )
+            for pk, meta in rows:
+                r[pk] = meta
+        return r
+
+    @staticmethod
+    def _get_probe(meta):
+        if not isinstance(meta, dict):
+            meta = json.loads(meta)
+        return CProbe(id=meta["id"], meta_data=meta)
+
+    @staticmethod
+    def _normalise(probe):
+        """
+        The archive dumps flatten a few things the API nests: status is an id
+        alongside a `status_name`, and the coordinates are in `latitude` &
+        `longitude` rather than a GeoJSON point.  We store everything in the
+        API's shape, as that's what Cousteau expects.
+        """
+
+        meta = dict(probe)
+
+        if "id" not in meta:
+            raise RipeAtlasToolsException(
+                "Found a probe without an id in the archive")
+        meta["id"] = int(meta["id"])
+
+        status = meta.get("status")
+        if not isinstance(status, dict):
+            meta["status"] = {
+                "id": status,
+                "name": meta.pop("status_name", None)
+            }
+
+        latitude = meta.pop("latitude", None)
+        longitude = meta.pop("longitude", None)
+        if not meta.get("geometry") and latitude is not None \
+                and longitude is not None:
+            meta["geometry"] = {
+                "type": "Point",
+                "coordinates": [longitude, latitude]
+            }
+
+        return meta
+
+    @staticmethod
+    def _get_row(meta, serialised):
+
+        latitude = longitude = None
+        geometry = meta.get("geometry")
+        if geometry and geometry.get("coordinates"):
+            longitude, latitude = geometry["coordinates"][:2]
+
+        country_code = meta.get("country_code")
+        if country_code:
+            country_code = country_code.upper()
+
+        return (
+            meta["id"],
+            meta.get("asn_v4"),
+            meta.get("asn_v6"),
+            country_code,
+            meta.get("prefix_v4"),
+            meta.get("prefix_v6"),
+            latitude,
+            longitude,
+            serialised
+        )
+
+    @staticmethod
+    def _parse_radius(radius):
+        """
+        The API's radius filter looks like `<lat>,<lng>:<km>`.
+        """
+        try:
+            centre, distance = radius.split(":")
+            latitude, longitude = centre.split(",")
+            return float(latitude), float(longitude), float(distance)
+        except ValueError:
+            raise RipeAtlasToolsException(
+                "Radius should be in <lat>,<lng>:<km> format")
+
+    @classmethod
+    def _get_bounding_box(cls, latitude, longitude, distance):
+        """
+        A cheap, slightly generous box around the circle so that the indexes
+        can do most of the work before we get to the trigonometry.  Returns
+        a WHERE clause and its parameters.
+        """
+
+        delta_latitude = math.degrees(distance / cls.EARTH_RADIUS)
+        clause = "latitude BETWEEN ? AND ?"
+        params = [latitude - delta_latitude, latitude + delta_latitude]
+
+        # Near the poles, or if the box would wrap around the antimeridian,
+        # we don't bother narrowing down the longitude.
+        if abs(latitude) + delta_latitude < 90:
+            delta_longitude = delta_latitude / math.cos(math.radians(latitude))
+            west = longitude - delta_longitude
+            east = longitude + delta_longitude
+            if west >= -180 and east <= 180:
+                clause += " AND longitude BETWEEN ? AND ?"
+                params += [west, east]
+
+        return clause, params
+
+    @classmethod
+    def _is_within(cls, meta, latitude, longitude, distance):
+        longitude_2, latitude_2 = meta["geometry"]["coordinates"][:2]
+        phi_1, phi_2 = math.radians(latitude), math.radians(latitude_2)
+        d_phi = phi_2 - phi_1
+        d_lambda = math.radians(longitude_2 - longitude)
+        a = math.sin(d_phi / 2) ** 2 + \
+            math.cos(phi_1) * math.cos(phi_2) * math.sin(d_lambda / 2) ** 2
+        return 2 * cls.EARTH_RADIUS * math.asin(min(1, math.sqrt(a))) <= \
+            distance
+
+
+store = ProbeStore()
@@ -1,3 +1,7 @@
+import array
+
+from ..helpers.quantiles import P2Quantile, get_percentile
+from ..settings import conf
 from .base import Renderer as BaseRenderer
 
 
@@ -6,18 +10,37 @@ class Renderer(BaseRenderer):
     This is meant to be a stub example for what an aggregate renderer might look
     like. If you have ideas as to how to make this better, feel free to send
     along a pull request.
+
+    RTTs are kept in arrays of doubles rather than lists of floats, which
+    takes about a third of the memory.  If that's still too much, set
+    `estimate-percentiles` in the rendering configuration (or pass
+    `estimate_percentiles`) and they aren't kept at all: the percentiles are
+    estimated as we go instead, in constant memory.
     """
 
     RENDERS = [BaseRenderer.TYPE_PING]
+    REQUIRES_PROBES = False
+
+    PERCENTILES = (50, 90, 95, 99)
 
-    def __init__(self):
+    def __init__(self, estimate_percentiles=None):
         self.target = ""
         self.packet_loss = 0
         self.sent_packets = 0
         self.received_packets = 0
-        self.rtts = []
-        self.rtts_min = []
-        self.rtts_max = []
+        self.rtts = array.array("d")
+        self.rtts_min = array.array("d")
+        self.rtts_max = array.array("d")
+
+        if estimate_percentiles is None:
+            estimate_percentiles = conf["rendering"]["estimate-percentiles"]
+        self.estimators = None
+        self.rtt_count = 0
+        self.rtt_total = 0.0
+        if estimate_percentiles:
+            self.estimators = [
+                P2Quantile(p / 100.0) for p in self.PERCENTILES]
+
         self.rtt_types_map = {
             "min": self.rtts_min,
             "max": self.rtts_max
@@ -26,9 +49,23 @@ class Renderer(BaseRenderer):
     def header(self):
         print("Collecting results...\n")
 
-    def additional(self, results):
-        self.collect_stats(results)
+    def accumulate(self, result):
+        """
+        Calculates, stores and collects all stats we want from the given
+        result.
+        """
+        self.set_target(result)
+
+        self.sent_packets += result.packets_sent
+        self.received_packets += result.packets_received
+        self.collect_min_max_rtts("min", result.rtt_min)
+        self.collect_min_max_rtts("max", result.rtt_max)
+
+        self.collect_packets_rtt(result.packets)
+
+    def finalise(self):
         self.packet_loss = self.calculate_loss()
+        percentiles = self.percentiles()
         print(self.render(
             "reports/aggregate_ping.txt",
             target=self.target,
@@ -36,25 +73,20 @@ class Renderer(BaseRenderer):
             received=self.received_packets,
             packet_loss=self.packet_loss,
             min=min(self.rtts_min),
-            median=self.median(),
+            median=round(percentiles[0], 3),
             mean=self.mean(),
-            max=max(self.rtts_max)
+            max=max(self.rtts_max),
+            percentiles="/".join(
+                str(round(percentile, 3)) for percentile in percentiles),
+            estimated=" (estimated)" if self.estimators else ""
         ))
 
     def collect_stats(self, results):
         """
-        Calculates, stores and collects all stats we want from the given
-        results.
+        Accumulates the stats of all the given results.
         """
         for result in results:
-            self.set_target(result)
-
-            self.sent_packets += result.packets_sent
-            self.received_packets += result.packets_received
-            self.collect_min_max_rtts("min", result.rtt_min)
-            self.collect_min_max_rtts("max", result.rtt_max)
-
-            self.collect_packets_rtt(result.packets)
+            self.accumulate(result)
 
     def set_target(self, result):
         """Sets the target of the measurement if not set."""
@@ -69,7 +101,18 @@ class Renderer(BaseRenderer):
         if not rtt:
             rtt = 0
 
-        self.rtt_types_map[rtt_type].append(rtt)
+        rtts = self.rtt_types_map[rtt_type]
+
+        # Only the extreme is ever reported, so when we're saving memory
+        # that's all we keep.
+        if self.estimators is not None and rtts:
+            if rtt_type == "min":
+                rtts[0] = min(rtts[0], rtt)
+            else:
+                rtts[0] = max(rtts[0], rtt)
+            return
+
+        rtts.append(rtt)
 
     def collect_packets_rtt(self, packets):
         """
@@ -80,7 +123,13 @@ class Renderer(BaseRenderer):
             rtt = packet.rtt
             if not packet.rtt:
                 rtt = 0
-            self.rtts.append(rtt)
+            if self.estimators is None:
+                self.rtts.append(rtt)
+                continue
+            self.rtt_count += 1
+            self.rtt_total += rtt
+            for estimator in self.estimators:
+                estimator.add(rtt)
 
     def calculate_loss(self):
         """Calculates the total loss between received and sent packets."""
@@ -91,12 +140,27 @@ class Renderer(BaseRenderer):
 
     def mean(self):
         """Calculates the mean of the collected rtts"""
+        if self.estimators is not None:
+            return round(self.rtt_total / max(self.rtt_count, 1), 3)
         return round(
             float(sum(self.rtts)) / max(len(self.rtts), 1), 3
         )
 
+    def percentiles(self):
+        """
+        Calculates (or estimates) the PERCENTILES of the collected rtts, the
+        first of which is the median.
+        """
+        if self.estimators is not None:
+            return [estimator.value for estimator in self.estimators]
+        sorted_rtts = sorted(self.rtts)
+        return [get_percentile(sorted_rtts, p / 100.0)
+                for p in self.PERCENTILES]
+
     def median(self):
         """Calculates the median of the collected rtts"""
+        if self.estimators is not None:
+            return self.estimators[0].value
         sorted_rtts = sorted(self.rtts)
         index = (len(self.rtts) - 1) // 2
         if len(self.rtts) % 2:
@@ -1,11 +1,101 @@
 import importlib
 import os
 import pkgutil
+import string
 import sys
 
 from ..exceptions import RipeAtlasToolsException
 
 
+class Template(object):
+    """
+    A template, parsed once so that we know up front which fields it wants.
+    """
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.fields = frozenset(
+            field.split(".")[0].split("[")[0]
+            for _, field, _, _ in string.Formatter().parse(text)
+            if field
+        )
+
+    def render(self, **kwargs):
+        try:
+            return self.text.format(**kwargs)
+        except KeyError:
+            missing = self.fields.difference(kwargs)
+            if not missing:
+                raise
+            raise RipeAtlasToolsException(
+                'The template "{}" needs values for: {}'.format(
+                    self.name, ", ".join(sorted(missing))))
+
+
+class TemplateRegistry(object):
+    """
+    Every template a renderer has asked for, each read from disk and parsed
+    only the first time it's asked for, rather than on every render.
+
+    Templates are looked for among those registered with register(), then in
+    the templates directory that ships with the renderers, and then in
+    ~/.config/ripe-atlas-tools/renderers/templates, which is where templates
+    for user-supplied renderers go.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._registered = {}
+
+    def register(self, name, path=None, text=None):
+        """
+        Make the template at `path`, or the `text` itself, available as
+        `name`, replacing any template of that name.
+        """
+        if (path is None) == (text is None):
+            raise RipeAtlasToolsException(
+                'The template "{}" needs either a path or some text, but '
+                'not both'.format(name))
+        self._registered[name] = (path, text)
+        self._templates.pop(name, None)
+
+    def get(self, name):
+        if name not in self._templates:
+            self._templates[name] = Template(name, self._get_text(name))
+        return self._templates[name]
+
+    def _get_text(self, name):
+
+        path, text = self._registered.get(name, (None, None))
+        if text is not None:
+            return text
+
+        with open(path or self._get_path(name)) as f:
+            return f.read()
+
+    @staticmethod
+    def _get_path(name):
+
+        directories = [os.path.join(os.path.dirname(__file__), "templates")]
+        if "HOME" in os.environ:
+            directories.append(os.path.join(
+                os.environ["HOME"], ".config", "ripe-atlas-tools",
+                "renderers", "templates"
+            ))
+
+        for directory in directories:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                return path
+
+        raise RipeAtlasToolsException(
+            'The template "{}" could not be found'.format(name))
+
+
+templates = TemplateRegistry()
+
+
 class Renderer(object):
 
     TYPE_PING = "ping"
@@ -17,6 +107,10 @@ class Renderer(object):
 
     RENDERS = ()
 
+    # Looking up the probe behind every result is expensive, so renderers that
+    # never look at `result.probe` should set this to False.
+    REQUIRES_PROBES = True
+
     @staticmethod
     def get_available():
         """
@@ -38,14 +132,11 @@ class Renderer(object):
     @staticmethod
     def render(template, **kwargs):
         """
-        A crude templating engine.
+        A crude templating engine.  `template` is the name of one in the
+        template registry: a path under one of the templates directories, or
+        a name you've registered yourself.
         """
-
-        template = os.path.join(
-            os.path.dirname(__file__), "templates", template)
-
-        with open(template) as f:
-            return f.read().format(**kwargs)
+        return templates.get(template).render(**kwargs)
 
     @classmethod
     def get_renderer(cls, name=None, kind=None):
@@ -111,10 +202,36 @@ class Renderer(object):
         """
         pass
 
+    def accumulate(self, result):
+        """
+        Override this to collect whatever your summary needs.  It's called
+        with every result as it's read, whether or not it's rendered or
+        aggregated, and before on_result() is.
+        """
+        pass
+
+    def prepare(self, results):
+        """
+        Override this to get ready for a batch of results before on_result()
+        is called with any of them, say by starting to look up whatever
+        they'll need all in one go.
+        """
+        pass
+
+    def finalise(self):
+        """
+        Override this for summary logic, working from whatever accumulate()
+        collected.
+        """
+        pass
+
     @staticmethod
     def additional(*args, **kwargs):
         """
-        Override this for summary logic.
+        The old way of writing a summary: this is handed the results to go
+        through all over again, which for a large file means parsing it
+        twice, and for standard in doesn't work at all.  Use accumulate() and
+        finalise() instead.
         """
         pass
 
@@ -6,6 +6,7 @@ from .base import Renderer as BaseRenderer
 class Renderer(BaseRenderer):
 
     RENDERS = [BaseRenderer.TYPE_DNS]
+    REQUIRES_PROBES = False
     TIME_FORMAT = "%a %b %d %H:%M:%S %Z %Y"
 
     def on_result(self, result):
@@ -25,26 +26,29 @@ class Renderer(BaseRenderer):
     @classmethod
     def get_formatted_response(cls, probe_id, created, response):
 
-        if not response.abuf:
+        # Sagan works this out afresh every time we ask for it
+        abuf = response.abuf
+
+        if not abuf:
             return "\n- {0} -\n\n  No abuf found.\n".format(
                 response.response_id)
 
         header_flags = []
         for flag in ("aa", "ad", "cd", "qr", "ra", "rd",):
-            if getattr(response.abuf.header, flag):
+            if getattr(abuf.header, flag):
                 header_flags.append(flag)
 
         edns = ""
-        if response.abuf.edns0:
+        if abuf.edns0:
             edns = "\n  ;; OPT PSEUDOSECTION:\n  ; EDNS: version: {0}, " \
                    "flags:; udp: {1}\n".format(
-                       response.abuf.edns0.version,
-                       response.abuf.edns0.udp_size
+                       abuf.edns0.version,
+                       abuf.edns0.udp_size
                    )
 
         question = ""
-        if response.abuf.questions:
-            question = response.abuf.questions[0].name
+        if abuf.questions:
+            question = abuf.questions[0].name
 
         return cls._colourise_by_response(response, cls.render(
 
@@ -56,25 +60,25 @@ class Renderer(BaseRenderer):
             probe=probe_id,
 
             question_name=question,
-            header_opcode=response.abuf.header.opcode,
-            header_return_code=response.abuf.header.return_code,
-            header_id=response.abuf.header.id,
+            header_opcode=abuf.header.opcode,
+            header_return_code=abuf.header.return_code,
+            header_id=abuf.header.id,
             header_flags=" ".join(header_flags),
             edns=edns,
 
-            question_count=len(response.abuf.questions),
-            answer_count=len(response.abuf.answers),
-            authority_count=len(response.abuf.authorities),
-            additional_count=len(response.abuf.additionals),
+            question_count=len(abuf.questions),
+            answer_count=len(abuf.answers),
+            authority_count=len(abuf.authorities),
+            additional_count=len(abuf.additionals),
 
             question=cls.get_section(
-                "question", response.abuf.questions),
+                "question", abuf.questions),
             answers=cls.get_section(
-                "answer", response.abuf.answers),
+                "answer", abuf.answers),
             authorities=cls.get_section(
-                "authority", response.abuf.authorities),
+                "authority", abuf.authorities),
             additionals=cls.get_section(
-                "additional", response.abuf.additionals),
+                "additional", abuf.additionals),
 
             response_time=response.response_time,
             response_size=response.response_size,
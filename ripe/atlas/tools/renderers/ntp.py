@@ -4,6 +4,7 @@ from .base import Renderer as BaseRenderer
 class Renderer(BaseRenderer):
 
     RENDERS = [BaseRenderer.TYPE_NTP]
+    REQUIRES_PROBES = False
 
     def on_result(self, result, probes=None):
         print("Not ready yet\n")
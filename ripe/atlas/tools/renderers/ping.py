@@ -5,6 +5,7 @@ from .base import Result
 class Renderer(BaseRenderer):
 
     RENDERS = [BaseRenderer.TYPE_PING]
+    REQUIRES_PROBES = False
 
     def on_result(self, result):
 
@@ -15,6 +15,7 @@ class Renderer(BaseRenderer):
         BaseRenderer.TYPE_HTTP,
         BaseRenderer.TYPE_NTP
     ]
+    REQUIRES_PROBES = False
 
     def on_result(self, result, probes=None):
         return json.dumps(result.raw_data, separators=(",", ":")) + "\n"
@@ -1,17 +1,29 @@
+import array
+
+from ..probes import Probe
 from .base import Renderer as BaseRenderer
 
 THRESHOLD = 80  # %
 
 
 class Renderer(BaseRenderer):
+    """
+    Each certificate is kept once, by its SHA-256 fingerprint, along with an
+    array of the ids of the probes that saw it.  Only the probes that saw
+    the certificates we end up listing them for are ever looked up.
+    """
+
     RENDERS = [BaseRenderer.TYPE_TLS]
+    REQUIRES_PROBES = False
 
     def __init__(self):
         self.uniqcerts = {}
         self.blob_list = []
 
-    def additional(self, results):
-        self.gather_unique_certs(results)
+    def accumulate(self, result):
+        self.bucketize_result_cert(result)
+
+    def finalise(self):
         most_seen_cert = self.get_nprobes_ofpopular_cert()
         for cert_id in sorted(
             self.uniqcerts,
@@ -33,13 +45,12 @@ class Renderer(BaseRenderer):
             cert_id = certificate.checksum_sha256
             if cert_id not in self.uniqcerts:
                 self.uniqcerts[cert_id] = {
-                    "cert": None,
+                    "cert": certificate,
                     "cnt": 0,
-                    "probes": []
+                    "probes": array.array("l")
                 }
-            self.uniqcerts[cert_id]["cert"] = certificate
             self.uniqcerts[cert_id]["cnt"] += 1
-            self.uniqcerts[cert_id]["probes"].append(result.probe)
+            self.uniqcerts[cert_id]["probes"].append(result.probe_id)
 
     def get_nprobes_ofpopular_cert(self):
         """
@@ -77,7 +88,7 @@ class Renderer(BaseRenderer):
         blob_list.append("  Below the threshold ({0}%)".format(THRESHOLD))
         blob_list.append("  Probes that saw it: ")
 
-        for probe in self.uniqcerts[cert_id]["probes"]:
+        for probe in self.get_probes(cert_id):
             log = (
                 "    ID: {id}, country code: {cc}, ASN (v4/v6): {asn4}/{asn6}"
             ).format(
@@ -88,5 +99,14 @@ class Renderer(BaseRenderer):
 
         return blob_list
 
+    def get_probes(self, cert_id):
+        """
+        Looks up the probes that saw the given cert, in the order they saw
+        it.
+        """
+        ids = self.uniqcerts[cert_id]["probes"]
+        probes = dict([(p.id, p) for p in Probe.get_many(set(ids))])
+        return [probes[pk] for pk in ids if pk in probes]
+
     def on_result(self, result):
         return ""
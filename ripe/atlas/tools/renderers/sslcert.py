@@ -9,6 +9,7 @@ class Renderer(BaseRenderer):
     """
 
     RENDERS = [BaseRenderer.TYPE_TLS]
+    REQUIRES_PROBES = False
 
     def on_result(self, result):
         r = ""
@@ -1,4 +1,4 @@
-from ..ipdetails import IP
+from ..ipdetails import Resolver
 from .base import Renderer as BaseRenderer
 from .base import Result
 
@@ -6,9 +6,11 @@ from .base import Result
 class Renderer(BaseRenderer):
 
     RENDERS = [BaseRenderer.TYPE_TRACEROUTE]
+    REQUIRES_PROBES = False
 
     def __init__(self):
         self.paths = {}
+        self.resolver = Resolver()
 
         # Number of different ASs starting from the end of the traceroute path.
         #
@@ -28,8 +30,8 @@ class Renderer(BaseRenderer):
         return "For each traceroute path toward the target, the " \
                "last {} ASNs will be shown\n\n".format(self.RADIUS)
 
-    def on_result(self, result):
-
+    @staticmethod
+    def _get_ip_hops(result):
         ip_hops = []
 
         for hop in result.hops:
@@ -38,11 +40,26 @@ class Renderer(BaseRenderer):
                     ip_hops.append(packet.origin)
                     break
 
+        return ip_hops
+
+    def prepare(self, results):
+        # Start looking up every hop of the batch, rather than one hop at a
+        # time as on_result() gets to them
+        self.resolver.submit(set(
+            address
+            for result in results
+            for address in self._get_ip_hops(result)
+        ))
+
+    def on_result(self, result):
+
+        ip_hops = self._get_ip_hops(result)
+
         asns = []
 
         # starting from the last hop's IP, get up to <RADIUS> ASNs
         for address in reversed(ip_hops):
-            ip = IP(address)
+            ip = self.resolver.get(address)
             if ip.asn and ip.asn not in asns:
                 asns.append(ip.asn)
             if len(asns) == self.RADIUS:
@@ -65,6 +82,9 @@ class Renderer(BaseRenderer):
             ), result.probe_id
         )
 
+    def finalise(self):
+        self.resolver.stop()
+
     def on_finish(self):
         s = "\nNumber of probes for each AS path:\n\n"
 
@@ -19,6 +19,14 @@ class Configuration(object):
             "fetch": "",
             "create": "",
         },
+        "cache": {
+            "engine": "sqlite",
+            "memory-size": 10000,
+        },
+        "rendering": {
+            "prefetch-depth": 2,
+            "estimate-percentiles": False,
+        },
         "specification": {
             "af": 4,
             "description": "",
@@ -177,6 +185,8 @@ class Configuration(object):
             os.path.dirname(__file__), "templates", "base.yaml")
 
         authorisation = re.compile("^authorisation:$", re.MULTILINE)
+        cache = re.compile("^cache:$", re.MULTILINE)
+        rendering = re.compile("^rendering:$", re.MULTILINE)
         tags = re.compile("^  tags:$", re.MULTILINE)
         specification = re.compile("^specification:$", re.MULTILINE)
         ripe = re.compile("^ripe-ncc:$", re.MULTILINE)
@@ -198,6 +208,21 @@ class Configuration(object):
                 "authorisation:",
                 payload
             )
+            payload = cache.sub(
+                "\n# Local cache.  The engine may be one of: sqlite, dbm, and\n"
+                "# memory-size is the number of entries also kept in memory\n"
+                "cache:",
+                payload
+            )
+            payload = rendering.sub(
+                "\n# Result rendering.  prefetch-depth is how many batches of\n"
+                "# results have their probes looked up ahead of time, and\n"
+                "# estimate-percentiles has summaries like aggregate_ping's\n"
+                "# estimate their percentiles in constant memory, rather than\n"
+                "# keeping every RTT to work them out exactly\n"
+                "rendering:",
+                payload
+            )
             payload = specification.sub(
                 "\n# Measurement Creation\n"
                 "specification:",
@@ -1,10 +1,10 @@
 from __future__ import absolute_import
 
-import sys
-
 from ripe.atlas.cousteau import AtlasStream
 from ripe.atlas.sagan import Result
 
+from .helpers.formats import Format
+from .helpers.sink import OutputSink
 from .renderers import Renderer
 
 
@@ -21,16 +21,29 @@ class Stream(object):
 
         self.timeout = timeout
 
-    def stream(self, renderer_name, kind, pk):
+    def stream(self, renderer_name, kind, pk, format_name=None):
+
+        # Results trickle in, so each one is written out as soon as it arrives
+        if format_name:
+            format_ = Format.get(format_name)(kind)
+
+            def write(result):
+                format_.write(result)
+                format_.flush()
+        else:
+            format_ = None
+            renderer = Renderer.get_renderer(name=renderer_name, kind=kind)()
+            sink = OutputSink(immediate=True)
 
-        renderer = Renderer.get_renderer(name=renderer_name, kind=kind)()
+            def write(result):
+                sink.write(renderer.on_result(result))
 
         def on_result_response(result, *args):
-            sys.stdout.write(renderer.on_result(Result.get(
+            write(Result.get(
                 result,
                 on_error=Result.ACTION_IGNORE,
                 on_malformation=Result.ACTION_IGNORE
-            )))
+            ))
             self.captured += 1
             if self.capture_limit and self.captured >= self.capture_limit:
                 raise CaptureLimitExceeded()
@@ -45,3 +58,6 @@ class Stream(object):
         except (KeyboardInterrupt, CaptureLimitExceeded) as e:
             stream.disconnect()
             raise e
+        finally:
+            if format_:
+                format_.close()
@@ -41,6 +41,8 @@ with open(os.path.join(os.path.dirname(__file__), "README.rst")) as description:
         extras_require={
             "doc": ["sphinx", "sphinx_rtd_theme"],
             "fast": ["ujson"],
+            "zstd": ["zstandard"],
+            "arrow": ["pyarrow"],
         },
         test_suite="nose.collector",
         scripts=[
@@ -1,26 +1,50 @@
 from .aggregators import TestAggregators
 from .commands import (
+    TestCacheCommand,
     TestProbesCommand,
     TestMeasureCommand,
     TestMeasurementsCommand,
+    TestRenderCommand,
     TestReportCommand
 )
-from .helpers import TestArgumentTypeHelper
+from .helpers import (
+    TestArgumentTypeHelper,
+    TestCompression,
+    TestFormats,
+    TestJSONArrayDecoder,
+    TestMappedFile,
+    TestOutputSink,
+    TestQuantiles,
+    TestSaganSet,
+    TestThreadedReader
+)
 from .renderers import (
     TestPingRenderer,
     TestSSLConsistency,
-    TestAggregatePing
+    TestAggregatePing,
+    TestTemplateRegistry
 )
 
 
 __all__ = [
     TestAggregators,
+    TestCacheCommand,
     TestProbesCommand,
     TestMeasureCommand,
     TestMeasurementsCommand,
+    TestRenderCommand,
     TestReportCommand,
     TestArgumentTypeHelper,
+    TestCompression,
+    TestFormats,
+    TestJSONArrayDecoder,
+    TestMappedFile,
+    TestOutputSink,
+    TestQuantiles,
+    TestSaganSet,
+    TestThreadedReader,
     TestPingRenderer,
     TestSSLConsistency,
     TestAggregatePing,
+    TestTemplateRegistry,
 ]
@@ -2,7 +2,8 @@ import unittest
 from collections import namedtuple
 
 from ripe.atlas.tools.aggregators.base import (
-    aggregate, ValueKeyAggregator, RangeKeyAggregator
+    aggregate, summarise, BucketSummary, SortedSummary, ValueKeyAggregator,
+    RangeKeyAggregator
 )
 
 
@@ -285,3 +286,79 @@ class TestAggregators(unittest.TestCase):
             }
         }
         self.assertEquals(buckets, expected_output)
+
+    def test_requires_probes(self):
+        """Only aggregators keyed on the probe need probes attached"""
+        self.assertTrue(
+            ValueKeyAggregator(key="probe.country_code").requires_probes)
+        self.assertFalse(ValueKeyAggregator(key="rtt_median").requires_probes)
+        self.assertFalse(
+            RangeKeyAggregator(key="rtt_median", ranges=[10]).requires_probes)
+
+    def test_summarise(self):
+        """Summaries keep counts, RTT statistics, and a bounded sample"""
+        Timed = namedtuple("Timed", "probe rtt_median")
+        results = [Timed(r.probe, r.rtt) for r in self.results]
+        keys = [
+            ValueKeyAggregator(key="probe.country"),
+            ValueKeyAggregator(key="probe.status")
+        ]
+        buckets = summarise(results, keys, size=1)
+        self.assertEqual(
+            sorted(buckets["COUNTRY: SE"]),
+            ["STATUS: Connected", "STATUS: DisConnected"]
+        )
+        summary = buckets["COUNTRY: SE"]["STATUS: DisConnected"]
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(summary.sample, [results[3]])
+        self.assertEqual(summary.omitted, 2)
+        self.assertEqual((summary.rtt_min, summary.rtt_max), (6, 17))
+        self.assertEqual(
+            str(summary),
+            "3 results, median RTT min/avg/max: 6/12.667/17 ms"
+        )
+
+    def test_summarise_rounding(self):
+        """All three RTTs are rounded alike"""
+        Timed = namedtuple("Timed", "rtt_median")
+        summary = BucketSummary(size=1)
+        for rtt in (10.001999999999999, 10.002, 10.002000000000001):
+            summary.add(Timed(rtt))
+        self.assertEqual(
+            str(summary),
+            "3 results, median RTT min/avg/max: 10.002/10.002/10.002 ms"
+        )
+
+    def test_summarise_without_rtts(self):
+        summary = BucketSummary(size=5)
+        for result in self.results:
+            summary.add(result)
+        self.assertEqual(len(summary), 11)
+        self.assertEqual(summary.rtt_average, None)
+        self.assertEqual(str(summary), "11 results")
+
+    def test_sorted_summary(self):
+        """Each top level bucket is yielded as soon as the next one starts"""
+        consumed = []
+
+        def results():
+            for result in sorted(self.results, key=lambda r: r.probe.country):
+                consumed.append(result)
+                yield result
+
+        keys = [
+            ValueKeyAggregator(key="probe.country"),
+            ValueKeyAggregator(key="probe.status")
+        ]
+        items = SortedSummary(results(), keys).items()
+
+        key, buckets = next(items)
+        self.assertEqual(key, "COUNTRY: DE")
+        self.assertEqual(len(consumed), 4)  # The 3 DEs, and the DK after them
+        self.assertEqual(buckets["STATUS: Connected"].count, 1)
+
+        expected = summarise(self.results, keys)
+        remaining = dict(items)
+        self.assertEqual(sorted(remaining), sorted(expected)[1:])
+        self.assertEqual(
+            remaining["COUNTRY: SE"]["STATUS: DisConnected"].count, 3)
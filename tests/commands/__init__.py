@@ -1,11 +1,15 @@
+from .cache import TestCacheCommand
 from .measure import TestMeasureCommand
 from .measurements import TestMeasurementsCommand
 from .probes import TestProbesCommand
+from .render import TestRenderCommand
 from .report import TestReportCommand
 
 __all__ = [
+    TestCacheCommand,
     TestMeasureCommand,
     TestMeasurementsCommand,
     TestProbesCommand,
+    TestRenderCommand,
     TestReportCommand
 ]
@@ -0,0 +1,85 @@
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from ripe.atlas.tools.cache import LocalCache
+from ripe.atlas.tools.commands.cache import Command
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ..base import capture_sys_output
+
+
+class TestCacheCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = LocalCache(
+            engine="sqlite", path=os.path.join(self.directory, "cache.db"))
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.cache.set("probe:3", 3, -1)
+        self.cache.set("IPDetails:193.0.6.1", {"ASN": "3333"}, 60)
+        mock.patch(
+            "ripe.atlas.tools.commands.cache.cache", self.cache).start()
+        self.cmd = Command()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_with_empty_args(self):
+        """User passes no args, should fail with SystemExit"""
+        with capture_sys_output():
+            with self.assertRaises(SystemExit):
+                self.cmd.init_args([])
+
+    def test_with_wrong_action(self):
+        """User passes an action we don't know, should fail with SystemExit"""
+        with capture_sys_output():
+            with self.assertRaises(SystemExit):
+                self.cmd.init_args(["blaaaaaaa"])
+
+    def test_stats(self):
+        with capture_sys_output() as (stdout, stderr):
+            self.cmd.init_args(["stats"])
+            self.cmd.run()
+        lines = stdout.getvalue().split("\n")
+        self.assertTrue(lines[2].startswith("IPDetails"))
+        self.assertEqual(lines[2].split()[1:3], ["1", "0"])
+        self.assertTrue(lines[3].startswith("probe"))
+        self.assertEqual(lines[3].split()[1:3], ["3", "1"])
+        self.assertEqual(lines[5].split()[1:3], ["4", "1"])
+        self.assertTrue(self.cache.path in stdout.getvalue())
+
+    def test_expire(self):
+        with capture_sys_output() as (stdout, stderr):
+            self.cmd.init_args(["expire"])
+            self.cmd.run()
+        self.assertTrue("Removed 1 expired entries" in stdout.getvalue())
+        self.assertEqual(len(self.cache.keys()), 3)
+
+    def test_vacuum(self):
+        with capture_sys_output() as (stdout, stderr):
+            self.cmd.init_args(["vacuum"])
+            self.cmd.run()
+        self.assertTrue("Cache compacted" in stdout.getvalue())
+        self.assertEqual(self.cache.get("probe:1"), 1)
+
+    def test_drop(self):
+        with capture_sys_output() as (stdout, stderr):
+            self.cmd.init_args(["drop", "probe"])
+            self.cmd.run()
+        self.assertTrue('Removed 3 entries from "probe"' in stdout.getvalue())
+        self.assertEqual(self.cache.keys(), ["IPDetails:193.0.6.1"])
+        self.assertEqual(self.cache.get("probe:1"), None)
+
+    def test_drop_without_namespace(self):
+        self.cmd.init_args(["drop"])
+        with self.assertRaises(RipeAtlasToolsException):
+            self.cmd.run()
+
+    def test_get_human_size(self):
+        self.assertEqual(Command._get_human_size(10), "10 B")
+        self.assertEqual(Command._get_human_size(1536), "1.5 KiB")
+        self.assertEqual(Command._get_human_size(3 * 1024 ** 2), "3.0 MiB")
@@ -528,3 +528,49 @@ class TestProbesCommand(unittest.TestCase):
                 expected_set = set(expected_output.split("\n"))
                 returned_set = set(stdout.getvalue().split("\n"))
                 self.assertEquals(returned_set, expected_set)
+
+    def test_import_archive(self):
+        """User imports an archive, nothing is fetched from the API"""
+        cmd = Command()
+        cmd.init_args(["--import-archive", "probes.json.bz2"])
+
+        with capture_sys_output() as (stdout, stderr):
+            path = 'ripe.atlas.tools.commands.probes.store'
+            with mock.patch(path) as mock_store:
+                mock_store.import_file.return_value = (2, 1, 3)
+                mock_store.path = "probes.db"
+                cmd.run()
+                mock_store.import_file.assert_called_once_with(
+                    "probes.json.bz2")
+                self.assertIn(
+                    "Imported 2 new and 1 updated probes (3 unchanged)",
+                    stdout.getvalue()
+                )
+
+    def test_offline(self):
+        """User asks for offline results, which come from the probe store"""
+        cmd = Command()
+        cmd.init_args(["--ids-only", "--offline", "--asn", "3333"])
+
+        with capture_sys_output() as (stdout, stderr):
+            path = 'ripe.atlas.tools.commands.probes'
+            with mock.patch(path + '.store') as mock_store:
+                with mock.patch(path + '.ProbeRequest') as mock_request:
+                    mock_store.exists = True
+                    mock_store.filter.return_value = FakeGen()
+                    cmd.run()
+                    mock_store.filter.assert_called_once_with(asn=3333)
+                    self.assertEqual(mock_request.call_count, 0)
+                    self.assertEquals(
+                        stdout.getvalue(), "1\n2\n3\n4\n5\n")
+
+    def test_offline_without_store(self):
+        """User asks for offline results without importing anything first"""
+        cmd = Command()
+        cmd.init_args(["--offline", "--asn", "3333"])
+
+        path = 'ripe.atlas.tools.commands.probes.store'
+        with mock.patch(path) as mock_store:
+            mock_store.exists = False
+            with self.assertRaises(RipeAtlasToolsException):
+                cmd.run()
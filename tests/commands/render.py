@@ -0,0 +1,154 @@
+import gzip
+import json
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from ripe.atlas.tools.commands.render import Command
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ..base import capture_sys_output
+
+
+class FakeProbe(object):
+    def __init__(self, pk):
+        self.id = pk
+        self.country_code = "NL"
+
+
+class TestRenderCommand(unittest.TestCase):
+
+    RESULT = {"af": 4, "prb_id": 1, "result": [{"rtt": 10.001}], "ttl": 20, "avg": 10.001, "size": 20, "from": "1.2.3.4", "proto": "ICMP", "timestamp": 1440000000, "dup": 0, "type": "ping", "sent": 1, "msm_id": 1000001, "fw": 4700, "max": 10.001, "step": 360, "src_addr": "2.3.4.5", "rcvd": 1, "msm_name": "Ping", "lts": 40, "dst_name": "my.name.ca", "min": 10.001, "dst_addr": "3.4.5.6"}  # noqa
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.results = [dict(self.RESULT, prb_id=i) for i in range(1, 301)]
+        self.get_many = mock.patch(
+            "ripe.atlas.tools.helpers.rendering.Probe.get_many",
+            side_effect=lambda ids: [FakeProbe(pk) for pk in ids]
+        ).start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        shutil.rmtree(self.directory)
+
+    def _write(self, content):
+        path = os.path.join(self.directory, "results")
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def _render(self, path, *args):
+        cmd = Command()
+        cmd.init_args(["--from-file", path] + list(args))
+        with capture_sys_output() as (stdout, stderr):
+            cmd.run()
+        return stdout.getvalue()
+
+    def test_ndjson(self):
+        output = self._render(
+            self._write("\n".join(json.dumps(r) for r in self.results)))
+        self.assertEqual(len(output.splitlines()), 300)
+        self.assertTrue(output.startswith("20 bytes from probe #1 "))
+
+    def test_probes_only_when_needed(self):
+        """Probes are only looked up if the renderer or aggregation uses them"""
+        path = self._write("\n".join(json.dumps(r) for r in self.results))
+        self._render(path)
+        self._render(path, "--renderer", "raw")
+        self.assertEqual(self.get_many.call_count, 0)
+        output = self._render(path, "--aggregate-by", "country")
+        self.assertIn("COUNTRY_CODE: NL\n", output)
+        self.assertTrue(self.get_many.call_count > 0)
+
+    def test_ndjson_indexed(self):
+        """Regular files are indexed once, and rendered the same every time"""
+        path = self._write("\n".join(json.dumps(r) for r in self.results))
+        output = self._render(path)
+        self.assertTrue(os.path.exists(path + ".idx"))
+        self.assertEqual(self._render(path), output)
+        self.assertEqual(self._render(path, "--jobs", "2"), output)
+
+    def test_compressed(self):
+        """Compressed files render just like uncompressed ones"""
+        lines = "\n".join(json.dumps(r) for r in self.results)
+        expected = self._render(self._write(lines))
+        for content in (lines, json.dumps(self.results)):
+            path = os.path.join(self.directory, "results.gz")
+            with gzip.open(path, "wb") as f:
+                f.write(content.encode("utf-8"))
+            self.assertEqual(self._render(path), expected)
+            self.assertFalse(os.path.exists(path + ".idx"))
+
+    def test_json_array(self):
+        """Arrays, on one line or many, render just like one result a line"""
+        expected = self._render(
+            self._write("\n".join(json.dumps(r) for r in self.results)))
+        for content in (
+                json.dumps(self.results),
+                "\n  " + json.dumps(self.results, indent=2)
+        ):
+            self.assertEqual(self._render(self._write(content)), expected)
+
+    def test_json_array_decoded_incrementally(self):
+        """We never hold the whole array in memory"""
+        path = self._write(json.dumps(self.results))
+        with mock.patch.object(Command, "CHUNK_SIZE", 1024):
+            cmd = Command()
+            cmd.init_args(["--from-file", path])
+            sample, source = cmd._get_sample_result_and_source(True)
+            self.assertEqual(sample, self.results[0])
+            self.assertEqual(next(source), self.results[0])
+            self.assertEqual(next(source), self.results[1])
+            self.assertTrue(cmd.file.tell() < 4096)
+            self.assertEqual(len(list(source)), 298)
+            cmd.file.close()
+
+    def test_empty(self):
+        for content in ("", "\n\n", "[]"):
+            with self.assertRaises(RipeAtlasToolsException):
+                self._render(self._write(content))
+
+    def test_format(self):
+        """Structured formats write a row per packet, without any probes"""
+        path = self._write("\n".join(json.dumps(r) for r in self.results))
+        output = self._render(path, "--format", "csv", "--probes", "1,2")
+        self.assertEqual(output.splitlines(), [
+            "msm_id,prb_id,timestamp,from,af,dst_addr,dst_name,sent,rcvd,"
+            "packet,rtt,ttl",
+            "1000001,1,1440000000,1.2.3.4,4,3.4.5.6,my.name.ca,1,1,0,10.001,"
+            "20",
+            "1000001,2,1440000000,1.2.3.4,4,3.4.5.6,my.name.ca,1,1,0,10.001,"
+            "20",
+        ])
+        self.assertEqual(self.get_many.call_count, 0)
+        with self.assertRaises(RipeAtlasToolsException):
+            self._render(path, "--format", "csv", "--renderer", "ping")
+
+    def test_summarise(self):
+        """Summarised buckets show a count and the first few results"""
+        path = self._write("\n".join(json.dumps(r) for r in self.results))
+        for args, shown in (
+                (["--summarise", "2"], 2),
+                (["--presorted"], 10)
+        ):
+            output = self._render(path, "--aggregate-by", "country", *args)
+            lines = output.splitlines()
+            self.assertEqual(len(lines), shown + 3)
+            self.assertEqual(lines[0], "COUNTRY_CODE: NL")
+            self.assertEqual(
+                lines[1],
+                " 300 results, median RTT min/avg/max: "
+                "10.001/10.001/10.001 ms"
+            )
+            self.assertTrue(lines[2].startswith(" 20 bytes from probe #1 "))
+            self.assertEqual(lines[-1], " ... and {} more".format(300 - shown))
+        with self.assertRaises(RipeAtlasToolsException):
+            self._render(path, "--summarise", "2")
+
+    def test_summary_renderer_single_pass(self):
+        """Summaries are accumulated as we go, so input is only read once"""
+        path = self._write(json.dumps(self.results))
+        output = self._render(path, "--renderer", "aggregate_ping")
+        self.assertIn("300 packets transmitted, 300 received", output)
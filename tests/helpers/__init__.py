@@ -1,3 +1,20 @@
+from .compression import TestCompression, TestThreadedReader
+from .formats import TestFormats
+from .json_array import TestJSONArrayDecoder
+from .mapped_file import TestMappedFile
+from .quantiles import TestQuantiles
+from .rendering import TestSaganSet
+from .sink import TestOutputSink
 from .validators import TestArgumentTypeHelper
 
-__all__ = [TestArgumentTypeHelper]
+__all__ = [
+    TestArgumentTypeHelper,
+    TestCompression,
+    TestFormats,
+    TestJSONArrayDecoder,
+    TestMappedFile,
+    TestOutputSink,
+    TestQuantiles,
+    TestSaganSet,
+    TestThreadedReader,
+]
@@ -0,0 +1,119 @@
+import bz2
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import lzma
+except ImportError:  # Python 2
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.helpers.compression import Compression, ThreadedReader
+
+
+class BrokenFile(io.BytesIO):
+    def read(self, *args):
+        raise IOError("Broken")
+
+
+class TestCompression(unittest.TestCase):
+
+    DATA = u"".join(
+        u'{{"prb_id": {}, "dst_name": "\u00e9xample.com"}}\n'.format(i)
+        for i in range(20000)
+    ).encode("utf-8")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, compress):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as f:
+            f.write(compress(self.DATA))
+        return path
+
+    def _check(self, name, compress, kind):
+        path = self._write(name, compress)
+        self.assertEqual(Compression.detect(path), kind)
+        with Compression.open(path) as f:
+            self.assertEqual(f.read(), self.DATA)
+        f = Compression.open_text(path)
+        self.assertEqual(
+            f.readline(), self.DATA.decode("utf-8").split("\n")[0] + "\n")
+        self.assertEqual(len(list(f)), 19999)
+        f.close()
+
+    def test_plain(self):
+        path = self._write("plain", lambda data: data)
+        self.assertEqual(Compression.detect(path), None)
+        with Compression.open(path) as f:
+            self.assertEqual(f.read(), self.DATA)
+
+    def test_gzip(self):
+        def compress(data):
+            buffer = io.BytesIO()
+            with gzip.GzipFile(fileobj=buffer, mode="wb") as f:
+                f.write(data)
+            return buffer.getvalue()
+        # No extension needed: it's the magic bytes that count
+        self._check("results", compress, "gzip")
+
+    def test_bz2(self):
+        self._check("results", bz2.compress, "bz2")
+
+    @unittest.skipIf(lzma is None, "lzma isn't available")
+    def test_xz(self):
+        self._check("results", lzma.compress, "xz")
+
+    @unittest.skipIf(zstandard is None, "zstandard isn't installed")
+    def test_zstd(self):
+        self._check(
+            "results", zstandard.ZstdCompressor().compress, "zstd")
+
+    @unittest.skipIf(zstandard is not None, "zstandard is installed")
+    def test_zstd_missing(self):
+        path = os.path.join(self.directory, "results.zst")
+        with open(path, "wb") as f:
+            f.write(b"\x28\xb5\x2f\xfd" + b"\x00" * 10)
+        self.assertEqual(Compression.detect(path), "zstd")
+        with self.assertRaises(RipeAtlasToolsException):
+            Compression.open(path)
+
+
+class TestThreadedReader(unittest.TestCase):
+
+    def test_read(self):
+        data = os.urandom(ThreadedReader.CHUNK_SIZE * 3 + 17)
+        reader = io.BufferedReader(ThreadedReader(io.BytesIO(data)))
+        self.assertEqual(reader.read(10), data[:10])
+        self.assertEqual(reader.read(), data[10:])
+        self.assertEqual(reader.read(), b"")
+        reader.close()
+
+    def test_error(self):
+        """Errors on the reading thread surface where we read"""
+        reader = ThreadedReader(BrokenFile())
+        with self.assertRaises(IOError):
+            reader.read(10)
+        reader.close()
+
+    def test_close_early(self):
+        """Closing before we're done stops the thread"""
+        source = io.BytesIO(b"x" * ThreadedReader.CHUNK_SIZE * 100)
+        reader = ThreadedReader(source)
+        reader.read(10)
+        reader.close()
+        self.assertFalse(reader._thread.is_alive())
+        self.assertTrue(source.closed)
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import unittest
+
+from ripe.atlas.sagan import Result
+
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.helpers import formats
+from ripe.atlas.tools.helpers.formats import Format, Schema
+
+
+class BinaryStream(io.BytesIO):
+    """
+    A BytesIO that survives the writer closing it, so we can read it back.
+    """
+
+    def close(self):
+        pass
+
+
+class TestFormats(unittest.TestCase):
+
+    PING = '{"af":4,"prb_id":1,"result":[{"rtt":10.001},{"x":"*"},{"rtt":10.003}],"ttl":20,"avg":10.002,"size":20,"from":"1.2.3.4","proto":"ICMP","timestamp":1440000000,"dup":0,"type":"ping","sent":3,"msm_id":1000001,"fw":4700,"max":10.003,"step":360,"src_addr":"2.3.4.5","rcvd":2,"msm_name":"Ping","lts":40,"dst_name":"my.name.ca","min":10.001,"dst_addr":"3.4.5.6"}'  # noqa
+    TRACEROUTE = '{"af":4,"prb_id":2,"result":[{"hop":1,"result":[{"from":"10.0.0.1","rtt":1.5,"size":28,"ttl":255},{"x":"*"}]},{"hop":2,"result":[{"from":"3.4.5.6","rtt":9.25,"size":28,"ttl":62}]}],"from":"1.2.3.4","proto":"ICMP","timestamp":1440000000,"type":"traceroute","msm_id":1000002,"fw":4700,"paris_id":1,"size":48,"src_addr":"2.3.4.5","dst_name":"3.4.5.6","dst_addr":"3.4.5.6","endtime":1440000003,"lts":40}'  # noqa
+    DNS = '{"af":4,"prb_id":1,"from":"1.2.3.4","fw":4700,"timestamp":1440000000,"type":"dns","msm_id":1000003,"proto":"UDP","src_addr":"2.3.4.5","dst_addr":"8.8.8.8","result":{"ANCOUNT":1,"ARCOUNT":0,"ID":4660,"NSCOUNT":0,"QDCOUNT":1,"abuf":"EjSBgAABAAEAAAAABHJpcGUDbmV0AAABAAHADAABAAEAAAEsAATBAAaL","rt":12.5,"size":42}}'  # noqa
+    SSL = '{"rt":737.834,"msm_id":1443369,"from":"210.6.135.152","dst_name":"torproject.org","af":4,"timestamp":1392727294,"fw":4570,"cert":["-----BEGIN CERTIFICATE-----\nMIIGujCCBaKgAwIBAgIQBt6X5R3DncJkjaxy3UEB/DANBgkqhkiG9w0BAQsFADBm\nMQswCQYDVQQGEwJVUzEVMBMGA1UEChMMRGlnaUNlcnQgSW5jMRkwFwYDVQQLExB3\nd3cuZGlnaWNlcnQuY29tMSUwIwYDVQQDExxEaWdpQ2VydCBIaWdoIEFzc3VyYW5j\nZSBDQS0zMB4XDTEzMDEyOTAwMDAwMFoXDTE2MDUwMzEyMDAwMFowcjELMAkGA1UE\nBhMCVVMxFjAUBgNVBAgTDU1hc3NhY2h1c2V0dHMxEDAOBgNVBAcTB1dhbHBvbGUx\nHjAcBgNVBAoTFVRoZSBUb3IgUHJvamVjdCwgSW5jLjEZMBcGA1UEAwwQKi50b3Jw\ncm9qZWN0Lm9yZzCCASIwDQYJKoZIhvcNAQEBBQADggEPADCCAQoCggEBAN1oOe8B\n0kT0l6MXsIOWiBiXqLfGCk8nIeX+GXc0TNez14HBWPOzLMmA6Kfj3h9kJ0hLCzlS\nGui3xsT1ca5ZXONP/2beDkIoxwF+7/MCS8gOu4Cyua0CjR0ce6YWemKYVKxoqJvY\nH/S2UnzMHaBI/bhJ+QK5kMYg/JXoMx9IMIJnjl9clFt3TE34UR5/NZTsytXAtCjI\n5qMSpzKRE31RREGv1kxwTqJq/g5UFJWzZEwISDEhTeFTVOru0qjbEAqaip4hQH9D\nITjDOFw7Upgdab4TN4gLwDaZuo+Qcz+CQR6vCSlP2KziQAH9nlU+qT81eYVv+NOf\njogvdu/Atl/q+z0CAwEAAaOCA1YwggNSMB8GA1UdIwQYMBaAFFDqc4nbKfsQj57l\nASDU3nmZSIP3MB0GA1UdDgQWBBSx87Iq0fmAeNURYjYpnSG8riduZjArBgNVHREE\nJDAighAqLnRvcnByb2plY3Qub3Jngg50b3Jwcm9qZWN0Lm9yZzAOBgNVHQ8BAf8E\nBAMCBaAwHQYDVR0lBBYwFAYIKwYBBQUHAwEGCCsGAQUFBwMCMGEGA1UdHwRaMFgw\nKqAooCaGJGh0dHA6Ly9jcmwzLmRpZ2ljZXJ0LmNvbS9jYTMtZzE4LmNybDAqoCig\nJoYkaHR0cDovL2NybDQuZGlnaWNlcnQuY29tL2NhMy1nMTguY3JsMIIBxAYDVR0g\nBIIBuzCCAbcwggGzBglghkgBhv1sAQEwggGkMDoGCCsGAQUFBwIBFi5odHRwOi8v\nd3d3LmRpZ2ljZXJ0LmNvbS9zc2wtY3BzLXJlcG9zaXRvcnkuaHRtMIIBZAYIKwYB\nBQUHAgIwggFWHoIBUgBBAG4AeQAgAHUAcwBlACAAbwBmACAAdABoAGkAcwAgAEMA\nZQByAHQAaQBmAGkAYwBhAHQAZQAgAGMAbwBuAHMAdABpAHQAdQB0AGUAcwAgAGEA\nYwBjAGUAcAB0AGEAbgBjAGUAIABvAGYAIAB0AGgAZQAgAEQAaQBnAGkAQwBlAHIA\ndAAgAEMAUAAvAEMAUABTACAAYQBuAGQAIAB0AGgAZQAgAFIAZQBsAHkAaQBuAGcA\nIABQAGEAcgB0AHkAIABBAGcAcgBlAGUAbQBlAG4AdAAgAHcAaABpAGMAaAAgAGwA\naQBtAGkAdAAgAGwAaQBhAGIAaQBsAGkAdAB5ACAAYQBuAGQAIABhAHIAZQAgAGkA\nbgBjAG8AcgBwAG8AcgBhAHQAZQBkACAAaABlAHIAZQBpAG4AIABiAHkAIAByAGUA\nZgBlAHIAZQBuAGMAZQAuMHsGCCsGAQUFBwEBBG8wbTAkBggrBgEFBQcwAYYYaHR0\ncDovL29jc3AuZGlnaWNlcnQuY29tMEUGCCsGAQUFBzAChjlodHRwOi8vY2FjZXJ0\ncy5kaWdpY2VydC5jb20vRGlnaUNlcnRIaWdoQXNzdXJhbmNlQ0EtMy5jcnQwDAYD\nVR0TAQH/BAIwADANBgkqhkiG9w0BAQsFAAOCAQEAFfAsIxhBxzSVi5a9FpEp9JGc\n0wL5/4BVFv0lKYjHkRVoBdvN3gnAfGt2YXrAJZb7OCVwW3KFdSaTwm8T10eCVSXX\nASTrp6DWs6mHxw9HGIkVF9YESq6x5/ZGHDTovuRMCeHuIwn+nBL21z1WDqwozwcQ\nAxNXeRXJvXO4bOj301+26as9cOWjonGzkW9uc3WTWp89+YOpRo6RQ59Yc3UJlxjW\nHZR3Oqp/GM1jo2NPHnFeMpnFtVj+uuQBtNj7D7jiWhGtNxFIePizOBs8k+ao9lWO\nE2UHK5iM17YISRhBPNwi4YL+nf+jo5untE6WgvFYhEH2pwmCSKrIYBdGatbxfw==\n-----END CERTIFICATE-----"],"method":"SSL","prb_id":1003,"dst_port":"443","dst_addr":"86.59.30.40","ttc":355.078,"src_addr":"192.168.1.182","group_id":1443369,"type":"sslcert","msm_name":"SSLCert","ver":"3.0"}'  # noqa
+    HTTP = '{"fw":4700,"msm_id":1000004,"prb_id":3,"from":"1.2.3.4","timestamp":1440000000,"type":"http","uri":"http://example.com/","result":[{"af":4,"bsize":1000,"dst_addr":"93.184.216.34","hsize":200,"method":"GET","res":200,"rt":55.5,"src_addr":"2.3.4.5","ver":"1.1"}]}'  # noqa
+    NTP = '{"af":4,"dst_addr":"193.0.0.229","dst_name":"ntp.ripe.net","from":"1.2.3.4","fw":4700,"li":"no","lts":40,"mode":"server","msm_id":1000005,"poll":1,"prb_id":4,"precision":1e-06,"proto":"UDP","ref-id":"GPS","ref-ts":3650000000.0,"result":[{"final-ts":3650000001.2,"offset":0.002,"origin-ts":3650000001.0,"receive-ts":3650000001.1,"rtt":0.025,"transmit-ts":3650000001.1},{"x":"*"}],"root-delay":0,"root-dispersion":0,"size":48,"src_addr":"2.3.4.5","stratum":1,"timestamp":1440000000,"type":"ntp","version":4}'  # noqa
+
+    def _write(self, name, kind, results):
+        stream = io.StringIO() if name in ("csv", "ndjson") else \
+            BinaryStream()
+        Format.get(name)(kind, stream=stream).render(
+            [Result.get(r) for r in results])
+        return stream.getvalue()
+
+    def test_ping_rows(self):
+        rows = list(Schema.get("ping").get_rows(Result.get(self.PING)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], (
+            1000001, 1, 1440000000, "1.2.3.4",
+            4, "3.4.5.6", "my.name.ca", 3, 2, 0, 10.001, 20
+        ))
+        self.assertEqual(rows[1][-2:], (None, None))
+
+    def test_traceroute_rows(self):
+        schema = Schema.get("traceroute")
+        rows = [
+            dict(zip(schema.names, row))
+            for row in schema.get_rows(Result.get(self.TRACEROUTE))
+        ]
+        self.assertEqual(
+            [(r["hop"], r["packet"], r["origin"], r["rtt"]) for r in rows],
+            [
+                (1, 0, "10.0.0.1", 1.5),
+                (1, 1, None, None),
+                (2, 0, "3.4.5.6", 9.25),
+            ]
+        )
+
+    def _get_rows(self, kind, result):
+        schema = Schema.get(kind)
+        return [
+            dict(zip(schema.names, row))
+            for row in schema.get_rows(Result.get(result))
+        ]
+
+    def test_dns_rows(self):
+        rows = self._get_rows("dns", self.DNS)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0], {
+            "msm_id": 1000003, "prb_id": 1, "timestamp": 1440000000,
+            "from": "1.2.3.4", "af": 4, "dst_addr": "8.8.8.8",
+            "response": 0, "protocol": "UDP", "rcode": "NOERROR",
+            "answers": 1, "response_time": 12.5, "response_size": 42,
+        })
+
+    def test_ssl_rows(self):
+        rows = self._get_rows("sslcert", self.SSL)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["dst_addr"], "86.59.30.40")
+        self.assertEqual(rows[0]["dst_name"], "torproject.org")
+        self.assertEqual(rows[0]["port"], 443)
+        self.assertEqual(rows[0]["certificate"], 0)
+        self.assertEqual(rows[0]["subject_cn"], "*.torproject.org")
+        self.assertEqual(
+            rows[0]["issuer_cn"], "DigiCert High Assurance CA-3")
+        self.assertEqual(rows[0]["valid_from"], 1359417600)
+        self.assertEqual(rows[0]["valid_until"], 1462276800)
+        self.assertTrue(rows[0]["checksum_sha256"].startswith("36:13:D2"))
+
+    def test_http_rows(self):
+        rows = self._get_rows("http", self.HTTP)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0], {
+            "msm_id": 1000004, "prb_id": 3, "timestamp": 1440000000,
+            "from": "1.2.3.4", "uri": "http://example.com/",
+            "method": "GET", "response": 0, "af": 4,
+            "dst_addr": "93.184.216.34", "code": 200,
+            "response_time": 55.5, "head_size": 200, "body_size": 1000,
+        })
+
+    def test_ntp_rows(self):
+        rows = self._get_rows("ntp", self.NTP)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], {
+            "msm_id": 1000005, "prb_id": 4, "timestamp": 1440000000,
+            "from": "1.2.3.4", "af": 4, "dst_addr": "193.0.0.229",
+            "dst_name": "ntp.ripe.net", "stratum": 1, "packet": 0,
+            "rtt": 0.025, "offset": 0.002,
+        })
+        self.assertEqual(rows[1]["packet"], 1)
+
+    def test_empty_result_keeps_a_row(self):
+        empty = json.loads(self.PING)
+        empty["result"] = []
+        rows = list(Schema.get("ping").get_rows(Result.get(empty)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][:2], (1000001, 1))
+        self.assertEqual(rows[0][4:], (None,) * 8)
+
+    def test_unknown(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            Schema.get("wifi")
+        with self.assertRaises(RipeAtlasToolsException):
+            Format.get("xml")
+
+    def test_csv(self):
+        output = self._write("csv", "ping", [self.PING, self.TRACEROUTE])
+        rows = list(csv.reader(io.StringIO(output)))
+        self.assertEqual(rows[0], Schema.get("ping").names)
+        self.assertEqual(len(rows), 4)  # Traceroutes are skipped
+        self.assertEqual(rows[2][-2:], ["", ""])
+
+    def test_ndjson(self):
+        output = self._write("ndjson", "traceroute", [self.TRACEROUTE])
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2]["origin"], "3.4.5.6")
+        self.assertEqual(rows[1]["rtt"], None)
+
+    @unittest.skipUnless(formats.pyarrow, "pyarrow isn't installed")
+    def test_arrow(self):
+        import pyarrow.ipc
+        output = self._write("arrow", "ping", [self.PING] * 3)
+        table = pyarrow.ipc.open_stream(output).read_all()
+        self.assertEqual(table.schema.names, Schema.get("ping").names)
+        self.assertEqual(table.num_rows, 9)
+        self.assertEqual(
+            table.column("rtt").to_pylist()[:3], [10.001, None, 10.003])
+
+    @unittest.skipUnless(formats.pyarrow, "pyarrow isn't installed")
+    def test_parquet(self):
+        import pyarrow.parquet
+        output = self._write("parquet", "traceroute", [self.TRACEROUTE] * 2)
+        table = pyarrow.parquet.read_table(io.BytesIO(output))
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.column("hop").to_pylist(), [1, 1, 2] * 2)
+
+    def test_arrow_requires_pyarrow(self):
+        pyarrow, formats.pyarrow = formats.pyarrow, None
+        try:
+            with self.assertRaises(RipeAtlasToolsException):
+                Format.get("arrow")("ping", stream=BinaryStream())
+        finally:
+            formats.pyarrow = pyarrow
@@ -0,0 +1,80 @@
+import json
+import unittest
+
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.helpers.json_array import JSONArrayDecoder
+
+
+class TestJSONArrayDecoder(unittest.TestCase):
+
+    DATA = [
+        {"prb_id": 1, "result": [{"rtt": 1.5}, {"x": "*"}]},
+        12345,
+        -1.5e3,
+        'a string with ], [ and \\" in it',
+        [1, [2, [3]]],
+        None,
+        True,
+        {},
+        [],
+    ]
+
+    @staticmethod
+    def get_chunks(text, size):
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def test_decode(self):
+        """Every chunking of the input decodes the same"""
+        for text in (json.dumps(self.DATA), json.dumps(self.DATA, indent=4)):
+            for size in (1, 2, 3, 7, 64, len(text)):
+                self.assertEqual(
+                    list(JSONArrayDecoder(self.get_chunks(text, size))),
+                    self.DATA
+                )
+
+    def test_numbers_across_chunks(self):
+        """A number split between chunks isn't cut short"""
+        self.assertEqual(
+            list(JSONArrayDecoder(["[12", "34,5", "6", "7]"])), [1234, 567])
+        self.assertEqual(list(JSONArrayDecoder(["[12", "34", "]"])), [1234])
+
+    def test_empty(self):
+        self.assertEqual(list(JSONArrayDecoder(["[", " \n", "]"])), [])
+        self.assertEqual(list(JSONArrayDecoder(["  []  "])), [])
+
+    def test_malformed(self):
+        for chunks in (
+                ["{}"],
+                [""],
+                ['[{"a": 1}'],
+                ['[{"a": 1},'],
+                ['[{"a": 1} {"b": 2}]'],
+                ['[{"a": '],
+                ['[1, 2', ', 3'],
+        ):
+            with self.assertRaises(RipeAtlasToolsException):
+                list(JSONArrayDecoder(chunks))
+
+    def test_lazy(self):
+        """Elements are handed out before the rest of the input is read"""
+
+        def chunks():
+            yield '[{"a": 1}, '
+            raise AssertionError("Read too far")
+
+        self.assertEqual(next(iter(JSONArrayDecoder(chunks()))), {"a": 1})
+
+    def test_bounded_memory(self):
+        """Only what's needed to decode the current element is kept around"""
+
+        element = {"result": ["x" * 100] * 10}
+        size = len(json.dumps(element))
+        chunks = self.get_chunks(json.dumps([element] * 1000), 64)
+
+        decoder = JSONArrayDecoder(chunks)
+        largest = 0
+        for decoded in decoder:
+            self.assertEqual(decoded, element)
+            largest = max(largest, len(decoder._buffer))
+
+        self.assertTrue(largest < size * 3)
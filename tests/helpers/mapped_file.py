@@ -0,0 +1,87 @@
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from ripe.atlas.tools.helpers.mapped_file import MappedFile
+
+
+class TestMappedFile(unittest.TestCase):
+
+    LINES = ['{"prb_id": %d}' % i for i in range(1, 11)]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "results")
+        self._write("\n".join(self.LINES) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def test_lines(self):
+        mapped = MappedFile(self.path)
+        self.assertEqual(len(mapped), 10)
+        self.assertEqual(list(mapped), self.LINES)
+        self.assertEqual(mapped.get_line(3), self.LINES[3])
+        mapped.close()
+
+    def test_blank_lines(self):
+        """Blank lines, and a missing newline at the end, are fine"""
+        self._write("\n\n  \n" + "\r\n\n".join(self.LINES[:3]))
+        mapped = MappedFile(self.path)
+        self.assertEqual([line.strip() for line in mapped], self.LINES[:3])
+        mapped.close()
+
+    def test_empty(self):
+        self._write("")
+        mapped = MappedFile(self.path)
+        self.assertEqual(len(mapped), 0)
+        self.assertEqual(list(mapped.get_ranges(10)), [])
+        mapped.close()
+
+    def test_ranges(self):
+        mapped = MappedFile(self.path)
+        ranges = list(mapped.get_ranges(4))
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(
+            [mapped.read_lines(start, stop) for start, stop in ranges],
+            [self.LINES[:4], self.LINES[4:8], self.LINES[8:]]
+        )
+        mapped.close()
+
+    def test_index_reused(self):
+        """The second time around, the index comes off the disk"""
+        mapped = MappedFile(self.path)
+        offsets = mapped.offsets
+        mapped.close()
+        self.assertTrue(os.path.exists(self.path + ".idx"))
+
+        with mock.patch.object(MappedFile, "_build_index") as build:
+            mapped = MappedFile(self.path)
+            self.assertEqual(mapped.offsets, offsets)
+            self.assertEqual(build.call_count, 0)
+            mapped.close()
+
+    def test_index_stale(self):
+        """A changed file gets a new index"""
+        MappedFile(self.path).close()
+        mapped = MappedFile(self.path)
+        len(mapped)
+        mapped.close()
+        self._write("\n".join(self.LINES[:2]))
+        mapped = MappedFile(self.path)
+        self.assertEqual(list(mapped), self.LINES[:2])
+        mapped.close()
+
+    def test_index_unwritable(self):
+        """We get by without saving the index if we have to"""
+        with mock.patch("os.rename", side_effect=OSError()):
+            mapped = MappedFile(self.path)
+            self.assertEqual(list(mapped), self.LINES)
+            mapped.close()
+        self.assertEqual(os.listdir(self.directory), ["results"])
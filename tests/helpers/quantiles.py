@@ -0,0 +1,42 @@
+import random
+import unittest
+
+from ripe.atlas.tools.helpers.quantiles import P2Quantile, get_percentile
+
+
+class TestQuantiles(unittest.TestCase):
+
+    def test_get_percentile(self):
+        self.assertEqual(get_percentile([], 0.5), None)
+        self.assertEqual(get_percentile([7], 0.99), 7)
+        self.assertEqual(get_percentile([0, 2.0, 5.0, 20], 0.5), 3.5)
+        self.assertEqual(get_percentile([1, 2, 3, 4, 5], 0.5), 3)
+        self.assertEqual(get_percentile([1, 2, 3, 4, 5], 0.9), 4.6)
+        self.assertEqual(get_percentile([1, 2, 3, 4, 5], 1), 5)
+
+    def test_p2_small(self):
+        """With five numbers or fewer, the estimate is exact"""
+        estimator = P2Quantile(0.5)
+        for x in (5, 1, 4, 2):
+            estimator.add(x)
+        self.assertEqual(estimator.value, 3)
+
+    def test_p2(self):
+        generator = random.Random(0)
+        values = [generator.lognormvariate(3, 0.5) for _ in range(50000)]
+        ordered = sorted(values)
+        for p in (0.5, 0.9, 0.95, 0.99):
+            estimator = P2Quantile(p)
+            for x in values:
+                estimator.add(x)
+            self.assertEqual(estimator.count, 50000)
+            self.assertAlmostEqual(
+                estimator.value / get_percentile(ordered, p), 1,
+                delta=0.01, msg=p)
+
+    def test_p2_sorted_input(self):
+        """Input in order is the worst case for the markers"""
+        estimator = P2Quantile(0.9)
+        for x in range(10001):
+            estimator.add(x)
+        self.assertAlmostEqual(estimator.value, 9000, delta=90)
@@ -0,0 +1,207 @@
+import gzip
+import json
+import mock
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from ripe.atlas.tools.helpers.compression import Compression
+from ripe.atlas.tools.helpers.mapped_file import MappedFile
+from ripe.atlas.sagan import Result
+
+from ripe.atlas.tools.helpers.rendering import SaganSet, _is_wanted
+
+
+class FakeProbe(object):
+    def __init__(self, pk):
+        self.id = pk
+
+
+class TestSaganSet(unittest.TestCase):
+
+    RESULT = {"af": 4, "prb_id": 1, "result": [{"rtt": 10.001}], "ttl": 20, "avg": 10.001, "size": 20, "from": "1.2.3.4", "proto": "ICMP", "timestamp": 1440000000, "dup": 0, "type": "ping", "sent": 1, "msm_id": 1000001, "fw": 4700, "max": 10.001, "step": 360, "src_addr": "2.3.4.5", "rcvd": 1, "msm_name": "Ping", "lts": 40, "dst_name": "my.name.ca", "min": 10.001, "dst_addr": "3.4.5.6"}  # noqa
+
+    PATH = "ripe.atlas.tools.helpers.rendering.Probe.get_many"
+
+    def setUp(self):
+        self.lookups = []
+
+        def get_many(ids):
+            self.lookups.append(len(ids))
+            return [FakeProbe(pk) for pk in ids]
+
+        self.mock_get_many = mock.patch(self.PATH).start()
+        self.mock_get_many.side_effect = get_many
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def get_results(self, count):
+        return [
+            json.dumps(dict(self.RESULT, prb_id=i, timestamp=i))
+            for i in range(1, count + 1)
+        ]
+
+    def test_order(self):
+        """Results come out in the order they went in, probes attached"""
+        for depth in (0, 1, 4):
+            sagans = list(
+                SaganSet(self.get_results(450), prefetch_depth=depth))
+            self.assertEqual(
+                [s.probe_id for s in sagans], list(range(1, 451)))
+            self.assertTrue(all(s.probe.id == s.probe_id for s in sagans))
+
+    def test_jobs(self):
+        """Parsing in several processes doesn't change the output"""
+        results = self.get_results(SaganSet.CHUNK_SIZE * 10 + 7)
+        results.insert(5, "garbage")
+        sagans = list(SaganSet(results, probes=set(range(1, 3000, 3)), jobs=3))
+        self.assertEqual(
+            [s.probe_id for s in sagans], list(range(1, len(results), 3)))
+        self.assertTrue(all(s.probe.id == s.probe_id for s in sagans))
+
+    def test_jobs_mapped_file(self):
+        """Workers read straight from a mapped file"""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "results")
+            with open(path, "w") as f:
+                f.write("\n".join(self.get_results(1000)))
+            mapped = MappedFile(path)
+            for jobs in (1, 3):
+                sagans = list(SaganSet(mapped, jobs=jobs))
+                self.assertEqual(
+                    [s.probe_id for s in sagans], list(range(1, 1001)))
+            mapped.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_jobs_threaded_source(self):
+        """Workers aren't forked from under a thread reading the input"""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "results.gz")
+            with gzip.open(path, "wb") as f:
+                f.write("\n".join(self.get_results(1000)).encode("utf-8"))
+            source = Compression.open_text(path)
+            with mock.patch(
+                    "ripe.atlas.tools.helpers.rendering.multiprocessing",
+                    wraps=multiprocessing) as mock_multiprocessing:
+                sagans = list(SaganSet(source, jobs=2))
+            source.close()
+            self.assertEqual(
+                [s.probe_id for s in sagans], list(range(1, 1001)))
+            if hasattr(multiprocessing, "get_context"):
+                mock_multiprocessing.get_context.assert_called_once_with(
+                    "forkserver")
+        finally:
+            shutil.rmtree(directory)
+
+    def test_without_probes(self):
+        """Probes aren't looked up when nobody wants them"""
+        for jobs in (1, 2):
+            sagans = list(SaganSet(
+                self.get_results(300), jobs=jobs, attach_probes=False))
+            self.assertEqual(len(sagans), 300)
+            self.assertFalse(any(hasattr(s, "probe") for s in sagans))
+        self.assertEqual(self.mock_get_many.call_count, 0)
+
+    def test_probe_filter(self):
+        sagans = SaganSet(
+            self.get_results(10), probes=(2, 3), prefetch_depth=1)
+        self.assertEqual([s.probe_id for s in sagans], [2, 3])
+
+    def test_probe_prefilter(self):
+        """Results from other probes are dropped before they're parsed"""
+        results = self.get_results(100)
+        path = "ripe.atlas.tools.helpers.rendering.Result.get"
+        for source in (results, [json.loads(r) for r in results]):
+            with mock.patch(path, wraps=Result.get) as get:
+                sagans = SaganSet(source, probes=[7, 70], prefetch_depth=0)
+                self.assertEqual([s.probe_id for s in sagans], [7, 70])
+                self.assertEqual(get.call_count, 2)
+
+    def test_is_wanted(self):
+        probes = frozenset([1, 2])
+        self.assertTrue(_is_wanted('{"prb_id": 1, "type": "ping"}', probes))
+        self.assertTrue(_is_wanted('{"type": "ping", "prb_id":2}', probes))
+        self.assertFalse(_is_wanted('{"prb_id": 10, "type": "ping"}', probes))
+        self.assertFalse(_is_wanted({"prb_id": 10}, probes))
+        self.assertTrue(_is_wanted({"prb_id": 1}, probes))
+
+        # If we can't tell, Sagan gets to decide
+        self.assertTrue(_is_wanted('{"type": "ping"}', probes))
+        self.assertTrue(_is_wanted({"type": "ping"}, probes))
+
+    def test_accumulate(self):
+        """Every result is accumulated once, on its way out"""
+        accumulated = []
+        sagans = SaganSet(
+            iter(self.get_results(250)), accumulate=accumulated.append)
+        for sagan in sagans:
+            self.assertIs(accumulated[-1], sagan)
+        self.assertEqual(
+            [s.probe_id for s in accumulated], list(range(1, 251)))
+
+    def test_stops_on_empty_line(self):
+        results = self.get_results(3)
+        results.insert(2, "\n")
+        sagans = SaganSet(results, prefetch_depth=1)
+        self.assertEqual([s.probe_id for s in sagans], [1, 2])
+
+    def test_batches_grow_while_waiting(self):
+        """When the lookups are the bottleneck, batches get bigger"""
+
+        def get_many(ids):
+            self.lookups.append(len(ids))
+            time.sleep(0.01)
+            return [FakeProbe(pk) for pk in ids]
+
+        self.mock_get_many.side_effect = get_many
+
+        results = self.get_results(SaganSet.MAX_BATCH_SIZE * 4)
+        self.assertEqual(
+            len(list(SaganSet(results, prefetch_depth=0))), len(results))
+        self.assertEqual(self.lookups[0], SaganSet.MIN_BATCH_SIZE)
+        self.assertEqual(max(self.lookups), SaganSet.MAX_BATCH_SIZE)
+        self.assertEqual(self.lookups[:-1], sorted(self.lookups[:-1]))
+
+    def test_lookup_overlaps_rendering(self):
+        """The next batch is being looked up while this one is rendered"""
+
+        looked_up = threading.Event()
+
+        def get_many(ids):
+            self.lookups.append(len(ids))
+            if len(self.lookups) == 2:
+                looked_up.set()
+            return [FakeProbe(pk) for pk in ids]
+
+        self.mock_get_many.side_effect = get_many
+
+        sagans = iter(SaganSet(self.get_results(300), prefetch_depth=1))
+        next(sagans)
+        self.assertTrue(looked_up.wait(5))
+        self.assertEqual(len(list(sagans)), 299)
+
+    def test_lookup_error(self):
+        """Errors in the background are raised where the results are read"""
+        self.mock_get_many.side_effect = ValueError("Boom")
+        with self.assertRaises(ValueError):
+            list(SaganSet(self.get_results(10), prefetch_depth=1))
+
+    def test_abandoned(self):
+        """The prefetcher stops when we stop reading"""
+        before = threading.active_count()
+        sagans = iter(SaganSet(self.get_results(1000), prefetch_depth=2))
+        next(sagans)
+        sagans.close()
+        for _ in range(100):
+            if threading.active_count() == before:
+                break
+            time.sleep(0.01)
+        self.assertEqual(threading.active_count(), before)
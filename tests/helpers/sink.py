@@ -0,0 +1,102 @@
+import unittest
+
+from ripe.atlas.tools.helpers.rendering import Rendering
+from ripe.atlas.tools.helpers.sink import OutputSink
+from ..base import capture_sys_output
+
+try:
+    from cStringIO import StringIO
+except ImportError:  # Python 3
+    from io import StringIO
+
+
+class FakeStream(StringIO):
+
+    def __init__(self, tty=False):
+        StringIO.__init__(self)
+        self.tty = tty
+        self.writes = 0
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        self.writes += 1
+        return StringIO.write(self, text)
+
+
+class FakeRenderer(object):
+
+    def header(self):
+        print("header")
+
+    def prepare(self, results):
+        pass
+
+    def on_result(self, result):
+        return "result {}\n".format(result)
+
+    def finalise(self):
+        print("finalise")
+
+    def additional(self, results):
+        print("additional")
+
+    def footer(self):
+        print("footer")
+
+
+class TestOutputSink(unittest.TestCase):
+
+    def test_batched(self):
+        """Writes to a pipe or file are batched"""
+        stream = FakeStream()
+        sink = OutputSink(stream)
+        self.assertFalse(sink.immediate)
+        for i in range(1000):
+            sink.write("line {}\n".format(i))
+        self.assertEqual(stream.writes, 0)
+        sink.flush()
+        self.assertEqual(stream.writes, 1)
+        self.assertEqual(len(stream.getvalue().splitlines()), 1000)
+
+    def test_batch_size(self):
+        stream = FakeStream()
+        sink = OutputSink(stream)
+        line = "x" * 1023 + "\n"
+        for i in range(200):
+            sink.write(line)
+        self.assertEqual(stream.writes, 3)
+        with sink:
+            pass
+        self.assertEqual(stream.getvalue(), line * 200)
+
+    def test_tty(self):
+        """Someone's watching, so we write straight away"""
+        stream = FakeStream(tty=True)
+        sink = OutputSink(stream)
+        self.assertTrue(sink.immediate)
+        sink.write("line\n")
+        self.assertEqual(stream.getvalue(), "line\n")
+
+    def test_immediate(self):
+        stream = FakeStream()
+        sink = OutputSink(stream, immediate=True)
+        sink.write("line\n")
+        sink.write("")
+        self.assertEqual(stream.writes, 1)
+
+    def test_rendering_order(self):
+        """Output from the renderer's own hooks stays in order"""
+        with capture_sys_output() as (stdout, stderr):
+            Rendering(
+                renderer=FakeRenderer(),
+                header="Header",
+                footer="Footer",
+                payload={"bucket": [1, 2]}
+            ).render()
+        self.assertEqual(
+            stdout.getvalue(),
+            "Header\nheader\nbucket\n result 1\n result 2\n"
+            "finalise\nadditional\nfooter\nFooter\n"
+        )
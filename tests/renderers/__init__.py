@@ -1,3 +1,4 @@
+from .base import TestTemplateRegistry
 from .ping import TestPingRenderer
 from .aggregate_ping import TestAggregatePing
 from .ssl_consistency import TestSSLConsistency
@@ -5,5 +6,6 @@ from .ssl_consistency import TestSSLConsistency
 __all__ = [
     TestPingRenderer,
     TestAggregatePing,
-    TestSSLConsistency
+    TestSSLConsistency,
+    TestTemplateRegistry
 ]
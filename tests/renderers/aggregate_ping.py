@@ -1,3 +1,4 @@
+import random
 import unittest
 from collections import namedtuple
 from ripe.atlas.tools.renderers.aggregate_ping import Renderer
@@ -25,25 +26,59 @@ class TestAggregatePing(unittest.TestCase):
             ) for result in cls.results
         ]
 
-    def test_additional(self):
-        """Tests whole functionality of additional unit."""
+    def test_finalise(self):
+        """Tests whole functionality of the summary."""
         expected_output = (
             "-- 194.88.241.228 ping statistics ---\n"
             "15 packets transmitted, 15 received, 0.0% loss\n"
-            "rtt min/med/avg/max = 36.921608/42.406/82.693/218.077484 ms\n\n"
+            "rtt min/med/avg/max = 36.921608/42.406/82.693/218.077484 ms\n"
+            "rtt p50/p90/p95/p99 = 42.406/154.586/173.815/209.225 ms\n\n"
         )
 
         with capture_sys_output() as (stdout, stderr):
-            Renderer().additional(self.sagans)
+            renderer = Renderer()
+            for sagan in self.sagans:
+                renderer.accumulate(sagan)
+            renderer.finalise()
             self.assertEquals(stdout.getvalue(), expected_output)
 
+    def test_finalise_estimated(self):
+        """Percentiles can be estimated without keeping the RTTs"""
+        renderer = Renderer(estimate_percentiles=True)
+        for sagan in self.sagans:
+            renderer.accumulate(sagan)
+        self.assertEqual(len(renderer.rtts), 0)
+        self.assertEqual(list(renderer.rtts_min), [36.921608])
+        self.assertEqual(list(renderer.rtts_max), [218.077484])
+        self.assertEqual(renderer.mean(), 82.693)
+
+        with capture_sys_output() as (stdout, stderr):
+            renderer.finalise()
+        self.assertTrue(stdout.getvalue().endswith(" ms (estimated)\n\n"))
+
+    def test_estimated_percentiles(self):
+        """The estimates are close to the real thing"""
+        Packet = namedtuple("Packet", "rtt")
+        generator = random.Random(0)
+        rtts = [generator.expovariate(0.05) for _ in range(20000)]
+        exact = Renderer(estimate_percentiles=False)
+        estimated = Renderer(estimate_percentiles=True)
+        for renderer in (exact, estimated):
+            renderer.collect_packets_rtt([Packet(rtt=rtt) for rtt in rtts])
+        for p, (real, estimate) in zip(
+                Renderer.PERCENTILES,
+                zip(exact.percentiles(), estimated.percentiles())
+        ):
+            self.assertAlmostEqual(estimate / real, 1, delta=0.02, msg=p)
+        self.assertEqual(exact.percentiles()[0], exact.median())
+
     def test_collect_stats(self):
         """Tests collect stats function."""
 
         renderer = Renderer()
         renderer.collect_stats(self.sagans)
         self.assertEquals(
-            renderer.rtts,
+            list(renderer.rtts),
             [
                 42.343, 42.22, 42.406, 76.611, 76.39, 76.474, 154.118, 154.197,
                 154.845, 42.264, 42.196, 42.343, 218.077, 36.922, 38.994
@@ -53,11 +88,11 @@ class TestAggregatePing(unittest.TestCase):
         self.assertEquals(renderer.sent_packets, 15)
         self.assertEquals(renderer.received_packets, 15)
         self.assertEquals(
-            renderer.rtts_min,
+            list(renderer.rtts_min),
             [42.220215, 76.38997, 154.118, 42.196233, 36.921608]
         )
         self.assertEquals(
-            renderer.rtts_max,
+            list(renderer.rtts_max),
             [42.40614, 76.61127, 154.845, 42.342921, 218.077484]
         )
 
@@ -65,14 +100,14 @@ class TestAggregatePing(unittest.TestCase):
         """Test use cases for collecting min max rtts."""
         renderer = Renderer()
         renderer.collect_min_max_rtts("min", 3)
-        self.assertEquals(renderer.rtts_min, [3])
+        self.assertEquals(list(renderer.rtts_min), [3])
         renderer.collect_min_max_rtts("min", None)
-        self.assertEquals(renderer.rtts_min, [3, 0])
+        self.assertEquals(list(renderer.rtts_min), [3, 0])
 
         renderer.collect_min_max_rtts("max", 3)
-        self.assertEquals(renderer.rtts_max, [3])
+        self.assertEquals(list(renderer.rtts_max), [3])
         renderer.collect_min_max_rtts("max", None)
-        self.assertEquals(renderer.rtts_max, [3, 0])
+        self.assertEquals(list(renderer.rtts_max), [3, 0])
 
     def test_collect_packets_rtt(self):
         """Test use cases for collecting rtts."""
@@ -80,12 +115,12 @@ class TestAggregatePing(unittest.TestCase):
         packets = [Packet(rtt=2), Packet(rtt=3.2), Packet(rtt=5.0)]
         renderer = Renderer()
         renderer.collect_packets_rtt(packets)
-        self.assertEquals(renderer.rtts, [2, 3.2, 5.0])
+        self.assertEquals(list(renderer.rtts), [2, 3.2, 5.0])
 
         packets = [Packet(rtt=None), Packet(rtt=3.2), Packet(rtt=5.0)]
         renderer = Renderer()
         renderer.collect_packets_rtt(packets)
-        self.assertEquals(renderer.rtts, [0, 3.2, 5.0])
+        self.assertEquals(list(renderer.rtts), [0, 3.2, 5.0])
 
     def test_set_target(self):
         """Tests setting the target."""
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.renderers.base import Renderer, TemplateRegistry
+
+
+class TestTemplateRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.registry = TemplateRegistry()
+
+    def tearDown(self):
+        shutil.rmtree(self.home)
+
+    def _write(self, name, text):
+        path = os.path.join(
+            self.home, ".config", "ripe-atlas-tools", "renderers",
+            "templates", name)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_read_once(self):
+        """Templates are read from disk only the first time"""
+        with mock.patch.dict(os.environ, {"HOME": self.home}):
+            self._write("reports/mine.txt", "Hello {name}")
+            template = self.registry.get("reports/mine.txt")
+            with mock.patch(
+                    "ripe.atlas.tools.renderers.base.open", create=True) as m:
+                self.assertIs(self.registry.get("reports/mine.txt"), template)
+                self.assertEqual(m.call_count, 0)
+        self.assertEqual(template.fields, frozenset(["name"]))
+        self.assertEqual(template.render(name="you"), "Hello you")
+
+    def test_builtin(self):
+        template = self.registry.get("reports/ssl_consistency.txt")
+        self.assertIn("sha256fp", template.fields)
+
+    def test_register(self):
+        self.registry.register("greeting", text="Hi {name[0]}, {0.real}")
+        self.assertEqual(
+            self.registry.get("greeting").fields, frozenset(["name", "0"]))
+        path = self._write("elsewhere.txt", "Bye {name}")
+        self.registry.register("greeting", path=path)
+        self.assertEqual(
+            self.registry.get("greeting").render(name="you"), "Bye you")
+        with self.assertRaises(RipeAtlasToolsException):
+            self.registry.register("greeting")
+
+    def test_missing(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.registry.get("reports/nothing.txt")
+        self.registry.register("greeting", text="Hi {name}, I'm {me}")
+        with self.assertRaises(RipeAtlasToolsException) as e:
+            self.registry.get("greeting").render(name="you")
+        self.assertIn("me", str(e.exception))
+
+    def test_renderer(self):
+        """Renderer.render() goes through the registry"""
+        registry = "ripe.atlas.tools.renderers.base.templates"
+        with mock.patch(registry, self.registry):
+            self.registry.register("greeting", text="Hi {name}")
+            self.assertEqual(
+                Renderer.render("greeting", name="you"), "Hi you")
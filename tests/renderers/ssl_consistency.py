@@ -1,3 +1,4 @@
+import array
 import mock
 import unittest
 from ripe.atlas.cousteau import Probe as CProbe
@@ -80,8 +81,8 @@ class TestSSLConsistency(unittest.TestCase):
     def setUp(self):
         pass
 
-    def test_additional(self):
-        """Tests whole functionality of additional unit."""
+    def test_finalise(self):
+        """Tests whole functionality of the summary."""
         expected_output = (
             "Certificate:\n"
             "  Issuer: C=US, O=DigiCert Inc, CN=DigiCert High Assurance CA-3\n"
@@ -115,23 +116,43 @@ class TestSSLConsistency(unittest.TestCase):
             path = 'ripe.atlas.tools.helpers.rendering.Probe.get_many'
             with mock.patch(path) as mock_get_many:
                 mock_get_many.return_value = self.probes.values()
-                sagans = SaganSet(self.results)
-                Renderer().additional(sagans)
+                renderer = Renderer()
+                for sagan in SaganSet(self.results):
+                    renderer.accumulate(sagan)
+                renderer.finalise()
                 expected_set = set(expected_output.split("\n"))
                 returned_set = set(stdout.getvalue().split("\n"))
                 self.assertEquals(returned_set, expected_set)
 
+    def test_finalise_only_looks_up_printed_probes(self):
+        """Tests that only the probes of listed certs are looked up."""
+        path = 'ripe.atlas.tools.helpers.rendering.Probe.get_many'
+        with mock.patch(path) as mock_get_many:
+            mock_get_many.return_value = self.probes.values()
+            sagans = list(SaganSet(self.results))
+        renderer = Renderer()
+        for sagan in sagans:
+            renderer.accumulate(sagan)
+        path = 'ripe.atlas.tools.renderers.ssl_consistency.Probe.get_many'
+        with capture_sys_output():
+            with mock.patch(path) as mock_get_many:
+                mock_get_many.return_value = [self.probes[2844]]
+                renderer.finalise()
+                self.assertEqual(mock_get_many.call_count, 2)
+                for call in mock_get_many.call_args_list:
+                    self.assertEqual(call[0], ({2844},))
+
     def test_gather_unique_certs(self):
         """Test gathering of the unique certs in sagans set"""
         expected_certs = {
-            '1A:B8:9E:ED:1B:DD:A0:E2:EA:67:89:C1:C5:4B:20:1C:49:9D:74:27:B0:5D:11:F2:9A:5F:C1:0D:F9:18:48:DA': {'cnt': 1, 'probes': [self.probes[2844]]},
+            '1A:B8:9E:ED:1B:DD:A0:E2:EA:67:89:C1:C5:4B:20:1C:49:9D:74:27:B0:5D:11:F2:9A:5F:C1:0D:F9:18:48:DA': {'cnt': 1, 'probes': array.array("l", [2844])},
             '36:13:D2:B2:2A:75:00:94:76:0C:41:AD:19:DB:52:A4:F0:5B:DE:A8:01:72:E2:57:87:61:AD:96:7F:7E:D9:AA': {
-                'cnt': 11, 'probes': [self.probes[1003], self.probes[1004], self.probes[1033], self.probes[1038], self.probes[1047], self.probes[12203], self.probes[12208], self.probes[13026], self.probes[13377], self.probes[1386], self.probes[400]]
+                'cnt': 11, 'probes': array.array("l", [1003, 1004, 1033, 1038, 1047, 12203, 12208, 13026, 13377, 1386, 400])
             },
             '21:EB:37:AB:4C:F6:EF:89:65:EC:17:66:40:9C:A7:6B:8B:2E:03:F2:D1:A3:88:DF:73:42:08:E8:6D:EE:E6:79': {
-                'cnt': 11, 'probes': [self.probes[1003], self.probes[1004], self.probes[1033], self.probes[1038], self.probes[1047], self.probes[12203], self.probes[12208], self.probes[13026], self.probes[13377], self.probes[1386], self.probes[400]]
+                'cnt': 11, 'probes': array.array("l", [1003, 1004, 1033, 1038, 1047, 12203, 12208, 13026, 13377, 1386, 400])
             },
-            '07:52:BE:65:72:BF:02:D4:C9:E2:93:09:A8:E0:BE:3A:EA:D4:30:41:B8:49:FA:C5:F2:12:33:07:37:57:EE:C7': {'cnt': 1, 'probes': [self.probes[2844]]}
+            '07:52:BE:65:72:BF:02:D4:C9:E2:93:09:A8:E0:BE:3A:EA:D4:30:41:B8:49:FA:C5:F2:12:33:07:37:57:EE:C7': {'cnt': 1, 'probes': array.array("l", [2844])}
         }
 
         path = 'ripe.atlas.tools.helpers.rendering.Probe.get_many'
@@ -148,8 +169,8 @@ class TestSSLConsistency(unittest.TestCase):
     def test_bucketize_result_cert(self):
         """Tests bucketize of a single sagan result"""
         expected_certs = {
-            '36:13:D2:B2:2A:75:00:94:76:0C:41:AD:19:DB:52:A4:F0:5B:DE:A8:01:72:E2:57:87:61:AD:96:7F:7E:D9:AA': {'cnt': 1, 'probes': [self.probes[1003]]},
-            '21:EB:37:AB:4C:F6:EF:89:65:EC:17:66:40:9C:A7:6B:8B:2E:03:F2:D1:A3:88:DF:73:42:08:E8:6D:EE:E6:79': {'cnt': 1, 'probes': [self.probes[1003]]}
+            '36:13:D2:B2:2A:75:00:94:76:0C:41:AD:19:DB:52:A4:F0:5B:DE:A8:01:72:E2:57:87:61:AD:96:7F:7E:D9:AA': {'cnt': 1, 'probes': array.array("l", [1003])},
+            '21:EB:37:AB:4C:F6:EF:89:65:EC:17:66:40:9C:A7:6B:8B:2E:03:F2:D1:A3:88:DF:73:42:08:E8:6D:EE:E6:79': {'cnt': 1, 'probes': array.array("l", [1003])}
         }
         path = 'ripe.atlas.tools.helpers.rendering.Probe.get_many'
         with mock.patch(path) as mock_get_many:
@@ -0,0 +1,550 @@
+import datetime
+import mock
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import anydbm as dbm
+except ImportError:  # Python 3
+    import dbm
+
+from ripe.atlas.tools.cache import LocalCache, MemoryCache, memoised
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+
+
+def _write_to_cache(path, worker, iterations):
+    """
+    The body of each process in TestConcurrency.  Each one opens the cache on
+    its own, as separate ripe-atlas invocations would.
+    """
+    cache = LocalCache(engine="sqlite", path=path, memory_size=0)
+    for i in range(iterations):
+        cache.set("probe:{}-{}".format(worker, i), i, 60)
+        cache.set_many(
+            dict(("IPDetails:{}-{}-{}".format(worker, i, j), j)
+                 for j in range(5)),
+            60
+        )
+        cache.get_many(["probe:{}-{}".format(w, i) for w in range(4)])
+        cache.update("counter:shared", lambda value: (value or 0) + 1)
+    cache.close()
+
+
+class TestLocalCache(unittest.TestCase):
+
+    ENGINE = "sqlite"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cache.db")
+        self.cache = LocalCache(engine=self.ENGINE, path=self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_get_set(self):
+        """Values survive the round trip"""
+        self.cache.set("probe:1", {"id": 1}, 60)
+        self.assertEqual(self.cache.get("probe:1"), {"id": 1})
+        self.assertEqual(self.cache["probe:1"], {"id": 1})
+        self.assertTrue("probe:1" in self.cache)
+
+    def test_get_missing(self):
+        """Missing keys return the default"""
+        self.assertEqual(self.cache.get("probe:1"), None)
+        self.assertEqual(self.cache.get("probe:1", {}), {})
+        self.assertFalse("probe:1" in self.cache)
+
+    def test_set_without_expiry(self):
+        """Values set without an expiry time never expire"""
+        self.cache["github:statistics"] = [1, 2, 3]
+        self.cache.expire()
+        self.assertEqual(self.cache.get("github:statistics"), [1, 2, 3])
+
+    def test_stale_get(self):
+        """Stale values aren't returned and are removed on access"""
+        self.cache.set("probe:1", "stale", -1)
+        self.assertFalse("probe:1" in self.cache)
+        self.assertEqual(self.cache.get("probe:1"), None)
+        self.assertEqual(self.cache.keys(), [])
+
+    def test_expire(self):
+        """Only stale values are removed by expire()"""
+        self.cache.set("probe:1", "stale", -1)
+        self.cache.set("probe:2", "fresh", 60)
+        self.cache.expire()
+        self.assertEqual(self.cache.keys(), ["probe:2"])
+
+    def test_clear(self):
+        """clear() removes one key, or all of them"""
+        self.cache.set("probe:1", 1, 60)
+        self.cache.set("probe:2", 2, 60)
+        self.cache.clear("probe:1")
+        self.assertEqual(self.cache.keys(), ["probe:2"])
+        self.cache.clear()
+        self.assertEqual(self.cache.keys(), [])
+
+    def test_clear_namespace(self):
+        """clear() can remove a whole namespace"""
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.cache.set("IPDetails:193.0.6.1", 3, 60)
+        self.assertEqual(self.cache.clear(namespace="probe"), 2)
+        self.assertEqual(self.cache.get("probe:1"), None)
+        self.assertEqual(self.cache.keys(), ["IPDetails:193.0.6.1"])
+
+    def test_get_namespace_stats(self):
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.cache.set("probe:3", 3, -1)
+        self.cache.set("IPDetails:193.0.6.1", 3, 60)
+        stats = self.cache.get_namespace_stats()
+        self.assertEqual(
+            [entry[:3] for entry in stats],
+            [("IPDetails", 1, 0), ("probe", 3, 1)]
+        )
+        self.assertTrue(all(entry[3] > 0 for entry in stats))
+
+    def test_vacuum(self):
+        self.cache.set("probe:1", 1, 60)
+        self.cache.vacuum()
+        self.assertEqual(self.cache.get("probe:1"), 1)
+
+    def test_delitem(self):
+        self.cache.set("probe:1", 1, 60)
+        del self.cache["probe:1"]
+        self.assertEqual(self.cache.get("probe:1"), None)
+        with self.assertRaises(KeyError):
+            del self.cache["probe:1"]
+
+    def test_items(self):
+        self.cache.set("probe:1", 1, 60)
+        self.assertEqual(list(self.cache.items()), [("probe:1", 1)])
+
+    def test_get_many(self):
+        """Only fresh, existing keys are returned by get_many()"""
+        self.cache.set("probe:1", 1, 60)
+        self.cache.set("probe:2", 2, -1)
+        self.assertEqual(
+            self.cache.get_many(["probe:1", "probe:2", "probe:3"]),
+            {"probe:1": 1}
+        )
+        self.assertEqual(self.cache.keys(), ["probe:1"])
+
+    def test_get_many_chunked(self):
+        """More keys than SQLite will accept in a single statement"""
+        keys = ["probe:{}".format(i) for i in range(2000)]
+        self.cache.set_many(dict((key, key) for key in keys), 60)
+        self.assertEqual(len(self.cache.get_many(keys)), 2000)
+
+    def test_set_many(self):
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.assertEqual(self.cache.get("probe:1"), 1)
+        self.assertEqual(self.cache.get("probe:2"), 2)
+        self.cache.set_many({"probe:1": "x", "probe:3": 3}, -1)
+        self.assertEqual(self.cache.get_many(["probe:1", "probe:3"]), {})
+
+    def test_get_namespace(self):
+        self.assertEqual(LocalCache.get_namespace("probe:1"), "probe")
+        self.assertEqual(
+            LocalCache.get_namespace("IPDetailsPrefix:10.0.0.0/8"),
+            "IPDetailsPrefix"
+        )
+        self.assertEqual(LocalCache.get_namespace("nothing"), "")
+        self.assertEqual(LocalCache.get_namespace(b"\x80\x02"), "")
+
+    def test_persistence(self):
+        """Values are still there after re-opening the file"""
+        self.cache.set("probe:1", 1, 60)
+        self.cache.close()
+        self.cache = LocalCache(engine=self.ENGINE, path=self.path)
+        self.assertEqual(self.cache.get("probe:1"), 1)
+
+    def test_invalid_engine(self):
+        cache = LocalCache(engine="not-an-engine", path=self.path)
+        with self.assertRaises(RipeAtlasToolsException):
+            cache.get("probe:1")
+
+    def test_lazy_open(self):
+        """Nothing touches the disk until the cache is used"""
+        path = os.path.join(self.directory, "lazy", "cache.db")
+        cache = LocalCache(engine=self.ENGINE, path=path)
+        self.assertFalse(cache.is_open)
+        self.assertEqual(cache.get_stats()["hits"], 0)
+        self.assertFalse(cache.is_open)
+        os.makedirs(os.path.dirname(path))
+        self.assertEqual(cache.get("probe:1"), None)
+        self.assertTrue(cache.is_open)
+        cache.close()
+        self.assertFalse(cache.is_open)
+
+    def test_memory_tier(self):
+        """Repeated lookups are served from memory"""
+        self.cache.set("probe:1", {"id": 1}, 60)
+        first = self.cache.get("probe:1")
+        self.assertTrue(self.cache.get("probe:1") is first)
+        self.assertEqual(self.cache.get_many(["probe:1"]), {"probe:1": first})
+        self.assertEqual(self.cache.get_stats()["hits"], 3)
+        self.assertEqual(self.cache.get_stats()["misses"], 0)
+
+    def test_memory_tier_write_through(self):
+        """Values in memory are on disk too"""
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        other = LocalCache(engine=self.ENGINE, path=self.path)
+        try:
+            self.assertEqual(
+                other.get_many(["probe:1", "probe:2"]),
+                {"probe:1": 1, "probe:2": 2}
+            )
+            self.assertEqual(other.get_stats()["misses"], 2)
+        finally:
+            other.close()
+
+    def test_memory_tier_clear(self):
+        """Cleared values aren't served from memory"""
+        self.cache.set("probe:1", 1, 60)
+        self.cache.clear("probe:1")
+        self.assertEqual(self.cache.get("probe:1"), None)
+        self.cache.set("probe:1", 1, 60)
+        self.cache.clear()
+        self.assertEqual(self.cache.get("probe:1"), None)
+
+    def test_memory_tier_disabled(self):
+        cache = LocalCache(engine=self.ENGINE, path=self.path, memory_size=0)
+        cache.set("probe:1", 1, 60)
+        self.assertEqual(cache.get("probe:1"), 1)
+        self.assertEqual(cache.get_stats()["size"], 0)
+        self.assertEqual(cache.get_stats()["misses"], 1)
+
+
+class TestLocalCacheDbm(TestLocalCache):
+
+    ENGINE = "dbm"
+
+
+class TestLocalCacheLegacyDbm(unittest.TestCase):
+
+    def test_reads_legacy_entries(self):
+        """The dbm engine reads entries written before there were engines"""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "cache.db")
+        now = datetime.datetime.now()
+        try:
+            db = dbm.open(path, "c")
+            db["probe:1"] = pickle.dumps(
+                (now + datetime.timedelta(seconds=60), {"id": 1}))
+            db["probe:2"] = pickle.dumps(
+                (now - datetime.timedelta(seconds=60), {"id": 2}))
+            db["IPDetails:1"] = pickle.dumps((None, "forever"))
+            db.close()
+            cache = LocalCache(engine="dbm", path=path, memory_size=0)
+            self.assertEqual(cache.get("probe:1"), {"id": 1})
+            self.assertEqual(cache.get("probe:2"), None)
+            self.assertEqual(cache.get("IPDetails:1"), "forever")
+            self.assertEqual(
+                [(stat[0], stat[1]) for stat in cache.get_namespace_stats()],
+                [("IPDetails", 1), ("probe", 1)]
+            )
+            cache.clear("probe")
+            self.assertEqual(cache.get("IPDetails:1"), "forever")
+            cache.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestMemoryCache(unittest.TestCase):
+
+    def test_eviction(self):
+        """The least recently used entry is dropped first"""
+        memory = MemoryCache(2)
+        memory.set("a", None, 1)
+        memory.set("b", None, 2)
+        memory.get("a")
+        memory.set("c", None, 3)
+        self.assertEqual(len(memory), 2)
+        self.assertEqual(memory.get("b"), None)
+        self.assertEqual(memory.get("a"), (None, 1))
+        self.assertEqual(memory.get("c"), (None, 3))
+        self.assertEqual((memory.hits, memory.misses), (3, 1))
+
+    def test_stale(self):
+        memory = MemoryCache(2)
+        memory.set("a", 0, 1)
+        self.assertEqual(memory.get("a"), None)
+        self.assertEqual(len(memory), 0)
+
+
+class TestMemoiser(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = LocalCache(
+            engine="sqlite", path=os.path.join(self.directory, "cache.db"))
+        mock.patch("ripe.atlas.tools.cache.cache", self.cache).start()
+        self.calls = []
+
+    def tearDown(self):
+        mock.patch.stopall()
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_cached(self):
+        """The function is only called once for the same arguments"""
+
+        @memoised(60)
+        def lookup(a, b=None, c=None):
+            self.calls.append((a, b, c))
+            return [a, b, c]
+
+        self.assertEqual(lookup(1, b=2, c=3), [1, 2, 3])
+        self.assertEqual(lookup(1, c=3, b=2), [1, 2, 3])
+        self.assertEqual(lookup(2, b=2, c=3), [2, 2, 3])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_key(self):
+        """Keys are compact, stable and specific to the function"""
+
+        @memoised(60)
+        def lookup(*args, **kwargs):
+            return 1
+
+        @memoised(60)
+        def other_lookup(*args, **kwargs):
+            return 1
+
+        key = lookup.get_key(("x" * 10000,), {"b": 1, "a": 2})
+        self.assertEqual(key, lookup.get_key(("x" * 10000,), {"a": 2, "b": 1}))
+        self.assertNotEqual(
+            key, other_lookup.get_key(("x" * 10000,), {"a": 2, "b": 1}))
+        self.assertTrue(key.startswith("memoised:"))
+        self.assertTrue(len(key) < 100)
+
+    def test_method(self):
+        """Methods aren't cached on instances we can't key on"""
+
+        calls = self.calls
+
+        class Lookup(object):
+
+            def __init__(self, offset):
+                self.offset = offset
+
+            @memoised(60)
+            def get(self, a):
+                calls.append(a)
+                return [a + self.offset]
+
+        self.assertEqual(Lookup(0).get(1), [1])
+        self.assertEqual(Lookup(10).get(1), [11])
+        self.assertEqual(Lookup(10).get(1), [11])
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self._get_keys(), [])
+
+    def test_method_key(self):
+        """With a key, separate instances share one cache entry"""
+
+        calls = self.calls
+
+        class Lookup(object):
+
+            @memoised(60, key=lambda self, a: a)
+            def get(self, a):
+                calls.append(a)
+                return [a]
+
+        class OtherLookup(object):
+
+            @memoised(60, key=lambda self, a: a)
+            def get(self, a):
+                calls.append(a)
+                return [a, a]
+
+        self.assertEqual(Lookup().get(1), [1])
+        self.assertEqual(Lookup().get(1), [1])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(self._get_keys()), 1)
+
+        # Same module, same method name, but a different class
+        self.assertEqual(OtherLookup().get(1), [1, 1])
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(self._get_keys()), 2)
+
+    def test_unserialisable(self):
+        """Arguments we can't key on skip the cache"""
+
+        @memoised(60)
+        def lookup(a):
+            self.calls.append(a)
+            return 1
+
+        argument = object()
+        self.assertEqual(lookup(argument), 1)
+        self.assertEqual(lookup(argument), 1)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self._get_keys(), [])
+
+    def _get_keys(self):
+        return [k for k in self.cache.keys() if k.startswith("memoised:")]
+
+    def test_falsy_not_cached(self):
+        """Empty results aren't cached by default"""
+
+        @memoised(60)
+        def lookup(a):
+            self.calls.append(a)
+            return {}
+
+        lookup(1)
+        lookup(1)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_negative_cached(self):
+        """Empty results are cached, and served, with negative_cache_time"""
+
+        @memoised(60, negative_cache_time=30)
+        def lookup(a):
+            self.calls.append(a)
+            return None
+
+        self.assertEqual(lookup(1), None)
+        self.assertEqual(lookup(1), None)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_negative_expiry(self):
+        """Empty results expire according to negative_cache_time"""
+
+        @memoised(60, negative_cache_time=-1)
+        def lookup(a):
+            self.calls.append(a)
+            return 0
+
+        lookup(1)
+        lookup(1)
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestConcurrency(unittest.TestCase):
+
+    WORKERS = 4
+    ITERATIONS = 50
+
+    def test_concurrent_writers(self):
+        """Several processes writing to one file lose nothing"""
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "cache.db")
+
+        try:
+
+            processes = [
+                multiprocessing.Process(
+                    target=_write_to_cache,
+                    args=(path, worker, self.ITERATIONS)
+                ) for worker in range(self.WORKERS)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(60)
+                self.assertEqual(process.exitcode, 0)
+
+            cache = LocalCache(engine="sqlite", path=path)
+            self.assertEqual(
+                cache.get("counter:shared"), self.WORKERS * self.ITERATIONS)
+            self.assertEqual(
+                dict((entry[0], entry[1])
+                     for entry in cache.get_namespace_stats()),
+                {
+                    "counter": 1,
+                    "probe": self.WORKERS * self.ITERATIONS,
+                    "IPDetails": self.WORKERS * self.ITERATIONS * 5,
+                }
+            )
+            cache.close()
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_concurrent_threads(self):
+        """One cache can be shared between threads"""
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "cache.db")
+
+        try:
+
+            cache = LocalCache(engine="sqlite", path=path, memory_size=10)
+            errors = []
+
+            def write(worker):
+                try:
+                    for i in range(self.ITERATIONS):
+                        cache.set("probe:{}-{}".format(worker, i), i, 60)
+                        cache.get_many(
+                            ["probe:{}-{}".format(w, i) for w in range(4)])
+                        cache.update(
+                            "counter:shared", lambda value: (value or 0) + 1)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [
+                threading.Thread(target=write, args=(worker,))
+                for worker in range(self.WORKERS)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(60)
+
+            self.assertEqual(errors, [])
+            self.assertEqual(
+                cache.get("counter:shared"), self.WORKERS * self.ITERATIONS)
+            cache.close()
+
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_import(self):
+        """Importing the modules that use the cache doesn't create it"""
+        home = tempfile.mkdtemp()
+        try:
+            env = dict(os.environ, HOME=home)
+            subprocess.check_call([
+                sys.executable,
+                "-c",
+                "import ripe.atlas.tools.probes, ripe.atlas.tools.ipdetails"
+            ], env=env)
+            self.assertFalse(
+                os.path.exists(os.path.join(home, ".config")))
+        finally:
+            shutil.rmtree(home)
+
+
+class TestLocalCacheLegacyFile(unittest.TestCase):
+
+    def test_replaces_legacy_file(self):
+        """A file the sqlite engine can't read is replaced with a fresh one"""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "cache.db")
+        try:
+            with open(path, "wb") as f:
+                f.write(b"\x00" * 4096)
+            cache = LocalCache(engine="sqlite", path=path)
+            cache.set("probe:1", 1, 60)
+            self.assertEqual(cache.get("probe:1"), 1)
+            cache.close()
+        finally:
+            shutil.rmtree(directory)
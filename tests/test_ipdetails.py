@@ -2,7 +2,7 @@ import mock
 import unittest
 import requests
 
-from ripe.atlas.tools.ipdetails import IP
+from ripe.atlas.tools.ipdetails import IP, Resolver
 
 
 class FakeResponse(object):
@@ -39,12 +39,19 @@ class TestIPDetails(unittest.TestCase):
         # the poor man's fake cache
         self.db = {}
 
-        def db_get(k):
-            return self.db.get(k)
+        def db_get(k, default=None):
+            return self.db.get(k, default)
 
-        def db_set(k, v, e):
+        def db_get_many(keys):
+            return dict((k, self.db[k]) for k in keys if k in self.db)
+
+        def db_set(k, v, e=None):
             self.db[k] = v
 
+        def db_update(k, function, e=None):
+            self.db[k] = function(self.db.get(k))
+            return self.db[k]
+
         def db_keys():
             return self.db.keys()
 
@@ -52,7 +59,9 @@ class TestIPDetails(unittest.TestCase):
             "ripe.atlas.tools.ipdetails.cache"
         ).start()
         self.mock_cache.get.side_effect = db_get
+        self.mock_cache.get_many.side_effect = db_get_many
         self.mock_cache.set.side_effect = db_set
+        self.mock_cache.update.side_effect = db_update
         self.mock_cache.keys.side_effect = db_keys
         self.mock_get = mock.patch(
             'ripe.atlas.tools.ipdetails.requests.get'
@@ -93,10 +102,14 @@ class TestIPDetails(unittest.TestCase):
         self.assertEquals(det.holder, self.HOLDER)
         # query to stat
         self.assertEquals(self.mock_get.call_count, 1)
-        # access to cache get
-        self.assertEquals(self.mock_cache.get.call_count, 1)
-        # access to cache set
+        # access to cache get: address, prefix lengths
+        self.assertEquals(self.mock_cache.get.call_count, 2)
+        # no prefix lengths yet, so no prefix lookup
+        self.assertEquals(self.mock_cache.get_many.call_count, 0)
+        # access to cache set: prefix, address
         self.assertEquals(self.mock_cache.set.call_count, 2)
+        # prefix lengths
+        self.assertEquals(self.mock_cache.update.call_count, 1)
 
     def test_fakecache_sameip(self):
         """Fake cache, same IP"""
@@ -107,7 +120,7 @@ class TestIPDetails(unittest.TestCase):
         # query to stat
         self.assertEquals(self.mock_get.call_count, 1)
         # access to cache get
-        self.assertEquals(self.mock_cache.get.call_count, 2)
+        self.assertEquals(self.mock_cache.get.call_count, 3)
         # access to cache set
         self.assertEquals(self.mock_cache.set.call_count, 2)
 
@@ -121,9 +134,12 @@ class TestIPDetails(unittest.TestCase):
         # query to stat
         self.assertEquals(self.mock_get.call_count, 1)
         # access to cache get
-        self.assertEquals(self.mock_cache.get.call_count, 3)
+        self.assertEquals(self.mock_cache.get.call_count, 4)
+        # one lookup of the cached prefix lengths
+        self.assertEquals(self.mock_cache.get_many.call_count, 1)
         # access to cache set
         self.assertEquals(self.mock_cache.set.call_count, 3)
+        self.assertEquals(self.mock_cache.update.call_count, 1)
 
     def test_fakecache_diffprefix(self):
         """Fake cache, same AS, different prefix"""
@@ -140,9 +156,11 @@ class TestIPDetails(unittest.TestCase):
         self.assertEquals(det2.asn, det1.asn)
         self.assertEquals(self.mock_get.call_count, 2)
         # access to cache get
-        self.assertEquals(self.mock_cache.get.call_count, 3)
+        self.assertEquals(self.mock_cache.get.call_count, 4)
         # access to cache set
         self.assertEquals(self.mock_cache.set.call_count, 4)
+        self.assertEquals(self.mock_cache.update.call_count, 2)
+        self.assertEquals(self.db["IPDetailsPrefixLengths:4"], [21, 23])
 
     def test_fakecache_notannounced(self):
         """Fake cache, IP not announced"""
@@ -246,6 +264,8 @@ class TestIPDetails(unittest.TestCase):
         self.assertEquals(self.mock_cache.get(
             "IPDetailsPrefix:193.0.0.0/21"), details
         )
+        self.assertEquals(
+            self.mock_cache.get("IPDetailsPrefixLengths:4"), [21])
 
     def test_update_cache1(self):
         """Test case where we store only address"""
@@ -255,9 +275,10 @@ class TestIPDetails(unittest.TestCase):
             'ASN': '3333'
         }
         self.mock_cache.set("IPDetailsPrefix:193.0.0.0/21", details, 1)
+        self.mock_cache.set("IPDetailsPrefixLengths:4", [21])
         IP(self.IP)
-        # we already called it above, so it should be 2 by bow
-        self.assertEquals(self.mock_cache.set.call_count, 2)
+        # we already called it twice above, so it should be 3 by now
+        self.assertEquals(self.mock_cache.set.call_count, 3)
         self.assertEquals(self.mock_cache.get("IPDetails:193.0.6.1"), details)
         self.assertEquals(self.mock_cache.get("IPDetailsPrefix:193.0.0.0/21"), details)
 
@@ -269,12 +290,44 @@ class TestIPDetails(unittest.TestCase):
             'ASN': 'test'
         }
         self.mock_cache.set("IPDetailsPrefix:193.0.0.0/20", details, 1)
+        self.mock_cache.set("IPDetailsPrefixLengths:4", [20])
         ip = IP(self.IP)
         self.assertTrue(ip.cached_prefix_found)
         self.assertEquals(ip.asn, "test")
         self.assertEquals(ip.holder, "test")
         self.assertEquals(ip.get_from_cached_prefix(), details)
 
+    def test_get_from_cache_prefix_longest(self):
+        """Test case where the most specific of several prefixes wins"""
+        for prefix, holder in (
+                ("193.0.0.0/16", "wide"),
+                ("193.0.0.0/21", "narrow"),
+                ("193.0.4.0/22", "narrowest"),
+                ("193.0.0.0/24", "elsewhere")):
+            self.mock_cache.set(
+                "IPDetailsPrefix:{}".format(prefix),
+                {"Prefix": prefix, "Holder": holder, "ASN": "3333"},
+                1
+            )
+        self.mock_cache.set("IPDetailsPrefixLengths:4", [16, 21, 22, 24])
+        ip = IP(self.IP)
+        self.assertEquals(ip.holder, "narrowest")
+        self.assertEquals(self.mock_get.call_count, 0)
+
+    def test_get_from_cache_prefix6(self):
+        """Test case where we have a matching IPv6 prefix in cache"""
+        details = {
+            'Prefix': '2001:67c:2e8::/48',
+            'Holder': 'test',
+            'ASN': '3333'
+        }
+        self.mock_cache.set("IPDetailsPrefix:2001:67c:2e8::/48", details, 1)
+        self.mock_cache.set("IPDetailsPrefixLengths:6", [48])
+        ip = IP("2001:67c:2e8:22::c100:68b")
+        self.assertTrue(ip.cached_prefix_found)
+        self.assertEquals(ip.holder, "test")
+        self.assertEquals(self.mock_get.call_count, 0)
+
     def test_get_from_cache_prefix1(self):
         """Test case where we dont' have a matching prefix in cache"""
         ip = IP(self.IP)
@@ -292,3 +345,33 @@ class TestIPDetails(unittest.TestCase):
         """Test case where IP is not quearable"""
         ip = IP("127.0.0.1")
         self.assertFalse(ip.is_querable())
+
+    def _get_resolver(self):
+        """A Resolver whose session answers from MOCK_RESULTS"""
+        resolver = Resolver(workers=4)
+        resolver.session = mock.Mock()
+        resolver.session.get.side_effect = lambda url: FakeResponse(
+            json_return=self.MOCK_RESULTS[url.rsplit("=", 1)[1]]
+        )
+        return resolver
+
+    def test_resolver(self):
+        """Each address is looked up once, however often it's asked for"""
+        resolver = self._get_resolver()
+        resolver.submit([self.IP, self.NOT_ANNOUNCED_IP, self.IP])
+        resolver.submit([self.IP])
+        self.assertEquals(resolver.get(self.IP).asn, self.ASN)
+        self.assertEquals(resolver.get(self.IP).asn, self.ASN)
+        self.assertEquals(resolver.get(self.NOT_ANNOUNCED_IP).asn, None)
+        self.assertEquals(resolver.get("127.0.0.1").asn, None)
+        resolver.stop()
+        self.assertEquals(resolver.session.get.call_count, 2)
+        self.assertEquals(self.mock_get.call_count, 0)
+
+    def test_resolver_error(self):
+        """Whatever goes wrong in a lookup is raised by get()"""
+        resolver = self._get_resolver()
+        resolver.submit(["not an address"])
+        with self.assertRaises(ValueError):
+            resolver.get("not an address")
+        resolver.stop()
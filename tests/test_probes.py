@@ -0,0 +1,309 @@
+import bz2
+import gzip
+import json
+import mock
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from ripe.atlas.cousteau import Probe as CProbe
+
+from ripe.atlas.tools.aggregators import ValueKeyAggregator, aggregate
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.probes import Probe, ProbeRecord
+from ripe.atlas.tools.probes.store import ProbeStore
+
+
+class FakeProbe(object):
+    def __init__(self, pk):
+        self.id = pk
+
+
+class TestProbe(unittest.TestCase):
+
+    def setUp(self):
+        self.db = {}
+
+        def get_many(keys):
+            return dict((k, self.db[k]) for k in keys if k in self.db)
+
+        def set_many(mapping, expires):
+            self.db.update(mapping)
+
+        self.mock_cache = mock.patch("ripe.atlas.tools.probes.cache").start()
+        self.mock_cache.get_many.side_effect = get_many
+        self.mock_cache.set_many.side_effect = set_many
+        self.mock_request = mock.patch(
+            "ripe.atlas.tools.probes.ProbeRequest").start()
+        self.mock_request.side_effect = lambda **kwargs: [
+            FakeProbe(int(pk)) for pk in kwargs["id__in"]]
+        self.mock_store = mock.patch(
+            "ripe.atlas.tools.probes.store.store").start()
+        self.mock_store.get_many.return_value = {}
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def test_get_many_uncached(self):
+        """Uncached probes are fetched in one request and cached in one go"""
+        probes = Probe.get_many([1, 2, 2, 3])
+        self.assertEqual(sorted(p.id for p in probes), [1, 2, 3])
+        self.assertEqual(self.mock_request.call_count, 1)
+        self.assertEqual(
+            self.mock_request.call_args[1]["id__in"], ["1", "2", "3"])
+        self.assertEqual(self.mock_cache.get_many.call_count, 1)
+        self.assertEqual(self.mock_cache.set_many.call_count, 1)
+        self.assertEqual(
+            sorted(self.db.keys()), ["probe:1", "probe:2", "probe:3"])
+
+    def test_get_many_cached(self):
+        """Probes in the cache don't touch the API"""
+        self.db["probe:1"] = FakeProbe(1)
+        self.db["probe:2"] = FakeProbe(2)
+        probes = Probe.get_many(iter([1, 2]))
+        self.assertEqual(sorted(p.id for p in probes), [1, 2])
+        self.assertEqual(self.mock_request.call_count, 0)
+        self.assertEqual(self.mock_cache.set_many.call_count, 0)
+
+    def test_get_many_partially_cached(self):
+        """Only the missing probes are requested from the API"""
+        self.db["probe:1"] = FakeProbe(1)
+        probes = Probe.get_many([1, 2])
+        self.assertEqual(sorted(p.id for p in probes), [1, 2])
+        self.assertEqual(self.mock_request.call_args[1]["id__in"], ["2"])
+
+    def test_get_many_stored(self):
+        """Probes in the local store don't touch the API, but are cached"""
+        self.db["probe:1"] = FakeProbe(1)
+        self.mock_store.get_many.return_value = {2: FakeProbe(2)}
+        probes = Probe.get_many([1, 2, 3])
+        self.assertEqual(sorted(p.id for p in probes), [1, 2, 3])
+        self.mock_store.get_many.assert_called_once_with([2, 3])
+        self.assertEqual(self.mock_request.call_args[1]["id__in"], ["3"])
+        self.assertEqual(
+            sorted(self.db.keys()), ["probe:1", "probe:2", "probe:3"])
+
+    def test_get_many_all_stored(self):
+        """No API call at all when the store has everything"""
+        self.mock_store.get_many.return_value = {
+            1: FakeProbe(1), 2: FakeProbe(2)}
+        probes = Probe.get_many([1, 2])
+        self.assertEqual(sorted(p.id for p in probes), [1, 2])
+        self.assertEqual(self.mock_request.call_count, 0)
+
+
+class TestProbeRecord(unittest.TestCase):
+
+    META_DATA = {
+        "id": 202,
+        "asn_v4": 3333,
+        "asn_v6": None,
+        "country_code": u"NL",
+        "prefix_v4": u"193.0.0.0/21",
+        "prefix_v6": None,
+        "status": {"id": 1, "name": u"Connected", "since": "2015-10-12"},
+        "geometry": {"type": "Point", "coordinates": [4.8975, 52.3785]},
+        "is_public": True,
+        "is_anchor": False,
+        "description": u"A probe with a long description " * 10,
+        "address_v4": u"193.0.0.78",
+        "address_v6": None,
+        "tags": [{"name": "system-ipv4-works", "slug": "system-ipv4-works"}],
+    }
+
+    def setUp(self):
+        self.probe = CProbe(id=202, meta_data=self.META_DATA)
+        self.record = ProbeRecord.from_probe(self.probe)
+
+    def test_from_probe(self):
+        """Records have everything the renderers & aggregators need"""
+        for field in ProbeRecord.__slots__:
+            self.assertEqual(
+                getattr(self.record, field), getattr(self.probe, field))
+
+    def test_pack_unpack(self):
+        self.assertEqual(ProbeRecord.unpack(self.record.pack()), self.record)
+
+    def test_pack_unpack_empty(self):
+        """Missing values survive the round trip"""
+        record = ProbeRecord(id=1)
+        unpacked = ProbeRecord.unpack(record.pack())
+        self.assertEqual(unpacked.id, 1)
+        self.assertEqual(unpacked.country_code, None)
+        self.assertEqual(unpacked.asn_v4, None)
+        self.assertEqual(unpacked.geometry, None)
+        self.assertFalse(unpacked.is_public)
+        self.assertFalse(unpacked.is_anchor)
+
+    def test_pack_unpack_long(self):
+        """Long strings are cut short on a character boundary"""
+        record = ProbeRecord(id=1, status=u"\u20ac" * 200)
+        unpacked = ProbeRecord.unpack(record.pack())
+        self.assertEqual(unpacked.status, u"\u20ac" * 84)
+
+    def test_pickle(self):
+        """Pickling uses the compact encoding"""
+        pickled = pickle.dumps(self.record, pickle.HIGHEST_PROTOCOL)
+        self.assertEqual(pickle.loads(pickled), self.record)
+        self.assertTrue(len(pickled) < 150)
+        self.assertTrue(
+            len(pickled) * 4 <
+            len(pickle.dumps(self.probe, pickle.HIGHEST_PROTOCOL))
+        )
+
+    def test_aggregate(self):
+        """Records can be aggregated just like Cousteau probes"""
+        buckets = aggregate(
+            [self.record], [ValueKeyAggregator(key="country_code")])
+        self.assertEqual(buckets, {"COUNTRY_CODE: NL": [self.record]})
+
+
+class TestProbeStore(unittest.TestCase):
+
+    # The archive format flattens status & geometry
+    ARCHIVE = {
+        "meta": {"total_count": 4},
+        "objects": [
+            {
+                "id": 1, "asn_v4": 3333, "asn_v6": None,
+                "country_code": "NL", "prefix_v4": "193.0.0.0/21",
+                "prefix_v6": None, "status": 1, "status_name": "Connected",
+                "latitude": 52.3785, "longitude": 4.8975,
+                "is_public": True, "is_anchor": False,
+            },
+            {
+                "id": 2, "asn_v4": 3333, "asn_v6": 3333,
+                "country_code": "NL", "prefix_v4": "193.0.0.0/21",
+                "prefix_v6": "2001:67c:2e8::/48", "status": 2,
+                "status_name": "Disconnected",
+                "latitude": 52.0907, "longitude": 5.1214,
+                "is_public": True, "is_anchor": True,
+            },
+            {
+                "id": 3, "asn_v4": 3320, "asn_v6": None,
+                "country_code": "DE", "prefix_v4": "80.128.0.0/11",
+                "prefix_v6": None, "status": 1, "status_name": "Connected",
+                "latitude": 52.5200, "longitude": 13.4050,
+                "is_public": True, "is_anchor": False,
+            },
+            {
+                "id": 4, "asn_v4": None, "asn_v6": None,
+                "country_code": "FJ", "prefix_v4": None, "prefix_v6": None,
+                "status": 3, "status_name": "Abandoned",
+                "latitude": -17.7134, "longitude": 179.9,
+                "is_public": False, "is_anchor": False,
+            },
+        ]
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = ProbeStore(os.path.join(self.directory, "probes.db"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def _write(self, data, opener=open, name="probes.json"):
+        path = os.path.join(self.directory, name)
+        with opener(path, "wb") as f:
+            f.write(json.dumps(data).encode("utf-8"))
+        return path
+
+    def test_empty(self):
+        """Querying a store that doesn't exist doesn't create it"""
+        self.assertEqual(self.store.get_many([1]), {})
+        self.assertEqual(self.store.filter(asn=3333), [])
+        self.assertEqual(len(self.store), 0)
+        self.assertFalse(self.store.exists)
+
+    def test_import(self):
+        self.assertEqual(
+            self.store.import_file(self._write(self.ARCHIVE)), (4, 0, 0))
+        self.assertEqual(len(self.store), 4)
+        probe = self.store.filter(country_code="de")[0]
+        self.assertEqual(probe.id, 3)
+        self.assertEqual(probe.status, "Connected")
+        self.assertEqual(probe.geometry["coordinates"], [13.4050, 52.5200])
+
+    def test_import_compressed(self):
+        for opener, name in ((gzip.open, "p.json.gz"), (bz2.BZ2File, "p")):
+            store = ProbeStore(os.path.join(self.directory, name + ".db"))
+            path = self._write(self.ARCHIVE, opener, name)
+            self.assertEqual(store.import_file(path), (4, 0, 0))
+            store.close()
+
+    def test_import_api_format(self):
+        """A plain list of API-shaped probes works too"""
+        self.store.import_file(self._write([TestProbeRecord.META_DATA]))
+        self.assertEqual(
+            self.store.get_many([202])[202],
+            ProbeRecord.from_probe(
+                CProbe(id=202, meta_data=TestProbeRecord.META_DATA))
+        )
+
+    def test_import_incremental(self):
+        """Re-importing only writes what has changed"""
+        self.store.import_file(self._write(self.ARCHIVE))
+        archive = json.loads(json.dumps(self.ARCHIVE))
+        archive["objects"][0]["status"] = 2
+        archive["objects"][0]["status_name"] = "Disconnected"
+        archive["objects"].append(dict(archive["objects"][3], id=5))
+        self.assertEqual(
+            self.store.import_file(self._write(archive)), (1, 1, 3))
+        self.assertEqual(self.store.get_many([1])[1].status, "Disconnected")
+
+    def test_import_garbage(self):
+        path = os.path.join(self.directory, "garbage")
+        with open(path, "w") as f:
+            f.write("not json")
+        with self.assertRaises(RipeAtlasToolsException):
+            self.store.import_file(path)
+        with self.assertRaises(RipeAtlasToolsException):
+            self.store.import_file(self._write({"nothing": "here"}))
+
+    def test_get_many(self):
+        self.store.import_probes(self.ARCHIVE["objects"])
+        records = self.store.get_many([1, 3, 99])
+        self.assertEqual(sorted(records), [1, 3])
+        self.assertIsInstance(records[1], ProbeRecord)
+        self.assertEqual(records[1].prefix_v4, "193.0.0.0/21")
+        self.assertTrue(records[1].is_public)
+
+    def test_filter(self):
+        self.store.import_probes(self.ARCHIVE["objects"])
+
+        def ids(**filters):
+            return [p.id for p in self.store.filter(**filters)]
+
+        self.assertEqual(ids(), [1, 2, 3, 4])
+        self.assertEqual(ids(asn=3333), [1, 2])
+        self.assertEqual(ids(asn_v6=3333), [2])
+        self.assertEqual(ids(prefix="2001:67c:2e8::/48"), [2])
+        self.assertEqual(ids(prefix_v4="193.0.0.0/21"), [1, 2])
+        self.assertEqual(ids(country_code="NL", asn_v4=3333), [1, 2])
+        self.assertEqual(ids(latitude="52.52", longitude="13.405"), [3])
+        self.assertEqual(self.store.filter(asn=3333).total_count, 2)
+
+    def test_filter_radius(self):
+        self.store.import_probes(self.ARCHIVE["objects"])
+
+        def ids(radius):
+            return [p.id for p in self.store.filter(radius=radius)]
+
+        # Amsterdam to Utrecht is ~35km, to Berlin ~575km
+        self.assertEqual(ids("52.37,4.89:10"), [1])
+        self.assertEqual(ids("52.37,4.89:50"), [1, 2])
+        self.assertEqual(ids("52.37,4.89:600"), [1, 2, 3])
+
+        # Across the antimeridian
+        self.assertEqual(ids("-17.7,-179.9:50"), [4])
+
+        with self.assertRaises(RipeAtlasToolsException):
+            ids("52.37:10")
+
+    def test_filter_unsupported(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.store.filter(tags="system-ipv4-works")